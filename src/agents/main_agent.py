@@ -10,6 +10,7 @@ from langgraph.graph.message import add_messages
 from services.database_service import DatabaseService
 from tools.agentic_rag_tool import agentic_rag
 from tools.qualification_tool import get_qualification_options
+from tools.simulation_tool import get_tournament_chances
 from tools.sql_tool import get_sql_tool
 from services.prompt_utils import PromptUtils
 
@@ -34,7 +35,8 @@ class MainAgent:
         """Return the tools to bind to the LLM."""
         tools = [get_sql_tool,
                 agentic_rag,
-                get_qualification_options
+                get_qualification_options,
+                get_tournament_chances
                 ]
         return tools
 
@@ -43,7 +45,8 @@ class MainAgent:
         tools = {
             "SQLQueryTool": get_sql_tool,
             "agentic_rag": agentic_rag,
-            "qualification_tool": get_qualification_options
+            "qualification_tool": get_qualification_options,
+            "simulation_tool": get_tournament_chances
         }
         return tools
 
@@ -2,6 +2,8 @@ from langchain.prompts import PromptTemplate
 
 from services.prompt_utils import PromptUtils
 from tools.sql_tool import get_sql_tool
+from tournament.repository import find_team, get_tournament_repository
+from tournament.scenario_engine import QualificationScenarioEngine
 
 COMPETITION_RULES_TEXT = """
 UEFA Women's Euro 2025 Qualification Rules:
@@ -16,13 +18,38 @@ Group Stage:
     3. Higher number of goals scored in the matches played among the teams in question (head-to-head goals scored).
 """
 
+def analyze_qualification(question):
+    """
+    Compute the qualification scenarios of the team mentioned in the question.
+
+    Args:
+        question (str): The user's question, in English.
+
+    Returns:
+        QualificationReport | None: The scenario analysis, or None if no team of the competition
+        is mentioned or its group cannot be loaded.
+    """
+    try:
+        repository = get_tournament_repository()
+        team = find_team(question, repository.team_names())
+        if team is None:
+            return None
+        group = repository.group_state(team)
+        if group is None:
+            return None
+        return QualificationScenarioEngine(group).analyze(team)
+    except Exception as e:
+        print(f"Error computing qualification scenarios: {e}")
+        return None
+
 def handle_qualification_question(llm, question, question_language):
     """
     Handle a user question about team qualification scenarios in the Women's Eurocup 2025.
 
-    This function retrieves current group standings and upcoming matches using a SQL tool,
-    fetches qualification rules using a rules tool, and synthesizes the information with
-    a language model to provide a detailed answer about what a team needs to do to qualify.
+    The qualification scenarios are computed deterministically from the group results and remaining
+    fixtures, and the language model only phrases them in the user's language. If the team or its
+    group cannot be found, it falls back to retrieving the standings with the SQL tool and letting
+    the language model reason over them with the competition rules.
 
     Args:
         question (str): The user's question about team qualification.
@@ -31,6 +58,24 @@ def handle_qualification_question(llm, question, question_language):
     Returns:
         str: A detailed explanation of the qualification scenarios for the team in question.
     """
+    report = analyze_qualification(question)
+    if report is None:
+        return _handle_with_sql_agent(llm, question, question_language)
+
+    prompt_config = PromptUtils.load_prompt_template("qualification_analysis", "v1")
+    prompt_template = PromptTemplate(
+        input_variables=prompt_config["input_variables"],
+        template=prompt_config["template"]
+    )
+    llm_chain = prompt_template | llm
+    return llm_chain.invoke({
+        "question": question,
+        "analysis": report.describe(),
+        "language": question_language,
+    })
+
+def _handle_with_sql_agent(llm, question, question_language):
+    """Answer the qualification question by letting the language model reason over the SQL tool output."""
     # Step 1: Use SQLQueryTool to get current standings and upcoming matches
     result = get_sql_tool.invoke({"model": llm, "agent_input": f"Get current group standings and upcoming matches for the group of the team mentioned in: '{question}'", "question_language": "English"})
     sql_result = result
@@ -0,0 +1,36 @@
+from langchain.prompts import PromptTemplate
+
+from services.prompt_utils import PromptUtils
+from tournament.repository import find_team
+from tournament.simulator import get_tournament_forecaster
+
+
+def handle_simulation_question(llm, question, question_language):
+    """
+    Handle a user question about the chances of a team in the Women's Eurocup 2025.
+
+    The probabilities of reaching each stage come from a Monte Carlo simulation of the rest of the
+    tournament, and the language model only phrases them in the user's language. When no team is
+    mentioned, the probabilities of every team are given.
+
+    Args:
+        llm: The language model instance used for generating the final answer.
+        question (str): The user's question, in English.
+        question_language (str): The language of the answer.
+
+    Returns:
+        The language model answer explaining the chances of the team in question.
+    """
+    forecast = get_tournament_forecaster().forecast()
+    team = find_team(question, list(forecast.probabilities))
+    prompt_config = PromptUtils.load_prompt_template("tournament_simulation", "stable")
+    prompt_template = PromptTemplate(
+        input_variables=prompt_config["input_variables"],
+        template=prompt_config["template"]
+    )
+    llm_chain = prompt_template | llm
+    return llm_chain.invoke({
+        "question": question,
+        "probabilities": forecast.describe([team] if team else None),
+        "language": question_language,
+    })
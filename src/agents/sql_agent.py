@@ -1,4 +1,3 @@
-import os
 import time
 from typing import Annotated, Sequence, TypedDict
 
@@ -14,7 +13,13 @@ from langchain_openai import ChatOpenAI
 from langgraph.graph import END, StateGraph
 from langgraph.graph.message import add_messages
 
+from services.data_versions import data_versions
+from services.db_engines import get_primary_engine, get_read_engine
 from services.prompt_utils import PromptUtils
+from services.sql_query_guard import SQLQueryGuard
+from services.sql_result_cache import sql_result_cache
+from services.sql_result_formatter import SQLResultFormatter
+from tools.sql_query_tool import ManagedQuerySQLDatabaseTool
 
 _cached_toolkit = None
 _cached_prompt = None
@@ -136,20 +141,32 @@ class SQLAgent:
         def initialize_cache():
             prompt_config = PromptUtils.load_prompt_template("sql_agent")
             """Helper function to initialize the cache."""
-            db = SQLDatabase.from_uri(
-                    os.getenv("POSTGRES_HOST"),
+            db = SQLDatabase(
+                    get_read_engine(),
                     view_support=True,
                     include_tables=prompt_config["include_tables"],
                     sample_rows_in_table_info=2,
                     custom_table_info=prompt_config["custom_table_info"]
             )
+            # Write counters are only maintained on the primary, never on a replica.
+            data_versions.attach(get_primary_engine())
             toolkit = SQLDatabaseToolkit(db=db, llm=self.llm)
+            tools = [
+                ManagedQuerySQLDatabaseTool.from_tool(
+                    tool,
+                    cache=sql_result_cache,
+                    guard=SQLQueryGuard(get_read_engine()),
+                    formatter=SQLResultFormatter(),
+                )
+                if tool.name == "sql_db_query" else tool
+                for tool in toolkit.get_tools()
+            ]
             prompt = ChatPromptTemplate.from_messages([
                     SystemMessagePromptTemplate.from_template(prompt_config["system_message"]),
                     HumanMessagePromptTemplate.from_template("{input}\n\n{agent_scratchpad}")
             ])
 
-            return toolkit.get_tools(), prompt
+            return tools, prompt
          
         try:
             # Check if cache needs to be refreshed
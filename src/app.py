@@ -13,6 +13,7 @@ from config.errors.handlers import register_exception_handlers
 from config.logging_config import setup_logging
 from dto.feedback_dto import FeedbackDto
 from dto.message_dto import MessageDto
+from services.metrics import collect_metrics
 from services.telegram_service import TelegramService
 
 load_dotenv()
@@ -35,6 +36,16 @@ agent = MainAgent(model=get_model(), vector_store=get_store())
 async def root():
     return {"greeting": "Hello UEFA Women's EURO 2025"}
 
+@app.get("/metrics")
+async def metrics():
+    """
+    Returns the runtime metrics of the caches and data access layers.
+
+    Returns:
+        dict: The metrics of each registered component, keyed by component name.
+    """
+    return collect_metrics()
+
 @app.post("/message")
 async def sendMessage(
     message: MessageDto
@@ -0,0 +1,69 @@
+"""
+Per-query cost of batched search (`search_batch`) against one `search_with_scores` call per query.
+
+A synthetic FAISS store is built with a deterministic fake embedding. Each embedding call waits
+--embedding-latency-ms, standing in for the round trip to OpenAI or Ollama. Queries are searched
+in batches of --batch-size, like the reformulations of multi-query retrieval or an offline
+evaluation set. The script reports the time per query of both approaches.
+
+Usage:
+    python -m benchmarks.batch_search [--documents 50000] [--queries 256] [--batch-size 4 32] [--embedding-latency-ms 30]
+"""
+import argparse
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from rag.vector_stores.faiss_store import FAISSStore
+
+
+class SlowEmbedding(DeterministicFakeEmbedding):
+    """Fake embedding with a fixed latency per call, whatever the number of texts."""
+    latency: float = 0.0
+
+    def embed_documents(self, texts):
+        time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        time.sleep(self.latency)
+        return super().embed_query(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=50000, help="Number of synthetic chunks.")
+    parser.add_argument("--dimension", type=int, default=1024, help="Dimension of the synthetic vectors.")
+    parser.add_argument("--queries", type=int, default=256, help="Number of queries.")
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[4, 32], help="Queries per batch.")
+    parser.add_argument("--k", type=int, default=5, help="Number of documents per query.")
+    parser.add_argument("--embedding-latency-ms", type=float, default=30.0, help="Simulated latency of one embedding call.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    embedding = SlowEmbedding(size=args.dimension)
+    store = FAISSStore(embedding, dimension=args.dimension)
+    rng = np.random.default_rng(args.seed)
+    store.add_embeddings([Document(id=str(i), page_content=f"chunk {i}") for i in range(args.documents)],
+                         rng.normal(size=(args.documents, args.dimension)).astype(np.float32))
+    embedding.latency = args.embedding_latency_ms / 1000
+    queries = [f"question {i}" for i in range(args.queries)]
+
+    start = time.perf_counter()
+    for query in queries:
+        store.search_with_scores(query, top_k=args.k)
+    single_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    print(f"{'search':<16} {'ms/query':>9}")
+    print(f"{'one by one':<16} {single_ms:>9.2f}")
+    for batch_size in args.batch_size:
+        start = time.perf_counter()
+        for i in range(0, len(queries), batch_size):
+            store.search_batch(queries[i:i + batch_size], top_k=args.k)
+        batch_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        print(f"{'batch of ' + str(batch_size):<16} {batch_ms:>9.2f}  ({single_ms / batch_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Calibrate the score-based relevance grader against the LLM grader.
+
+Every question is retrieved as the agentic RAG would, then graded both from the retrieval scores
+and by the LLM. The report gives the agreement of the configured and best score thresholds with
+the LLM decisions at RAG_RELEVANCE_THRESHOLD, and how many questions the borderline band sends
+to the LLM grader.
+
+Usage:
+    python -m benchmarks.calibrate_grader questions.txt
+
+The questions file has one question per line.
+"""
+import argparse
+
+from dotenv import load_dotenv
+from langchain_core.messages import HumanMessage
+
+from config.dependencies import get_store
+from rag.agentic_rag import AgenticRAG
+from rag.relevance_grader import calibrate
+
+
+def collect_samples(agentic_rag: AgenticRAG, questions):
+    """Return the (score signal, LLM confidence) pair of every question."""
+    samples = []
+    for question in questions:
+        state = {"messages": [HumanMessage(content=question)]}
+        state.update(agentic_rag._extract_metadata(state))
+        scored_docs = agentic_rag._search(question, agentic_rag._search_kwargs(state["question_metadata"]))
+        documents = [doc.page_content for doc, _ in scored_docs]
+        if not documents:
+            continue
+        signal = agentic_rag.grader.signal(question, documents, [score for _, score in scored_docs])
+        confidence = agentic_rag._llm_grade(question, "\n\n".join(documents))
+        print(f"{signal.combined:.3f} (vector {signal.vector_score:.3f}, lexical {signal.lexical_score:.3f}) | LLM {confidence:.2f} | {question}")
+        samples.append((signal.combined, confidence))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("questions", help="File with one question per line.")
+    args = parser.parse_args()
+
+    load_dotenv()
+    with open(args.questions, encoding="utf-8") as f:
+        questions = [line.strip() for line in f if line.strip()]
+    samples = collect_samples(AgenticRAG(get_store()), questions)
+    print(calibrate(samples).describe())
+
+
+if __name__ == "__main__":
+    main()
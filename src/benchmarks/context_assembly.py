@@ -0,0 +1,84 @@
+"""
+Measure the prompt-token reduction and answer-quality delta of the RAG context assembly.
+
+For each question, the chunks retrieved by the agentic RAG are given to the generator twice:
+joined verbatim, and deduplicated, trimmed and packed by the context assembler. The script
+reports the context tokens of both and, with --judge, the answer quality of both as graded
+by the LLM (0 to 1: correct, complete and supported by the retrieved chunks).
+
+Usage:
+    python -m benchmarks.context_assembly [--questions questions.txt] [--judge]
+
+Without a questions file, the questions of the agentic RAG notebook are used.
+"""
+import argparse
+import os
+import statistics
+
+from dotenv import load_dotenv
+from langchain_core.messages import HumanMessage, ToolMessage
+from pydantic import BaseModel, Field
+
+from benchmarks.rag_graph_variants import NOTEBOOK_QUESTIONS
+from config.dependencies import get_store
+from rag.agentic_rag import AgenticRAG
+from rag.context_assembly import ContextAssembler, count_tokens
+from rag.metadata_model import QuestionMetadataOutput
+from rag.rag_metrics import RAGMetrics
+
+
+class AnswerQuality(BaseModel):
+    """Quality of an answer."""
+    score: float = Field(description="Between 0 and 1: 1 when the answer is correct, complete and supported by the documents.")
+
+
+def answer(agentic_rag: AgenticRAG, question: str, language: str, context: str) -> str:
+    state = {"messages": [HumanMessage(content=question), ToolMessage(content=context, tool_call_id="benchmark")],
+             "question_language": language}
+    return agentic_rag._generate_response(state)["messages"][0]
+
+
+def judge(agentic_rag: AgenticRAG, question: str, documents: str, response: str) -> float:
+    prompt = (f"Grade the answer to the question, given the retrieved documents.\n"
+              f"Documents:\n{documents}\n\nQuestion: {question}\nAnswer: {response}")
+    return agentic_rag.llm.with_structured_output(AnswerQuality).invoke(prompt).score
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", help="File with one question per line, asked in English.")
+    parser.add_argument("--judge", action="store_true", help="Generate both answers and grade them with the LLM.")
+    args = parser.parse_args()
+
+    load_dotenv()
+    os.environ["RAG_ANSWER_CACHE"] = "false"
+    questions = NOTEBOOK_QUESTIONS
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as f:
+            questions = [(line.strip(), "English") for line in f if line.strip()]
+
+    agentic_rag = AgenticRAG(get_store(), metrics=RAGMetrics())
+    assembler = agentic_rag.context_assembler or ContextAssembler()
+    raw_tokens, assembled_tokens, raw_quality, assembled_quality = [], [], [], []
+    for question, language in questions:
+        metadata = QuestionMetadataOutput(countries=agentic_rag.gazetteer.extract(question))
+        scored_docs = agentic_rag._search(question, agentic_rag._search_kwargs(metadata))
+        raw = "\n\n".join(doc.page_content for doc, _ in scored_docs)
+        assembled = assembler.assemble(question, scored_docs).text
+        raw_tokens.append(count_tokens(raw))
+        assembled_tokens.append(count_tokens(assembled))
+        if args.judge:
+            raw_quality.append(judge(agentic_rag, question, raw, answer(agentic_rag, question, language, raw)))
+            assembled_quality.append(judge(agentic_rag, question, raw, answer(agentic_rag, question, language, assembled)))
+
+    reduction = 1 - sum(assembled_tokens) / sum(raw_tokens) if sum(raw_tokens) else 0.0
+    print(f"{'context':<10} {'avg tokens':>11} {'quality':>8}")
+    print(f"{'verbatim':<10} {statistics.mean(raw_tokens):>11.0f} {statistics.mean(raw_quality) if raw_quality else float('nan'):>8.2f}")
+    print(f"{'assembled':<10} {statistics.mean(assembled_tokens):>11.0f} {statistics.mean(assembled_quality) if assembled_quality else float('nan'):>8.2f}")
+    print(f"context assembly saves {reduction:.1%} of the context tokens")
+    if args.judge:
+        print(f"answer quality delta: {statistics.mean(assembled_quality) - statistics.mean(raw_quality):+.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Recall-vs-latency report of the FAISS index types on synthetic corpora.
+
+Each corpus is a set of clustered random vectors, like chunk embeddings of a few topics. Every
+index type is built with FAISSIndexFactory and the configured parameters, and compared with the
+exact neighbours of a flat index: recall@k, average query latency, build time and index size.
+
+Usage:
+    python -m benchmarks.faiss_index_types [--sizes 10000 100000 1000000] [--dimension 256] [--types flat hnsw ivf_flat ivf_pq]
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from rag.vector_stores.build_faiss_index import build_index
+from rag.vector_stores.faiss_index_factory import FAISSIndexFactory, IndexConfig
+
+
+def synthetic_corpus(size: int, dimension: int, queries: int, seed: int):
+    """Return corpus and query vectors drawn around a few hundred topic centres."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(max(size // 1000, 16), dimension)).astype(np.float32)
+    corpus = centres[rng.integers(len(centres), size=size)] + 0.5 * rng.normal(size=(size, dimension)).astype(np.float32)
+    query = centres[rng.integers(len(centres), size=queries)] + 0.5 * rng.normal(size=(queries, dimension)).astype(np.float32)
+    return np.ascontiguousarray(corpus, dtype=np.float32), np.ascontiguousarray(query, dtype=np.float32)
+
+
+def evaluate(index, queries: np.ndarray, truth: np.ndarray, k: int) -> dict:
+    latencies, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, neighbours = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        found.append(neighbours[0])
+    recall = np.mean([len(set(result) & set(expected)) / k for result, expected in zip(found, truth)])
+    return {"recall": float(recall), "avg_ms": float(np.mean(latencies)) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000], help="Corpus sizes.")
+    parser.add_argument("--dimension", type=int, default=256, help="Dimension of the vectors.")
+    parser.add_argument("--types", nargs="+", default=["flat", "hnsw", "ivf_flat", "ivf_pq"], help="Index types to compare.")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries per corpus.")
+    parser.add_argument("--k", type=int, default=10, help="Number of neighbours.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'chunks':>8} {'type':<9} {'recall@' + str(args.k):>10} {'query ms':>9} {'build s':>8} {'size MiB':>9}")
+    for size in args.sizes:
+        corpus, queries = synthetic_corpus(size, args.dimension, args.queries, args.seed)
+        exact = faiss.IndexFlatL2(args.dimension)
+        exact.add(corpus)
+        _, truth = exact.search(queries, args.k)
+        for index_type in args.types:
+            config = IndexConfig.from_config()
+            config.type = index_type
+            start = time.perf_counter()
+            index = build_index(corpus, FAISSIndexFactory(config), seed=args.seed)
+            build_seconds = time.perf_counter() - start
+            stats = evaluate(index, queries, truth, args.k)
+            size_mib = len(faiss.serialize_index(index)) / 2**20
+            print(f"{size:>8} {index_type:<9} {stats['recall']:>10.3f} {stats['avg_ms']:>9.3f} {build_seconds:>8.1f} {size_mib:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compare the load time and memory of the pickled and memory-mapped FAISS store formats.
+
+A synthetic store is saved in both formats, then each one is loaded in a fresh process, as a
+uvicorn worker would at start-up: the script reports the load time, the resident memory added
+by the load and the latency of the first search. Memory-mapped vectors are shared through the
+page cache, so they are not counted again for each worker.
+
+Usage:
+    python -m benchmarks.faiss_load [--documents 100000] [--dimension 1024]
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from rag.vector_stores.faiss_store import FAISSStore
+
+
+def synthetic_store(documents: int, dimension: int, seed: int) -> FAISSStore:
+    """Build a flat store of random vectors without embedding every chunk."""
+    rng = np.random.default_rng(seed)
+    store = FAISSStore(DeterministicFakeEmbedding(size=dimension), dimension=dimension)
+    store.index.add(rng.normal(size=(documents, dimension)).astype(np.float32))
+    docstore = InMemoryDocstore({str(i): Document(id=str(i), page_content=f"chunk {i}", metadata={"country": "spain"})
+                                 for i in range(documents)})
+    store.vector_store = FAISS(index=store.index, embedding_function=store.embedding_model, docstore=docstore,
+                               index_to_docstore_id={i: str(i) for i in range(documents)})
+    return store
+
+
+def resident_mib() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def load(directory: str, persistence: str, dimension: int, results):
+    os.environ["FAISS_PERSISTENCE"] = persistence
+    store = FAISSStore(DeterministicFakeEmbedding(size=dimension))
+    before = resident_mib()
+    start = time.perf_counter()
+    store.load_vector_store(directory)
+    load_seconds = time.perf_counter() - start
+    rss = resident_mib() - before
+    start = time.perf_counter()
+    store.search_with_scores("who won the final?", top_k=5)
+    results.put((persistence, load_seconds, rss, time.perf_counter() - start))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=100000, help="Number of synthetic chunks.")
+    parser.add_argument("--dimension", type=int, default=1024, help="Dimension of the synthetic vectors.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    store = synthetic_store(args.documents, args.dimension, args.seed)
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    print(f"{'format':<8} {'load s':>8} {'RSS MiB':>8} {'1st search ms':>14}")
+    for persistence in ("pickle", "mmap"):
+        with tempfile.TemporaryDirectory() as directory:
+            store.persistence = persistence
+            store.save_data_base(directory)
+            process = context.Process(target=load, args=(directory, persistence, args.dimension, results))
+            process.start()
+            name, load_seconds, rss, search_seconds = results.get()
+            process.join()
+        print(f"{name:<8} {load_seconds:>8.3f} {rss:>8.1f} {search_seconds * 1000:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
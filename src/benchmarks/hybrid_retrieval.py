@@ -0,0 +1,72 @@
+"""
+Compare dense and hybrid (BM25 + dense, reciprocal-rank fusion) retrieval.
+
+Reports recall@k on a labelled question set and, with --rewrite-rate, the share of questions
+the agentic RAG had to rewrite end to end in each retrieval mode.
+
+The labelled set is a JSON lines file, one question per line:
+    {"question": "Is there VAR?", "language": "English", "countries": [], "relevant": ["VAR"]}
+where "relevant" lists text fragments found in the chunks that answer the question.
+
+Usage:
+    python -m benchmarks.hybrid_retrieval --questions labelled.jsonl [--k 5] [--rewrite-rate]
+"""
+import argparse
+import json
+import os
+import statistics
+
+from dotenv import load_dotenv
+from langchain_core.messages import HumanMessage
+
+from config.dependencies import get_store
+from rag.agentic_rag import AgenticRAG
+from rag.metadata_model import QuestionMetadataOutput
+from rag.rag_metrics import RAGMetrics
+
+MODES = ["dense", "hybrid"]
+
+
+def recall_at_k(agentic_rag: AgenticRAG, questions, k: int) -> float:
+    """Average share of the relevant fragments of each question found in its top-k retrieved chunks."""
+    recalls = []
+    for item in questions:
+        search_kwargs = agentic_rag._search_kwargs(QuestionMetadataOutput(countries=item.get("countries", [])))
+        search_kwargs["k"] = k
+        retrieved = " ".join(doc.page_content.lower() for doc, _ in agentic_rag._search(item["question"], search_kwargs))
+        relevant = item["relevant"]
+        recalls.append(sum(fragment.lower() in retrieved for fragment in relevant) / len(relevant) if relevant else 1.0)
+    return statistics.mean(recalls)
+
+
+def rewrite_rate(agentic_rag: AgenticRAG, questions) -> float:
+    """Average number of question rewrites per question, end to end."""
+    for item in questions:
+        agentic_rag({"messages": [HumanMessage(content=item["question"])], "question_language": item.get("language", "English")})
+    return agentic_rag.metrics.stats()["counters"].get("rewrites", 0) / len(questions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", required=True, help="JSON lines file of labelled questions.")
+    parser.add_argument("--k", type=int, default=5, help="Number of retrieved chunks.")
+    parser.add_argument("--rewrite-rate", action="store_true", help="Also answer the questions end to end and count rewrites.")
+    args = parser.parse_args()
+
+    load_dotenv()
+    # Cached answers would hide the rewrites of repeated questions.
+    os.environ["RAG_ANSWER_CACHE"] = "false"
+    with open(args.questions, encoding="utf-8") as f:
+        questions = [json.loads(line) for line in f if line.strip()]
+
+    store = get_store()
+    print(f"{'mode':<7} {'recall@' + str(args.k):>9} {'rewrites/q':>11}")
+    for mode in MODES:
+        agentic_rag = AgenticRAG(store, metrics=RAGMetrics(), retrieval_mode=mode)
+        recall = recall_at_k(agentic_rag, questions, args.k)
+        rewrites = f"{rewrite_rate(agentic_rag, questions):>11.2f}" if args.rewrite_rate else f"{'-':>11}"
+        print(f"{mode:<7} {recall:>9.1%} {rewrites}")
+
+
+if __name__ == "__main__":
+    main()
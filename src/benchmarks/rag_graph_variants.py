@@ -0,0 +1,80 @@
+"""
+Compare the latency and number of LLM calls of the AgenticRAG graph variants.
+
+Runs the same questions through the "agent" variant, where an LLM call formulates the retrieval,
+and the "direct" variant, which retrieves right after the metadata extraction.
+
+Usage:
+    python -m benchmarks.rag_graph_variants [--questions questions.txt] [--repeat 3]
+
+Without a questions file, the questions of the agentic RAG notebook are used.
+"""
+import argparse
+import os
+import statistics
+import time
+
+from dotenv import load_dotenv
+from langchain_core.messages import HumanMessage
+
+from config.dependencies import get_store
+from rag.agentic_rag import AgenticRAG
+from rag.rag_metrics import LLMCallCounter, RAGMetrics
+
+NOTEBOOK_QUESTIONS = [
+    ("how can i buy tickets?", "Spanish"),
+    ("what can you say about portugal?", "Spanish"),
+    ("what can you say about argentina?", "English"),
+    ("Is there a VAR?", "Spanish"),
+]
+
+VARIANTS = ["agent", "direct"]
+
+
+def run_variant(store, variant: str, questions, repeat: int) -> dict:
+    """Answer every question `repeat` times with one graph variant, returning latency and LLM call statistics."""
+    agentic_rag = AgenticRAG(store, metrics=RAGMetrics(), graph_variant=variant)
+    latencies, llm_calls = [], []
+    for _ in range(repeat):
+        for question, language in questions:
+            counter = LLMCallCounter()
+            start = time.perf_counter()
+            agentic_rag({"messages": [HumanMessage(content=question)], "question_language": language}, {"callbacks": [counter]})
+            latencies.append(time.perf_counter() - start)
+            llm_calls.append(counter.calls)
+    return {
+        "runs": len(latencies),
+        "avg_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "avg_llm_calls": statistics.mean(llm_calls),
+        "total_llm_calls": sum(llm_calls),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", help="File with one question per line, asked in English.")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of times each question is asked.")
+    args = parser.parse_args()
+
+    load_dotenv()
+    # Repeated questions would be answered from the semantic answer cache, without running the graph.
+    os.environ["RAG_ANSWER_CACHE"] = "false"
+    questions = NOTEBOOK_QUESTIONS
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as f:
+            questions = [(line.strip(), "English") for line in f if line.strip()]
+
+    store = get_store()
+    results = {variant: run_variant(store, variant, questions, args.repeat) for variant in VARIANTS}
+    print(f"{'variant':<8} {'runs':>5} {'avg ms':>9} {'p50 ms':>9} {'max ms':>9} {'LLM calls/q':>12}")
+    for variant, stats in results.items():
+        print(f"{variant:<8} {stats['runs']:>5} {stats['avg_ms']:>9.0f} {stats['p50_ms']:>9.0f} {stats['max_ms']:>9.0f} {stats['avg_llm_calls']:>12.2f}")
+    saved = results["agent"]["avg_llm_calls"] - results["direct"]["avg_llm_calls"]
+    speedup = results["agent"]["avg_ms"] / results["direct"]["avg_ms"] if results["direct"]["avg_ms"] else 0.0
+    print(f"direct saves {saved:.2f} LLM calls per question, {speedup:.2f}x average latency speedup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Memory, latency and recall of reduced-precision vector storage: scalar quantization and Matryoshka truncation.
+
+Every combination of --dimensions and --quantization is built with FAISSIndexFactory, using the
+configured --type of index. Vectors are truncated to their first components and renormalized,
+as EmbeddingFactory does for EMBEDDING_DIMENSIONS. Recall@k is measured against the exact
+neighbours of the full-precision, full-dimension vectors. The script also reports the bytes stored
+per vector, the total index size and the average query latency.
+
+With --store, the vectors of a saved FAISS store are used. Its embedding model must support
+truncation, and the store must keep the full dimension. --queries of its vectors are held out as
+queries. Otherwise the corpus is synthetic, and its variance decays along the components like a
+Matryoshka embedding, so truncation keeps the leading, most informative ones. Synthetic recall is
+only a proxy: confirm a choice on a real store before rebuilding with it.
+
+Usage:
+    python -m benchmarks.vector_precision [--store src/rag/euro2025] [--documents 100000] [--dimension 3072]
+        [--dimensions 3072 1024 512 256] [--quantization none fp16 int8] [--type flat]
+"""
+import argparse
+
+import faiss
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from benchmarks.faiss_index_types import evaluate, synthetic_corpus
+from rag.embeddings.truncated_embeddings import truncate
+from rag.vector_stores.build_faiss_index import build_index
+from rag.vector_stores.faiss_index_factory import FAISSIndexFactory, IndexConfig
+from rag.vector_stores.faiss_persistence import IndexManifest, read_vectors
+from rag.vector_stores.faiss_store import FAISSStore
+
+
+def matryoshka_corpus(size: int, dimension: int, queries: int, seed: int):
+    """Return unit-length clustered vectors whose components carry less and less variance."""
+    corpus, query = synthetic_corpus(size, dimension, queries, seed)
+    scale = (1.0 + np.arange(dimension, dtype=np.float32)) ** -0.5
+    return truncate(corpus * scale, dimension), truncate(query * scale, dimension)
+
+
+def store_corpus(directory: str, queries: int, seed: int):
+    """Return the vectors of a saved store, without the held-out query vectors, and the query vectors."""
+    manifest = IndexManifest.load(directory)
+    store = FAISSStore(DeterministicFakeEmbedding(size=manifest.dimension if manifest else 1),
+                       model_id=manifest.model_id if manifest else None)
+    store.load_vector_store(directory)
+    vectors = read_vectors(store.vector_store.index)
+    held_out = np.random.default_rng(seed).choice(len(vectors), queries, replace=False)
+    mask = np.ones(len(vectors), dtype=bool)
+    mask[held_out] = False
+    return np.ascontiguousarray(vectors[mask]), np.ascontiguousarray(vectors[held_out])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", help="Directory of a saved FAISS store to take the vectors from.")
+    parser.add_argument("--documents", type=int, default=100000, help="Number of synthetic chunks.")
+    parser.add_argument("--dimension", type=int, default=3072, help="Full dimension of the synthetic vectors.")
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[3072, 1024, 512, 256], help="Truncated dimensions.")
+    parser.add_argument("--quantization", nargs="+", default=["none", "fp16", "int8"], help="Scalar quantizations.")
+    parser.add_argument("--type", default="flat", help="Index type, as in IndexConfig.")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries.")
+    parser.add_argument("--k", type=int, default=10, help="Number of neighbours.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.store:
+        corpus, queries = store_corpus(args.store, args.queries, args.seed)
+    else:
+        corpus, queries = matryoshka_corpus(args.documents, args.dimension, args.queries, args.seed)
+    full_dimension = corpus.shape[1]
+    exact = faiss.IndexFlatL2(full_dimension)
+    exact.add(corpus)
+    _, truth = exact.search(queries, args.k)
+
+    print(f"{len(corpus)} vectors of {full_dimension} dimensions, {args.type} index")
+    print(f"{'dims':>5} {'storage':<8} {'bytes/vec':>9} {'size MiB':>9} {'query ms':>9} {'recall@' + str(args.k):>10}")
+    for dimensions in sorted({min(dimensions, full_dimension) for dimensions in args.dimensions}, reverse=True):
+        truncated_corpus, truncated_queries = truncate(corpus, dimensions), truncate(queries, dimensions)
+        for quantization in args.quantization:
+            config = IndexConfig.from_config()
+            config.type, config.quantization = args.type, quantization
+            index = build_index(truncated_corpus, FAISSIndexFactory(config), seed=args.seed)
+            size = len(faiss.serialize_index(index))
+            stats = evaluate(index, truncated_queries, truth, args.k)
+            print(f"{dimensions:>5} {quantization:<8} {size / len(corpus):>9.0f} {size / 2**20:>9.1f} "
+                  f"{stats['avg_ms']:>9.3f} {stats['recall']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,8 @@ import os
 
 # Dependency to initialize the FAISS or Pinecone store
 def get_store():
-    store =  StoreFactory(os.getenv("STORE_TYPE", "faiss"), EmbeddingFactory(os.getenv("EMBEDDING_MODEL")).create_embedding()).get_store()
+    embedding_factory = EmbeddingFactory(os.getenv("EMBEDDING_MODEL"))
+    store =  StoreFactory(os.getenv("STORE_TYPE", "faiss"), embedding_factory.create_embedding(), embedding_factory.model_id()).get_store()
     store.load_vector_store()
     return store
 
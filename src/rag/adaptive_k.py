@@ -0,0 +1,48 @@
+import os
+from typing import Sequence
+
+
+class AdaptiveTopK:
+    """
+    Chooses how many retrieved documents to keep from the distribution of their relevance scores.
+
+    Candidates are over-fetched (`fetch_k`) and cut at the elbow, the largest drop between two
+    consecutive scores. When no drop reaches `min_gap`, the scores decrease smoothly and the cut is
+    placed where the kept documents reach `cumulative_share` of the total score instead. The number
+    of documents kept always stays between `min_k` and `max_k`.
+    """
+
+    def __init__(self, min_k: int = None, max_k: int = None, fetch_k: int = None, min_gap: float = None,
+                 cumulative_share: float = None):
+        self.min_k = int(min_k if min_k is not None else os.getenv("RAG_ADAPTIVE_MIN_K", 2))
+        self.max_k = int(max_k if max_k is not None else os.getenv("RAG_ADAPTIVE_MAX_K", 8))
+        self.fetch_k = int(fetch_k if fetch_k is not None else os.getenv("RAG_ADAPTIVE_FETCH_K", 12))
+        self.min_gap = float(min_gap if min_gap is not None else os.getenv("RAG_ADAPTIVE_MIN_GAP", 0.05))
+        self.cumulative_share = float(cumulative_share if cumulative_share is not None else os.getenv("RAG_ADAPTIVE_CUMULATIVE_SHARE", 0.8))
+        self.fetch_k = max(self.fetch_k, self.max_k)
+
+    def cut(self, scores: Sequence[float]) -> int:
+        """
+        Return the number of documents to keep.
+
+        Args:
+            scores (list[float]): The relevance scores of the candidates, best first.
+
+        Returns:
+            int: The number of leading candidates to keep.
+        """
+        scores = list(scores)[:self.max_k]
+        if len(scores) <= self.min_k:
+            return len(scores)
+
+        gaps = [(scores[i - 1] - scores[i], i) for i in range(self.min_k, len(scores))]
+        gap, elbow = max(gaps, key=lambda item: (item[0], -item[1]))
+        if gap >= self.min_gap:
+            return elbow
+
+        total, cumulative = sum(scores), 0.0
+        for k, score in enumerate(scores, start=1):
+            cumulative += score
+            if k >= self.min_k and total > 0 and cumulative >= self.cumulative_share * total:
+                return k
+        return len(scores)
@@ -1,19 +1,40 @@
+import logging
 import os
+import time
+from itertools import accumulate
 from operator import itemgetter
-from typing import Annotated, Literal, Optional, Sequence, TypedDict
+from typing import Annotated, List, Literal, Optional, Sequence, Tuple, TypedDict
 
 from langchain.tools import Tool
-from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
 from langchain_openai import ChatOpenAI
 from langgraph.graph import END, START, StateGraph
 from langgraph.graph.message import add_messages
-from langgraph.prebuilt import ToolNode, tools_condition
+from langgraph.prebuilt import tools_condition
 from pydantic import BaseModel, Field
 
+from rag.context_assembly import ContextAssembler
+from rag.country_gazetteer import CountryGazetteer
+from rag.adaptive_k import AdaptiveTopK
+from rag.bm25_index import reciprocal_rank_fusion
+from rag.hybrid_search import HybridSearcher, has_sparse_index
 from rag.metadata_model import QuestionMetadataOutput
+from rag.rag_metrics import RAGMetrics, rag_metrics
+from rag.relevance_grader import ScoreGrader
+from rag.semantic_cache import SemanticAnswerCache
 from rag.vector_stores.base_store import BaseStore
+from services.metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Reformulations(BaseModel):
+    """Alternative formulations of a question, for retrieval."""
+    questions: List[str] = Field(description="Reformulations of the question, each one self-contained.")
+
 
 class State(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
@@ -21,20 +42,164 @@ class State(TypedDict):
     agent_action: Optional[str]
     rewrite_count: int = 0
     question_metadata: QuestionMetadataOutput
+    search_kwargs: dict
+    retrieved_documents: List[str]
+    retrieval_scores: List[float]
+    question_embedding: Optional[List[float]]
+    cache_hit: bool
 
 class AgenticRAG:
-    def __init__(self, vector_store: BaseStore):
+    """
+    Agentic RAG over a vector store.
+
+    An instance is meant to be built once and shared: the LLM client and the compiled graph are
+    created in the constructor, and everything specific to a question (metadata, search filter, k)
+    lives in the graph state, so concurrent calls from threads or asyncio do not interfere.
+    """
+
+    def __init__(self, vector_store: BaseStore, metrics: RAGMetrics = rag_metrics, gazetteer: CountryGazetteer = None, grader: ScoreGrader = None,
+                 graph_variant: str = None, answer_cache: SemanticAnswerCache = None, retrieval_mode: str = None,
+                 rewrite_mode: str = None, context_assembler: ContextAssembler = None, adaptive_k: AdaptiveTopK = None):
+        start = time.perf_counter()
+        self.metrics = metrics
+        self.gazetteer = gazetteer or CountryGazetteer()
+        self.grader = grader or ScoreGrader()
+        self.metadata_llm_fallback = os.getenv("RAG_METADATA_LLM_FALLBACK", "true").lower() == "true"
+        self.grading_mode = os.getenv("RAG_GRADING_MODE", "score").lower()
+        self.graph_variant = (graph_variant or os.getenv("RAG_GRAPH_VARIANT", "direct")).lower()
+        self.retrieval_mode = (retrieval_mode or os.getenv("RAG_RETRIEVAL_MODE", "hybrid")).lower()
+        if self.retrieval_mode == "hybrid" and getattr(vector_store, "sparse_index", None) is None:
+            logger.warning("%s keeps no BM25 index: hybrid retrieval is disabled, only the vector index is searched.",
+                           type(vector_store).__name__)
+            self.retrieval_mode = "dense"
+        self.rewrite_mode = (rewrite_mode or os.getenv("RAG_REWRITE_MODE", "multi_query")).lower()
+        self.adaptive_k = adaptive_k
+        if self.adaptive_k is None and os.getenv("RAG_TOP_K_MODE", "adaptive").lower() == "adaptive":
+            self.adaptive_k = AdaptiveTopK()
+        self.context_assembler = context_assembler
+        if self.context_assembler is None and os.getenv("RAG_CONTEXT_ASSEMBLY", "true").lower() == "true":
+            self.context_assembler = ContextAssembler()
+        self.answer_cache = answer_cache
+        if self.answer_cache is None and os.getenv("RAG_ANSWER_CACHE", "true").lower() == "true":
+            self.answer_cache = SemanticAnswerCache()
+            register_metrics("rag_answer_cache", self.answer_cache.stats)
         self.llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0)
+        self.store = vector_store
+        self.hybrid_searcher = HybridSearcher(vector_store)
         self.vector_store = vector_store.get_vector_store()
+        self.tools = [self._get_retrieval_tool()]
+        self.llm_with_tools = self.llm.bind_tools(self.tools, tool_choice="required")
         self.graph = self._build_graph()
-        self.retriever = None
+        self.metrics.record_build(time.perf_counter() - start)
+
+    def _search_kwargs(self, question_metadata) -> dict:
+        """
+        Return the search filter and number of documents for the countries of the question.
+
+        With adaptive top-k, k is the number of candidates fetched before the cut.
+        """
+        filter_dict = {}
+        if question_metadata is not None and question_metadata.countries:
+            filter_dict = {"country": {"$in": [country.lower() for country in question_metadata.countries]}}
+        k = self.adaptive_k.fetch_k if self.adaptive_k is not None else int(os.getenv("RAG_RETRIEVAL_K", "5"))
+        return {"filter": filter_dict, "k": k}
+
+    def _search(self, query: str, search_kwargs: dict) -> List[Tuple[Document, float]]:
+        """
+        Retrieve the documents relevant to the query, with their relevance scores.
+
+        In "hybrid" retrieval mode, the BM25 index of the store is searched alongside the vector index
+        when the store has one. With adaptive top-k, the candidates are cut where their scores drop.
+        """
+        if self.retrieval_mode == "hybrid" and has_sparse_index(self.store):
+            self.metrics.increment("hybrid_searches")
+            results = self.hybrid_searcher.search_with_scores(query, top_k=search_kwargs["k"], filter=search_kwargs["filter"] or None)
+        else:
+            results = self.store.search_with_scores(query, top_k=search_kwargs["k"], filter=search_kwargs["filter"] or None)
+        return self._cut(query, results)
+
+    def _search_batch(self, queries: List[str], search_kwargs: dict) -> List[List[Tuple[Document, float]]]:
+        """Retrieve the documents relevant to several queries, with one batched search of the store, like `_search`."""
+        if self.retrieval_mode == "hybrid" and has_sparse_index(self.store):
+            self.metrics.increment("hybrid_searches", len(queries))
+            rankings = self.hybrid_searcher.search_batch(queries, top_k=search_kwargs["k"], filter=search_kwargs["filter"] or None)
+        else:
+            rankings = self.store.search_batch(queries, top_k=search_kwargs["k"], filter=search_kwargs["filter"] or None)
+        return [self._cut(query, results) for query, results in zip(queries, rankings)]
+
+    def _cut(self, query: str, results: List[Tuple[Document, float]]) -> List[Tuple[Document, float]]:
+        """
+        With adaptive top-k, cut the candidates where their scores drop.
+
+        The candidates keep their order, e.g. the reciprocal-rank fusion order of hybrid search, whose
+        scores are not sorted: the cut is placed on the lowest score seen so far at each rank.
+        """
+        if self.adaptive_k is None:
+            return results
+        k = self.adaptive_k.cut(list(accumulate((score for _, score in results), min)))
+        logger.info("Adaptive top-k kept %d of %d candidates for: %s", k, len(results), query)
+        self.metrics.observe("adaptive_k", k)
+        return results[:k]
+
+    def _context(self, query: str, scored_docs: List[Tuple[Document, float]]) -> Tuple[str, List[str], List[float]]:
+        """
+        Build the context of the retrieved documents: deduplicated, trimmed and packed into the token budget
+        by the context assembler, or joined verbatim without one.
+
+        Returns:
+            tuple: The context text, and the documents it is made of with their scores.
+        """
+        if self.context_assembler is None:
+            documents = [doc.page_content for doc, _ in scored_docs]
+            return "\n\n".join(documents), documents, [score for _, score in scored_docs]
+        context = self.context_assembler.assemble(query, scored_docs)
+        self.metrics.increment("context_tokens_in", context.tokens_in)
+        self.metrics.increment("context_tokens_out", context.tokens_out)
+        self.metrics.increment("context_duplicates", context.duplicates)
+        return context.text, context.documents, context.scores
+
+    def _retrieve(self, state):
+        """
+        Run the retrieval tool calls of the agent with the search filter and k of the current question.
+
+        Args:
+            state (messages): The current state
+
+        Returns:
+            dict: The updated state with one tool message per tool call and the retrieved documents and scores
+        """
+        tool_calls = state["messages"][-1].tool_calls
+        queries = [next(iter(tool_call["args"].values()), None) or state["messages"][0].content for tool_call in tool_calls]
+        return self._retrieval_update(state, queries, tool_calls)
+
+    def _retrieve_direct(self, state):
+        """
+        Retrieve documents for the latest question, the original or the rewritten one, without an agent decision.
+
+        Args:
+            state (messages): The current state
+
+        Returns:
+            dict: The updated state with the retrieved documents as a tool message, and their scores
+        """
+        tool_call = {"name": "retrieverTool", "id": f"retrieve_{state.get('rewrite_count', 0)}"}
+        return self._retrieval_update(state, [state["messages"][-1].content], [tool_call])
+
+    def _retrieval_update(self, state, queries, tool_calls) -> dict:
+        search_kwargs = state.get("search_kwargs") or self._search_kwargs(state.get("question_metadata"))
+        results, documents, scores = [], [], []
+        for query, tool_call in zip(queries, tool_calls):
+            content, query_documents, query_scores = self._context(query, self._search(query, search_kwargs))
+            documents.extend(query_documents)
+            scores.extend(query_scores)
+            results.append(ToolMessage(content=content, name=tool_call["name"], tool_call_id=tool_call["id"]))
+        return {"messages": results, "retrieved_documents": documents, "retrieval_scores": scores, "search_kwargs": search_kwargs}
 
     def _get_retrieval_tool(self):
         """Return the Retrieval tool."""
         def retriever_tool(query) -> str:
             """Retrieve relevant documents based on the query."""
-            docs = self.retriever.invoke(query)
-            return "\n\n".join([doc.page_content for doc in docs])
+            return self._context(query, self._search(query, self._search_kwargs(None)))[0]
 
         return Tool(
             name="retrieverTool",
@@ -48,56 +213,170 @@ class AgenticRAG:
         This method defines the flow of the agentic RAG process, including
         the retrieval of documents, grading of relevance, generation of responses, and default response if
         it doesn't find relevant documents.
+
+        The "direct" variant retrieves right after extracting the metadata, since the agent is forced
+        to call the retriever anyway; the "agent" variant lets the LLM formulate the retrieval call.
+
+        In "multi_query" rewrite mode, documents graded irrelevant lead to a single round of retrieval
+        with several reformulations of the question instead of a loop of sequential rewrites.
         """
         graph_builder = StateGraph(State)
         graph_builder.add_node("extractMetaData", self._extract_metadata)
-        graph_builder.add_node("agent", self._agent)
-        graph_builder.add_node("retrieverTool", ToolNode([self._get_retrieval_tool()]))
-        graph_builder.add_node("rewrite", self._rewrite_question)
-        graph_builder.add_node("generate", self._generate_response)
+        if self.rewrite_mode == "multi_query":
+            graph_builder.add_node("rewrite", self._multi_query_retrieve)
+        else:
+            graph_builder.add_node("rewrite", self._rewrite_question)
+        graph_builder.add_node("generate", self._generate_and_cache)
         graph_builder.add_node("notfound", self._not_found)
-
         graph_builder.add_edge(START, "extractMetaData")
-        graph_builder.add_edge("extractMetaData", "agent")
 
-        graph_builder.add_conditional_edges( 
-            "agent",
-            tools_condition,
-            {
-                "tools": "retrieverTool",
-                END: END
-            }
-        )
-        graph_builder.add_conditional_edges(
-            "retrieverTool",
-            self._grade_documents
-        )
+        if self.graph_variant == "agent":
+            retrieval_node = "agent"
+            graph_builder.add_node("agent", self._agent)
+            graph_builder.add_node("retrieverTool", self._retrieve)
+            self._add_cache_lookup(graph_builder, retrieval_node)
+            graph_builder.add_conditional_edges( 
+                "agent",
+                tools_condition,
+                {
+                    "tools": "retrieverTool",
+                    END: END
+                }
+            )
+            graph_builder.add_conditional_edges(
+                "retrieverTool",
+                self._grade_documents,
+                ["generate", "rewrite"]
+            )
+        else:
+            retrieval_node = "retrieve"
+            graph_builder.add_node("retrieve", self._retrieve_direct)
+            self._add_cache_lookup(graph_builder, retrieval_node)
+            graph_builder.add_conditional_edges(
+                "retrieve",
+                self._grade_documents,
+                ["generate", "rewrite"]
+            )
 
         def rewrite_condition(state):
             if state.get("agent_action") == "NOT_FOUND":
                 return "notfound"
-            return "agent"
-
-        graph_builder.add_conditional_edges(
-            "rewrite",
-            rewrite_condition
-        )
+            return retrieval_node
+
+        if self.rewrite_mode == "multi_query":
+            graph_builder.add_conditional_edges(
+                "rewrite",
+                self._grade_documents,
+                {
+                    "generate": "generate",
+                    "rewrite": "notfound"
+                }
+            )
+        else:
+            graph_builder.add_conditional_edges(
+                "rewrite",
+                rewrite_condition,
+                {
+                    "notfound": "notfound",
+                    retrieval_node: retrieval_node
+                }
+            )
 
         graph_builder.add_edge("generate", END)
         graph_builder.add_edge("notfound", END)
 
         return graph_builder.compile()
-    
+
+    def _add_cache_lookup(self, graph_builder, retrieval_node: str):
+        """Look the question up in the answer cache once its countries are known, and end the run on a hit."""
+        if self.answer_cache is None:
+            graph_builder.add_edge("extractMetaData", retrieval_node)
+            return
+        graph_builder.add_node("cacheLookup", self._cache_lookup)
+        graph_builder.add_edge("extractMetaData", "cacheLookup")
+        graph_builder.add_conditional_edges(
+            "cacheLookup",
+            lambda state: END if state.get("cache_hit") else retrieval_node,
+            {
+                END: END,
+                retrieval_node: retrieval_node
+            }
+        )
+
+    def _cache_partition(self, state) -> tuple:
+        metadata = state.get("question_metadata")
+        return state.get("question_language"), metadata.countries if metadata is not None else []
+
+    def _cache_lookup(self, state):
+        """
+        Answer the question from the semantic answer cache, skipping retrieval, grading and generation on a hit.
+
+        Args:
+            state (messages): The current state
+
+        Returns:
+            dict: The updated state with the cached answer on a hit, and the embedding of the question
+        """
+        question = state["messages"][0].content
+        try:
+            embedding = self.store.embedding_model.embed_query(question)
+            language, countries = self._cache_partition(state)
+            answer = self.answer_cache.lookup(embedding, language, countries, generation=self.store.generation)
+        except Exception as e:
+            print(f"Error looking up the answer cache: {e}")
+            return {"cache_hit": False, "question_embedding": None}
+        if answer is None:
+            return {"cache_hit": False, "question_embedding": list(embedding)}
+        self.metrics.increment("answer_cache_hits")
+        return {"cache_hit": True, "messages": [AIMessage(content=answer)]}
+
+    def _generate_and_cache(self, state):
+        """Generate the answer and store it in the answer cache."""
+        update = self._generate_response(state)
+        if self.answer_cache is not None and state.get("question_embedding"):
+            answer = update["messages"][0]
+            language, countries = self._cache_partition(state)
+            self.answer_cache.store(state["messages"][0].content, state["question_embedding"], language, countries,
+                                    getattr(answer, "content", answer), generation=self.store.generation)
+        return update
+
     def _grade_documents(self, state) -> Literal["generate", "rewrite"]:
         """
         Determines whether the retrieved documents are relevant to the question.
 
+        In "score" grading mode, the decision is taken from the relevance scores of the retrieved
+        documents and their lexical overlap with the question, and the LLM grader is only asked when
+        that signal is borderline or the scores are not available.
+
         Args:
             state (messages): The current state
 
         Returns:
             str: A decision for whether the documents are relevant or not
         """
+        messages = state["messages"]
+        question = messages[0].content
+        docs = messages[-1].content
+        if len(docs) == 0:
+            return "rewrite"
+
+        scores = state.get("retrieval_scores")
+        if self.grading_mode == "score" and scores:
+            decision = self.grader.decide(self.grader.signal(question, state.get("retrieved_documents") or [docs], scores))
+            if decision is not None:
+                self.metrics.increment("grade_by_score")
+                return decision
+
+        self.metrics.increment("grade_by_llm")
+        confidence_score = self._llm_grade(question, docs)
+        relevance_threshold = float(os.getenv("RAG_RELEVANCE_THRESHOLD", 0.7))
+        if confidence_score > relevance_threshold:
+            return "generate"
+        else:
+            return "rewrite"
+
+    def _llm_grade(self, question: str, docs: str) -> float:
+        """Ask the language model for the relevance of the documents to the question, between 0 and 1."""
         class Grade(BaseModel):
             """Confidence score for relevance check."""
             confidence_score: float = Field(
@@ -105,11 +384,7 @@ class AgenticRAG:
             )
 
         llm_with_structured_output = self.llm.with_structured_output(Grade)
-        messages = state["messages"]
-        last_message = messages[-1]
-        question = messages[0].content
-        docs = last_message.content
-  
+
         # Prompt
         prompt = PromptTemplate(
             template="""You are a grader assessing the relevance of a retrieved document to a user question. 
@@ -121,18 +396,15 @@ class AgenticRAG:
         )
 
         chain = prompt | llm_with_structured_output
-        scored_result = chain.invoke({"question": question, "context": docs})
-        confidence_score = scored_result.confidence_score
-        relevance_threshold = float(os.getenv("RAG_RELEVANCE_THRESHOLD", 0.7))
-        if len(docs) > 0 and confidence_score > relevance_threshold:
-            return "generate"
-        else:
-            return "rewrite"
+        return chain.invoke({"question": question, "context": docs}).confidence_score
 
     def _extract_metadata(self, state):
         """
         Extracts metadata from the question to determine the countries involved.
 
+        Countries are found with the country gazetteer. The language model is only asked when the
+        gazetteer finds none but the question seems to name a team or country it does not know.
+
         Args:
             state (messages): The current state
 
@@ -140,6 +412,12 @@ class AgenticRAG:
             dict: The updated state with extracted metadata
         """
         question = state["messages"][0].content
+        countries = self.gazetteer.extract(question)
+        if countries or not (self.metadata_llm_fallback and self.gazetteer.looks_entity_bearing(question)):
+            self.metrics.increment("metadata_gazetteer")
+            return {"question_metadata": QuestionMetadataOutput(countries=countries)}
+
+        self.metrics.increment("metadata_llm_fallback")
         prompt = PromptTemplate(
             template="""Extract the structured data from the following question.
             Question: {question}
@@ -161,15 +439,8 @@ class AgenticRAG:
             dict: The updated state with the agent response appended to messages
         """
         messages = state["messages"]
-        filter_dict = {}
-        if state["question_metadata"].countries:
-            filter_dict = {"country": {"$in": [country.lower() for country in state["question_metadata"].countries]}}
-        self.retriever = self.vector_store.as_retriever(search_type="similarity", search_kwargs = {"filter": filter_dict, 'k': int(os.getenv("RAG_RETRIEVAL_K", "5"))})
-        self.tools = [self._get_retrieval_tool()]
-        llm_with_tools = self.llm.bind_tools(self.tools, tool_choice="required")
-        response = llm_with_tools.invoke(messages)
-
-        return {"messages": [response]}
+        response = self.llm_with_tools.invoke(messages)
+        return {"messages": [response], "search_kwargs": self._search_kwargs(state["question_metadata"])}
     
     def _not_found(self, state):
         """
@@ -220,6 +491,8 @@ class AgenticRAG:
         if int(count) > int(os.getenv("RAG_RETRY_COUNT", 2)):
             state["agent_action"] = "NOT_FOUND"
             return {"agent_action" : "NOT_FOUND", "rewrite_count": count}
+
+        self.metrics.increment("rewrites")
     
         messages = state["messages"]
         question = messages[0].content
@@ -238,6 +511,57 @@ class AgenticRAG:
         response = self.llm.invoke(msg)
         return {"agent_action" : "agent", "messages": [response], "rewrite_count": count}
 
+    def _multi_query_retrieve(self, state):
+        """
+        Retrieve documents for several reformulations of the question at once.
+
+        The reformulations are generated in one LLM call and searched in one batch together with the
+        original question; the rankings are merged with reciprocal-rank fusion and graded once.
+
+        Args:
+            state (messages): The current state
+
+        Returns:
+            dict: The updated state with the fused documents as a tool message, and their scores
+        """
+        self.metrics.increment("multi_query_rewrites")
+        question = state["messages"][0].content
+        count = max(int(os.getenv("RAG_MULTI_QUERY_COUNT", 3)), 1)
+        prompt = PromptTemplate(
+            template="""Rewrite the following question about the Women's Eurocup 2025 in {count} different ways,
+            to retrieve the documents that answer it. Make each one more specific and contextually accurate,
+            using synonyms and related terms, in the language of the documents.
+            Question: {question}
+            """,
+            input_variables=["question", "count"],
+        )
+        try:
+            reformulations = self.llm.with_structured_output(Reformulations).invoke(prompt.format(question=question, count=count)).questions
+        except Exception as e:
+            print(f"Error generating question reformulations: {e}")
+            reformulations = []
+        queries = list(dict.fromkeys([question] + [query for query in reformulations[:count] if query]))
+
+        search_kwargs = state.get("search_kwargs") or self._search_kwargs(state.get("question_metadata"))
+        rankings = self._search_batch(queries, search_kwargs)
+        best_scores = {}
+        for ranking in rankings:
+            for doc, score in ranking:
+                key = doc.id or doc.page_content
+                best_scores[key] = max(best_scores.get(key, 0.0), score)
+        fused = reciprocal_rank_fusion([[doc for doc, _ in ranking] for ranking in rankings],
+                                       k=self.hybrid_searcher.rrf_k)[:self.adaptive_k.max_k if self.adaptive_k else search_kwargs["k"]]
+
+        content, documents, scores = self._context(question, [(doc, best_scores[doc.id or doc.page_content]) for doc, _ in fused])
+        message = ToolMessage(content=content, name="retrieverTool", tool_call_id="multi_query")
+        return {
+            "messages": [message],
+            "retrieved_documents": documents,
+            "retrieval_scores": scores,
+            "search_kwargs": search_kwargs,
+            "rewrite_count": state.get("rewrite_count", 0) + 1,
+        }
+
     def _generate_response(self, state):
         """
         Generate answer
@@ -274,5 +598,19 @@ class AgenticRAG:
         response = rag_chain.invoke({"question": question, "language": state.get("question_language")})
         return {"messages": [response]}
 
-    def __call__(self, state: State):
-        return self.graph.invoke(state)
\ No newline at end of file
+    def __call__(self, state: State, config=None):
+        start = time.perf_counter()
+        self.metrics.call_started()
+        try:
+            return self.graph.invoke(state, config)
+        finally:
+            self.metrics.call_finished(time.perf_counter() - start)
+
+    async def ainvoke(self, state: State, config=None):
+        """Asynchronous counterpart of `__call__`, for use from asyncio code."""
+        start = time.perf_counter()
+        self.metrics.call_started()
+        try:
+            return await self.graph.ainvoke(state, config)
+        finally:
+            self.metrics.call_finished(time.perf_counter() - start)
\ No newline at end of file
@@ -0,0 +1,136 @@
+import heapq
+import math
+import os
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from rag.relevance_grader import content_tokens
+
+
+def matches_filter(metadata: dict, filter: dict) -> bool:
+    """
+    Return True when the metadata satisfies a vector store filter.
+
+    Supports the filters built by the agentic RAG: exact values and `{"$in": [...]}` lists.
+    """
+    for field, condition in (filter or {}).items():
+        value = metadata.get(field)
+        if isinstance(condition, dict) and "$in" in condition:
+            if value not in condition["$in"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class BM25Index:
+    """
+    In-process Okapi BM25 index over the chunks of a vector store.
+
+    Catches the exact-name lookups (players, stadiums, "VAR") that dense similarity misses.
+    Texts are tokenized like the relevance grader: accent- and case-insensitive, without stopwords.
+    """
+
+    def __init__(self, k1: float = None, b: float = None):
+        self.k1 = float(k1 if k1 is not None else os.getenv("BM25_K1", 1.5))
+        self.b = float(b if b is not None else os.getenv("BM25_B", 0.75))
+        self._lock = threading.Lock()
+        # Removed documents leave a None slot, so positions stay valid in the postings.
+        self._documents: List[Optional[Document]] = []
+        self._lengths: List[int] = []
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._positions: Dict[str, int] = {}
+        self._count = 0
+        self._total_length = 0
+
+    def __len__(self):
+        return self._count
+
+    def add_documents(self, documents: Iterable[Document]):
+        """Add the documents, replacing the indexed documents with the same ids."""
+        with self._lock:
+            for document in documents:
+                if document.id is not None:
+                    self._remove(document.id)
+                position = len(self._documents)
+                tokens = content_tokens(document.page_content)
+                self._documents.append(document)
+                self._lengths.append(len(tokens))
+                self._count += 1
+                self._total_length += len(tokens)
+                if document.id is not None:
+                    self._positions[document.id] = position
+                for token, frequency in Counter(tokens).items():
+                    self._postings[token][position] = frequency
+
+    def remove(self, ids: Sequence[str]):
+        """Remove the documents with the given ids, only updating the postings of their tokens."""
+        with self._lock:
+            for id in ids:
+                self._remove(id)
+
+    def _remove(self, id: str):
+        position = self._positions.pop(id, None)
+        if position is None:
+            return
+        for token in set(content_tokens(self._documents[position].page_content)):
+            postings = self._postings[token]
+            postings.pop(position, None)
+            if not postings:
+                del self._postings[token]
+        self._documents[position] = None
+        self._count -= 1
+        self._total_length -= self._lengths[position]
+
+    def search(self, query: str, top_k: int = 5, filter: dict = None) -> List[Tuple[Document, float]]:
+        """
+        Return the documents with the highest BM25 score for the query.
+
+        Args:
+            query (str): The query text.
+            top_k (int): The number of documents to return.
+            filter (dict): Metadata filter, in the vector store syntax.
+
+        Returns:
+            list[tuple[Document, float]]: The matching documents with their BM25 score, best first.
+        """
+        with self._lock:
+            count = self._count
+            if count == 0:
+                return []
+            average_length = self._total_length / count or 1.0
+            scores = defaultdict(float)
+            for token in set(content_tokens(query)):
+                postings = self._postings.get(token)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for position, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[position] / average_length)
+                    scores[position] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+            candidates = [(score, position) for position, score in scores.items()
+                          if not filter or matches_filter(self._documents[position].metadata, filter)]
+            best = heapq.nlargest(top_k, candidates)
+            return [(self._documents[position], score) for score, position in best]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Document]], k: int = 60) -> List[Tuple[Document, float]]:
+    """
+    Merge ranked lists of documents with reciprocal-rank fusion.
+
+    Each document scores the sum of 1 / (k + rank) over the lists it appears in; documents are
+    identified by their id, or by their content when they have none.
+
+    Returns:
+        list[tuple[Document, float]]: The fused ranking with the fusion scores, best first.
+    """
+    fused, documents = defaultdict(float), {}
+    for ranking in rankings:
+        for rank, document in enumerate(ranking, start=1):
+            key = document.id or document.page_content
+            documents.setdefault(key, document)
+            fused[key] += 1.0 / (k + rank)
+    return [(documents[key], score) for key, score in sorted(fused.items(), key=lambda item: item[1], reverse=True)]
@@ -0,0 +1,109 @@
+import os
+import re
+from dataclasses import dataclass, field
+from typing import List, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from rag.relevance_grader import content_tokens, lexical_overlap
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def count_tokens(text: str) -> int:
+    """Approximate the number of LLM tokens of a text: one per word or punctuation mark."""
+    return len(_TOKEN.findall(text))
+
+
+def truncate(text: str, max_tokens: int) -> str:
+    """Cut the text after the last whole word that fits in `max_tokens`."""
+    words, tokens = [], 0
+    for word in text.split():
+        tokens += count_tokens(word)
+        if tokens > max_tokens:
+            break
+        words.append(word)
+    return " ".join(words)
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in _SENTENCE_END.split(text) if sentence.strip()]
+
+
+def shingles(text: str, size: int = 3) -> set:
+    """Return the word n-grams of a text, used to compare chunks."""
+    tokens = content_tokens(text)
+    if len(tokens) < size:
+        return {tuple(tokens)} if tokens else set()
+    return {tuple(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def jaccard(left: set, right: set) -> float:
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+@dataclass
+class AssembledContext:
+    text: str
+    documents: List[str] = field(default_factory=list)
+    scores: List[float] = field(default_factory=list)
+    tokens_in: int = 0
+    tokens_out: int = 0
+    duplicates: int = 0
+
+
+class ContextAssembler:
+    """
+    Builds the context given to the grader and the generator from the retrieved chunks.
+
+    Near-duplicate chunks are dropped, each chunk is trimmed to the sentences that best match
+    the query, and the chunks are packed by decreasing score until the token budget is spent.
+    """
+
+    def __init__(self, token_budget: int = None, dedup_threshold: float = None, max_sentences: int = None):
+        self.token_budget = int(token_budget if token_budget is not None else os.getenv("RAG_CONTEXT_TOKEN_BUDGET", 1500))
+        self.dedup_threshold = float(dedup_threshold if dedup_threshold is not None else os.getenv("RAG_CONTEXT_DEDUP_THRESHOLD", 0.8))
+        self.max_sentences = int(max_sentences if max_sentences is not None else os.getenv("RAG_CONTEXT_MAX_SENTENCES", 4))
+
+    def trim(self, query: str, text: str) -> str:
+        """Keep the `max_sentences` sentences of the text that best match the query, in their original order."""
+        sentences = split_sentences(text)
+        if len(sentences) <= self.max_sentences:
+            return text.strip()
+        ranked = sorted(range(len(sentences)), key=lambda i: (-lexical_overlap(query, sentences[i]), i))
+        return " ".join(sentences[i] for i in sorted(ranked[:self.max_sentences]))
+
+    def assemble(self, query: str, scored_docs: Sequence[Tuple[Document, float]]) -> AssembledContext:
+        """
+        Assemble the context of a query.
+
+        Args:
+            query (str): The query the documents were retrieved for.
+            scored_docs (list[tuple[Document, float]]): The retrieved documents with their relevance scores.
+
+        Returns:
+            AssembledContext: The context text, the kept chunks and their scores, and token counts before and after.
+        """
+        context = AssembledContext(text="", tokens_in=count_tokens("\n\n".join(doc.page_content for doc, _ in scored_docs)))
+        kept_shingles = []
+        for doc, score in sorted(scored_docs, key=lambda item: item[1], reverse=True):
+            doc_shingles = shingles(doc.page_content)
+            if any(jaccard(doc_shingles, kept) >= self.dedup_threshold for kept in kept_shingles):
+                context.duplicates += 1
+                continue
+            text = self.trim(query, doc.page_content)
+            tokens = count_tokens(text)
+            if context.documents and context.tokens_out + tokens > self.token_budget:
+                continue
+            if not context.documents and tokens > self.token_budget:
+                text = truncate(text, self.token_budget)
+                tokens = count_tokens(text)
+            kept_shingles.append(doc_shingles)
+            context.documents.append(text)
+            context.scores.append(score)
+            context.tokens_out += tokens
+        context.text = "\n\n".join(context.documents)
+        return context
@@ -0,0 +1,187 @@
+import re
+import unicodedata
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+# Country names, demonyms, translations and nicknames of the national teams, keyed by the
+# canonical name used in the `teams` table. Aliases are matched case- and accent-insensitively.
+DEFAULT_ALIASES = {
+    "Belgium": ["belgian", "belgica", "belgique", "belgien", "red flames"],
+    "Denmark": ["dinamarca", "danemark", "danimarca"],
+    "England": ["inglaterra", "angleterre", "inghilterra", "lionesses"],
+    "Finland": ["finlandia", "finlande", "finnland", "helmarit"],
+    "France": ["francia", "frankreich", "les bleues"],
+    "Germany": ["alemania", "allemagne", "deutschland", "germania", "alemanya"],
+    "Iceland": ["islandia", "islande", "islanda"],
+    "Italy": ["italia", "italie", "italien", "azzurre"],
+    "Netherlands": ["the netherlands", "holland", "holanda", "paises bajos", "pays-bas", "niederlande", "oranje"],
+    "Norway": ["noruega", "norvege", "norwegen", "norvegia"],
+    "Poland": ["polonia", "pologne", "polen"],
+    "Portugal": ["portuguesa", "portogallo"],
+    "Spain": ["espana", "espanya", "espagne", "spanien", "spagna", "la roja"],
+    "Sweden": ["suecia", "suede", "schweden", "svezia"],
+    "Switzerland": ["swiss", "suiza", "suisse", "schweiz", "svizzera"],
+    "Wales": ["gales", "pays de galles", "galles"],
+}
+
+# Demonyms that are also the name of a language, e.g. "answer in English". They only name the
+# team when followed by one of TEAM_NOUNS, as in "English players".
+LANGUAGE_DEMONYMS = {
+    "Denmark": ["danish"],
+    "England": ["english"],
+    "Finland": ["finnish"],
+    "France": ["french"],
+    "Germany": ["german"],
+    "Iceland": ["icelandic"],
+    "Italy": ["italian"],
+    "Netherlands": ["dutch"],
+    "Norway": ["norwegian"],
+    "Poland": ["polish"],
+    "Portugal": ["portuguese", "portugues"],
+    "Spain": ["spanish"],
+    "Sweden": ["swedish"],
+    "Wales": ["welsh"],
+}
+
+TEAM_NOUNS = [
+    "team", "teams", "national team", "side", "squad", "players", "player", "women", "coach", "manager",
+    "goalkeeper", "striker", "strikers", "defence", "defense", "attack", "captain", "fans", "supporters",
+]
+
+# Capitalized words that do not name a country, ignored when deciding whether a question mentions one.
+NON_ENTITY_WORDS = {
+    "i", "what", "who", "when", "where", "which", "how", "why", "is", "are", "can", "do", "does", "did", "tell",
+    "the", "a", "euro", "euros", "eurocup", "uefa", "women", "women's", "var", "fifa", "cup", "final", "group",
+}
+
+_ENTITY_PHRASE = re.compile(r"\b(?:about|from|against|versus|vs\.?|team of|players of|coach of|squad of)\s+([a-z][\w'-]{2,})", re.IGNORECASE)
+
+
+def normalize(text: str) -> str:
+    """Lowercase the text and strip its accents."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+class AhoCorasick:
+    """Multi-pattern string matcher: finds every occurrence of all patterns in one pass over the text."""
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._outputs = [[]]
+        self._built = False
+
+    def add(self, pattern: str, value):
+        """Add a pattern, reported with its value when found."""
+        state = 0
+        for char in pattern:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._outputs[state].append((len(pattern), value))
+        self._built = False
+
+    def build(self):
+        """Compute the failure links, breadth first."""
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._outputs[child] = self._outputs[child] + self._outputs[self._fail[child]]
+        self._built = True
+
+    def find(self, text: str) -> Iterable[Tuple[int, int, object]]:
+        """Yield the (start, end, value) of every pattern occurrence in the text."""
+        if not self._built:
+            self.build()
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, value in self._outputs[state]:
+                yield i + 1 - length, i + 1, value
+
+
+class CountryGazetteer:
+    """
+    Extracts the countries mentioned in a question with an Aho-Corasick matcher over country names and aliases.
+
+    Matches must start and end on word boundaries, and overlapping matches are resolved in favour
+    of the longest one, so that "Northern Ireland" is not also read as "Ireland".
+    Demonyms that also name a language only count before a team noun, so that "answer in English"
+    does not filter the search on England.
+    """
+
+    def __init__(self, countries: Iterable[str] = (), aliases: Dict[str, List[str]] = None,
+                 language_demonyms: Dict[str, List[str]] = None):
+        aliases = DEFAULT_ALIASES if aliases is None else aliases
+        language_demonyms = LANGUAGE_DEMONYMS if language_demonyms is None else language_demonyms
+        aliases = {country: list(aliases.get(country, [])) + [f"{demonym} {noun}" for demonym in language_demonyms.get(country, [])
+                                                              for noun in TEAM_NOUNS]
+                   for country in set(aliases) | set(language_demonyms)}
+        self.countries = sorted(set(countries) | set(aliases))
+        self._matcher = AhoCorasick()
+        for country in self.countries:
+            for name in [country] + list(aliases.get(country, [])):
+                self._matcher.add(normalize(name), country)
+        self._matcher.build()
+        self._known_words = {word for country in self.countries for name in [country] + list(aliases.get(country, []))
+                             for word in normalize(name).split()}
+
+    def extract(self, question: str) -> List[str]:
+        """
+        Return the countries mentioned in the question.
+
+        Args:
+            question (str): The user's question, in any language.
+
+        Returns:
+            list[str]: The canonical names of the countries, in order of appearance and without duplicates.
+        """
+        text = normalize(question)
+        matches = [
+            (start, end, country) for start, end, country in self._matcher.find(text)
+            if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+        ]
+        matches.sort(key=lambda match: (match[0], -(match[1] - match[0])))
+        countries, position = [], 0
+        for start, end, country in matches:
+            if start < position:
+                continue
+            position = end
+            if country not in countries:
+                countries.append(country)
+        return countries
+
+    def looks_entity_bearing(self, question: str) -> bool:
+        """Return True when the question seems to name a team or country the gazetteer does not know."""
+        words = re.findall(r"[\w'-]+", question)
+        for word in words[1:]:
+            if word[0].isupper() and normalize(word) not in NON_ENTITY_WORDS and normalize(word) not in self._known_words:
+                return True
+        return any(normalize(word) not in NON_ENTITY_WORDS for word in _ENTITY_PHRASE.findall(question))
+
+
+@lru_cache(maxsize=None)
+def get_country_gazetteer() -> CountryGazetteer:
+    """Shared gazetteer over the default aliases and the teams of the competition, when the database is available."""
+    countries = []
+    try:
+        from tournament.repository import get_tournament_repository
+        countries = get_tournament_repository().team_names()
+    except Exception as e:
+        print(f"Error loading team names for the country gazetteer: {e}")
+    return CountryGazetteer(countries)
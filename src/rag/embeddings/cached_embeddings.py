@@ -0,0 +1,135 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent.parent / "embedding_cache.sqlite"
+
+
+def normalize_text(text: str) -> str:
+    """Normalize the unicode form and whitespace of a text, so that equivalent strings share a cache key."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper caching the vectors of an embedding model.
+
+    Vectors are keyed on the model id and the normalized text, kept in an in-memory LRU and
+    persisted to a SQLite file, so that repeated questions and re-indexed chunks that did not
+    change are never sent to the model again, even across restarts. Set `path` to None to only
+    cache in memory.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_id: str, max_entries: int = None, path: Optional[str] = ""):
+        self.embeddings = embeddings
+        self.model_id = model_id
+        self.max_entries = int(max_entries if max_entries is not None else os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 10000))
+        if path == "":
+            path = os.getenv("EMBEDDING_CACHE_PATH", str(DEFAULT_CACHE_PATH))
+        self.path = path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._connection = None
+        if path:
+            try:
+                self._connection = sqlite3.connect(path, check_same_thread=False)
+                self._connection.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+                self._connection.commit()
+            except sqlite3.Error as e:
+                print(f"Error opening the embedding cache {path}: {e}")
+                self._connection = None
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        vector = self._get([key]).get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self._put({key: vector})
+        return list(vector)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        found = self._get(keys)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing, vectors))
+            self._put(computed)
+            found.update(computed)
+        return [list(found[key]) for key in keys]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._memory_hits + self._disk_hits + self._misses
+            return {
+                "model": self.model_id,
+                "entries": len(self._entries),
+                "memory_hits": self._memory_hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_rate": (self._memory_hits + self._disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_id}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _get(self, keys: List[str]) -> dict:
+        """Return the cached vectors of the keys, from memory first and then from disk."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[key] = self._entries[key]
+            self._memory_hits += len(found)
+            on_disk = [key for key in dict.fromkeys(keys) if key not in found]
+            if on_disk and self._connection is not None:
+                try:
+                    for start in range(0, len(on_disk), 500):
+                        batch = on_disk[start:start + 500]
+                        rows = self._connection.execute(
+                            f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                        ).fetchall()
+                        for key, blob in rows:
+                            found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+                            self._remember(key, found[key])
+                            self._disk_hits += 1
+                except sqlite3.Error as e:
+                    print(f"Error reading the embedding cache: {e}")
+            self._misses += len([key for key in dict.fromkeys(keys) if key not in found])
+        return found
+
+    def _put(self, vectors: dict):
+        with self._lock:
+            for key, vector in vectors.items():
+                self._remember(key, list(vector))
+            if self._connection is not None:
+                try:
+                    self._connection.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                        [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in vectors.items()],
+                    )
+                    self._connection.commit()
+                except sqlite3.Error as e:
+                    print(f"Error writing the embedding cache: {e}")
+
+    def _remember(self, key: str, vector: List[float]):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
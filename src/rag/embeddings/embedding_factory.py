@@ -2,34 +2,110 @@ import json
 import os
 from pathlib import Path
 
+from rag.embeddings.cached_embeddings import CachedEmbeddings
+from rag.embeddings.truncated_embeddings import TruncatedEmbeddings
+from services.metrics import register_metrics
+
+OPENAI_MODEL = "text-embedding-3-large"
+
+# Full dimension of the Matryoshka models, whose vectors can be truncated to fewer dimensions.
+MATRYOSHKA_MODELS = {
+    "text-embedding-3-large": 3072,
+    "text-embedding-3-small": 1536,
+    "mxbai-embed-large": 1024,
+    "nomic-embed-text": 768,
+}
+
 class EmbeddingFactory:
-    """Factory class for creating embedding model"""
+    """
+    Factory class for creating embedding model
 
-    def __init__(self,  embedding_type: str, config_path: str = "../../config/config.json"):
+    `dimensions` (or `EMBEDDING_DIMENSIONS`, or "dimensions" in the params of the model config) asks
+    a Matryoshka model for shorter vectors, e.g. 256, 512 or 1024: OpenAI returns them directly, the
+    vectors of Ollama models are truncated and renormalized.
+    """
+
+    def __init__(self,  embedding_type: str, config_path: str = "../../config/config.json", dimensions: int = None):
         self.embedding_type = embedding_type
         self.config_path = Path(__file__).resolve().parent.parent.parent / "config" / "config.json"
+        self._requested_dimensions = dimensions
         self.embedding_registry = {
             "openai": self._create_openai_embedding,
             "ollama": self._create_ollama_embedding,
         }
 
-    def create_embedding(self):
-        """Create an embedding model based on the type."""
+    def create_embedding(self, cached: bool = None):
+        """
+        Create an embedding model based on the type.
+
+        Unless `cached` is False (or `EMBEDDING_CACHE` is "false"), the model is wrapped in a
+        `CachedEmbeddings`, keyed on the model id, so identical texts are only embedded once.
+        """
         if self.embedding_type not in self.embedding_registry:
             raise ValueError(f"Unknown embedding type: {self.embedding_type}")
-        return self.embedding_registry[self.embedding_type]()
+        embedding = self.embedding_registry[self.embedding_type]()
+        cached = cached if cached is not None else os.getenv("EMBEDDING_CACHE", "true").lower() == "true"
+        if not cached:
+            return embedding
+        embedding = CachedEmbeddings(embedding, self.model_id())
+        register_metrics("embedding_cache", embedding.stats)
+        return embedding
+
+    def model_id(self) -> str:
+        """
+        Identifier of the configured embedding model, e.g. "ollama:mxbai-embed-large", or
+        "openai:text-embedding-3-large@256" for vectors truncated to 256 dimensions.
+        """
+        model = OPENAI_MODEL if self.embedding_type == "openai" else self._get_config().get("model")
+        dimensions = self.dimensions()
+        return f"{self.embedding_type}:{model}" + (f"@{dimensions}" if dimensions else "")
+
+    def dimensions(self):
+        """
+        Return the requested dimension of the vectors, or None for the full vectors of the model.
+
+        Raises:
+            ValueError: When the model is not a Matryoshka model or has fewer dimensions than requested.
+        """
+        dimensions = self._requested_dimensions
+        if dimensions is None:
+            dimensions = os.getenv("EMBEDDING_DIMENSIONS") or self._config_params().get("dimensions")
+        if not dimensions:
+            return None
+        dimensions = int(dimensions)
+        model = OPENAI_MODEL if self.embedding_type == "openai" else self._get_config().get("model", "")
+        full_dimension = MATRYOSHKA_MODELS.get(model.split(":")[0])
+        if full_dimension is None:
+            raise ValueError(f"The embedding model {model} cannot be truncated to {dimensions} dimensions.")
+        if not 0 < dimensions <= full_dimension:
+            raise ValueError(f"The embedding model {model} has {full_dimension} dimensions, {dimensions} requested.")
+        return dimensions if dimensions < full_dimension else None
 
     def _create_openai_embedding(self):
         """Create an OpenAI embedding model."""
         from langchain_openai import OpenAIEmbeddings
-        return OpenAIEmbeddings(model="text-embedding-3-large", openai_api_key=os.getenv("OPENAI_API_KEY"))
+        dimensions = self.dimensions()
+        if dimensions:
+            return OpenAIEmbeddings(model=OPENAI_MODEL, dimensions=dimensions, openai_api_key=os.getenv("OPENAI_API_KEY"))
+        return OpenAIEmbeddings(model=OPENAI_MODEL, openai_api_key=os.getenv("OPENAI_API_KEY"))
 
     def _create_ollama_embedding(self):
         """Create an Ollama embedding model."""
         from langchain_ollama import OllamaEmbeddings
 
         # Create the Ollama embedding model
-        return OllamaEmbeddings(**self._get_config())
+        params = {key: value for key, value in self._get_config().items() if key != "dimensions"}
+        dimensions = self.dimensions()
+        if dimensions:
+            return TruncatedEmbeddings(OllamaEmbeddings(**params), dimensions)
+        return OllamaEmbeddings(**params)
+
+    def _config_params(self):
+        """The params of the model config, or {} when the config file has none for this type."""
+        try:
+            return self._get_config()
+        except (OSError, ValueError):
+            return {}
 
     def _get_config(self):
         """Get the config from the config file."""
@@ -0,0 +1,33 @@
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+def truncate(vectors, dimensions: int) -> np.ndarray:
+    """Keep the first `dimensions` components of the vectors and scale them back to unit length."""
+    vectors = np.asarray(vectors, dtype=np.float32)[..., :dimensions]
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+class TruncatedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper shortening the vectors of a Matryoshka model to their first `dimensions` components.
+
+    Matryoshka models are trained so that the leading components of their vectors are an embedding
+    on their own; truncating the vectors of any other model loses most of their meaning. Used for
+    models that cannot return shorter vectors themselves, e.g. through Ollama.
+    """
+
+    def __init__(self, embeddings: Embeddings, dimensions: int):
+        self.embeddings = embeddings
+        self.dimensions = dimensions
+
+    def embed_query(self, text: str) -> List[float]:
+        return truncate(self.embeddings.embed_query(text), self.dimensions).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return truncate(self.embeddings.embed_documents(texts), self.dimensions).tolist()
@@ -0,0 +1,53 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+from langchain_core.documents import Document
+
+from rag.bm25_index import BM25Index, reciprocal_rank_fusion
+from rag.relevance_grader import lexical_overlap
+from rag.vector_stores.base_store import BaseStore
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("RAG_HYBRID_WORKERS", 8)), thread_name_prefix="dense-search")
+
+
+def has_sparse_index(store: BaseStore) -> bool:
+    """Return True when the store keeps a non-empty BM25 index of its chunks."""
+    sparse_index = getattr(store, "sparse_index", None)
+    return isinstance(sparse_index, BM25Index) and len(sparse_index) > 0
+
+
+class HybridSearcher:
+    """
+    Searches the dense index of a store and its BM25 index in parallel and merges them with reciprocal-rank fusion.
+
+    The returned scores stay comparable with dense search: a document keeps its dense relevance
+    score, or the share of the query words it contains when only BM25 found it, whichever is higher.
+    """
+
+    def __init__(self, store: BaseStore, rrf_k: int = None, fetch_k: int = None):
+        self.store = store
+        self.rrf_k = int(rrf_k if rrf_k is not None else os.getenv("RAG_RRF_K", 60))
+        self.fetch_k = int(fetch_k if fetch_k is not None else os.getenv("RAG_HYBRID_FETCH_K", 20))
+
+    def search_with_scores(self, query: str, top_k: int = 5, filter: dict = None) -> List[Tuple[Document, float]]:
+        fetch_k = max(top_k, self.fetch_k)
+        dense_future = _executor.submit(self.store.search_with_scores, query, top_k=fetch_k, filter=filter)
+        sparse = self.store.sparse_index.search(query, top_k=fetch_k, filter=filter)
+        return self._fuse(query, dense_future.result(), sparse, top_k)
+
+    def search_batch(self, queries: List[str], top_k: int = 5, filter: dict = None) -> List[List[Tuple[Document, float]]]:
+        """Search several queries, with one batched dense search of the store."""
+        fetch_k = max(top_k, self.fetch_k)
+        dense_future = _executor.submit(self.store.search_batch, queries, top_k=fetch_k, filter=filter)
+        sparse = [self.store.sparse_index.search(query, top_k=fetch_k, filter=filter) for query in queries]
+        return [self._fuse(query, dense, query_sparse, top_k)
+                for query, dense, query_sparse in zip(queries, dense_future.result(), sparse)]
+
+    def _fuse(self, query: str, dense, sparse, top_k: int) -> List[Tuple[Document, float]]:
+        dense_scores = {doc.id or doc.page_content: score for doc, score in dense}
+        fused = reciprocal_rank_fusion([[doc for doc, _ in dense], [doc for doc, _ in sparse]], k=self.rrf_k)
+        return [
+            (doc, max(dense_scores.get(doc.id or doc.page_content, 0.0), lexical_overlap(query, doc.page_content)))
+            for doc, _ in fused[:top_k]
+        ]
@@ -0,0 +1,296 @@
+"""
+Streaming ingestion of source documents into the vector store.
+
+Source files are read one at a time and split into chunks. Each chunk's id is the hash of its
+content and metadata, so chunks that are already in the store are skipped. New chunks are
+embedded in batches, with a bounded number of batches in flight, and upserted. Every few batches
+the checkpoint of the ingested hashes is committed, with the embeddings of the new chunks for
+stores saved locally, which are only saved once at the end: an interrupted run replays those
+embeddings and resumes where it stopped. Chunks that disappeared from a re-ingested source are
+deleted from the store.
+
+Sources are .txt and .md files, or .json/.jsonl files of {"page_content": ..., "metadata": {...}}
+records, e.g. to set the "country" of the chunks.
+
+Usage:
+    python -m rag.ingestion --source data/ --database src/rag/euro2025 [--batch-size 64] [--concurrency 4]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Set
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from rag.embeddings.cached_embeddings import normalize_text
+from rag.vector_stores.base_store import BaseStore, ReadOnlyStoreError
+
+logger = logging.getLogger(__name__)
+
+SOURCE_SUFFIXES = {".txt", ".md", ".json", ".jsonl"}
+
+
+def iter_source_documents(paths: Iterable[str]) -> Iterator[Document]:
+    """Yield the documents of the source files, reading directories recursively in name order."""
+    for path in map(Path, paths):
+        files = sorted(file for file in path.rglob("*") if file.suffix in SOURCE_SUFFIXES) if path.is_dir() else [path]
+        for file in files:
+            if file.suffix in (".json", ".jsonl"):
+                with open(file, encoding="utf-8") as f:
+                    records = [json.loads(line) for line in f if line.strip()] if file.suffix == ".jsonl" else json.load(f)
+                for record in records if isinstance(records, list) else [records]:
+                    text = record.get("page_content") or record.get("text", "")
+                    yield Document(page_content=text, metadata={"source": str(file), **record.get("metadata", {})})
+            else:
+                yield Document(page_content=file.read_text(encoding="utf-8"), metadata={"source": str(file)})
+
+
+def content_hash(text: str, metadata: dict) -> str:
+    """Stable id of a chunk: the hash of its normalized text and its metadata."""
+    key = normalize_text(text) + "\0" + json.dumps(metadata, sort_keys=True, default=str)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def chunk_documents(documents: Iterable[Document], splitter) -> Iterator[Document]:
+    """Split the documents into chunks whose ids are their content hashes."""
+    for document in documents:
+        for text in splitter.split_text(document.page_content):
+            yield Document(id=content_hash(text, document.metadata), page_content=text, metadata=dict(document.metadata))
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class IngestionCheckpoint:
+    """
+    SQLite record of the chunks upserted to the store, by content hash and source.
+
+    For stores saved locally, the chunks are journaled with their embeddings until the store is
+    saved, so the checkpoint never lists chunks the store lost in a crash: they are replayed instead.
+    Records are only committed with `commit`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS chunks (hash TEXT PRIMARY KEY, source TEXT NOT NULL)")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS pending (hash TEXT PRIMARY KEY, page_content TEXT NOT NULL, metadata TEXT NOT NULL, vector BLOB NOT NULL)"
+        )
+        self._connection.commit()
+
+    def __contains__(self, chunk_hash: str) -> bool:
+        return self._connection.execute("SELECT 1 FROM chunks WHERE hash = ?", (chunk_hash,)).fetchone() is not None
+
+    def record(self, chunks: List[Document], embeddings=None):
+        """Record upserted chunks, journaling their embeddings when given until `clear_pending`."""
+        self._connection.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?)",
+                                     ((chunk.id, chunk.metadata.get("source", "")) for chunk in chunks))
+        if embeddings is not None:
+            vectors = np.asarray(embeddings, dtype=np.float32)
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO pending VALUES (?, ?, ?, ?)",
+                ((chunk.id, chunk.page_content, json.dumps(chunk.metadata), vector.tobytes()) for chunk, vector in zip(chunks, vectors)),
+            )
+
+    def pending(self):
+        """Return the journaled chunks and their embeddings, not saved with the store yet."""
+        rows = self._connection.execute("SELECT hash, page_content, metadata, vector FROM pending ORDER BY rowid").fetchall()
+        chunks = [Document(id=chunk_hash, page_content=text, metadata=json.loads(metadata)) for chunk_hash, text, metadata, _ in rows]
+        return chunks, np.array([np.frombuffer(row[3], dtype=np.float32) for row in rows])
+
+    def clear_pending(self):
+        self._connection.execute("DELETE FROM pending")
+
+    def hashes_of(self, source: str) -> Set[str]:
+        return {row[0] for row in self._connection.execute("SELECT hash FROM chunks WHERE source = ?", (source,))}
+
+    def forget(self, hashes: Iterable[str]):
+        hashes = [(chunk_hash,) for chunk_hash in hashes]
+        self._connection.executemany("DELETE FROM chunks WHERE hash = ?", hashes)
+        self._connection.executemany("DELETE FROM pending WHERE hash = ?", hashes)
+
+    def commit(self):
+        self._connection.commit()
+
+    def close(self):
+        self._connection.close()
+
+
+@dataclass
+class IngestionReport:
+    chunks: int = 0
+    added: int = 0
+    unchanged: int = 0
+    duplicates: int = 0
+    removed: int = 0
+    seconds: float = 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (f"Read {self.chunks} chunks in {self.seconds:.1f}s ({self.chunks_per_second:.1f} chunks/s): "
+                f"{self.added} added, {self.unchanged} unchanged, {self.duplicates} duplicates, {self.removed} removed")
+
+
+class IngestionPipeline:
+    """
+    Ingest a stream of documents into a store: chunk, skip unchanged chunks, embed in batches and upsert.
+
+    Args:
+        store (BaseStore): The store to upsert the chunks to.
+        checkpoint (IngestionCheckpoint): The record of the chunks already in the store.
+        database_name (str): Where the store is saved at the end of the run, for stores saved locally.
+        batch_size (int): Number of chunks per embedding request.
+        concurrency (int): Maximum number of embedding requests in flight.
+        checkpoint_every (int): Number of upserted batches between two commits of the checkpoint.
+        splitter: The text splitter, by default a recursive character splitter of INGEST_CHUNK_SIZE
+            characters with INGEST_CHUNK_OVERLAP characters of overlap.
+    """
+
+    def __init__(self, store: BaseStore, checkpoint: IngestionCheckpoint, database_name: str = None, batch_size: int = None,
+                 concurrency: int = None, checkpoint_every: int = None, splitter=None):
+        self.store = store
+        self.checkpoint = checkpoint
+        self.database_name = database_name
+        self.batch_size = int(batch_size if batch_size is not None else os.getenv("INGEST_BATCH_SIZE", 64))
+        self.concurrency = int(concurrency if concurrency is not None else os.getenv("INGEST_CONCURRENCY", 4))
+        self.checkpoint_every = int(checkpoint_every if checkpoint_every is not None else os.getenv("INGEST_CHECKPOINT_EVERY", 50))
+        self.splitter = splitter or RecursiveCharacterTextSplitter(
+            chunk_size=int(os.getenv("INGEST_CHUNK_SIZE", 1000)), chunk_overlap=int(os.getenv("INGEST_CHUNK_OVERLAP", 150))
+        )
+
+    def run(self, documents: Iterable[Document]) -> IngestionReport:
+        """Ingest the documents and return the counts and throughput of the run."""
+        report = IngestionReport()
+        start = time.perf_counter()
+        self._replay()
+        seen: Dict[str, Set[str]] = defaultdict(set)
+        pending = deque()
+        batches = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for batch in batched(self._new_chunks(documents, seen, report), self.batch_size):
+                texts = [chunk.page_content for chunk in batch]
+                pending.append((batch, executor.submit(self.store.embedding_model.embed_documents, texts)))
+                if len(pending) < self.concurrency:
+                    continue
+                self._upsert(*pending.popleft(), report)
+                batches += 1
+                if batches % self.checkpoint_every == 0:
+                    self._checkpoint(report, start)
+            while pending:
+                self._upsert(*pending.popleft(), report)
+        report.removed = self._remove_stale(seen)
+        self._save(report, start)
+        report.seconds = time.perf_counter() - start
+        return report
+
+    def _new_chunks(self, documents: Iterable[Document], seen: Dict[str, Set[str]], report: IngestionReport) -> Iterator[Document]:
+        for chunk in chunk_documents(documents, self.splitter):
+            report.chunks += 1
+            hashes = seen[chunk.metadata.get("source", "")]
+            if chunk.id in hashes:
+                report.duplicates += 1
+            elif chunk.id in self.checkpoint:
+                report.unchanged += 1
+            else:
+                yield chunk
+            hashes.add(chunk.id)
+
+    def _replay(self):
+        """Upsert the chunks journaled by an interrupted run, which the saved store does not contain yet."""
+        if not self.database_name:
+            return
+        chunks, vectors = self.checkpoint.pending()
+        if chunks:
+            logger.info(f"Replaying {len(chunks)} chunks embedded by an interrupted run")
+            self.store.add_embeddings(chunks, vectors)
+
+    def _upsert(self, batch: List[Document], embeddings, report: IngestionReport):
+        vectors = embeddings.result()
+        self.store.add_embeddings(batch, vectors)
+        self.checkpoint.record(batch, vectors if self.database_name else None)
+        report.added += len(batch)
+
+    def _remove_stale(self, seen: Dict[str, Set[str]]) -> int:
+        """Delete the chunks of the re-ingested sources that are no longer in them."""
+        removed = 0
+        for source, hashes in seen.items():
+            stale = self.checkpoint.hashes_of(source) - hashes
+            if not stale:
+                continue
+            try:
+                self.store.delete(sorted(stale))
+            except ReadOnlyStoreError:
+                logger.warning(f"{len(stale)} outdated chunks of {source} are kept: the store is read-only.")
+                continue
+            self.checkpoint.forget(stale)
+            removed += len(stale)
+        return removed
+
+    def _save(self, report: IngestionReport, start: float):
+        """Save the store once, at the end of the run, and empty the journal it now contains."""
+        if self.database_name:
+            self.store.save_data_base(self.database_name)
+            self.checkpoint.clear_pending()
+        self._checkpoint(report, start)
+
+    def _checkpoint(self, report: IngestionReport, start: float):
+        # Only the new hashes and embeddings are written: rewriting the whole store at every
+        # checkpoint would make large ingestions quadratic.
+        self.checkpoint.commit()
+        elapsed = time.perf_counter() - start
+        logger.info(f"Checkpoint: {report.chunks} chunks read, {report.added} added, {report.chunks / elapsed:.1f} chunks/s")
+
+
+def main():
+    from dotenv import load_dotenv
+
+    from rag.embeddings.embedding_factory import EmbeddingFactory
+    from rag.vector_stores.store_factory import StoreFactory
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", nargs="+", required=True, help="Source files or directories.")
+    parser.add_argument("--database", help="Directory of the FAISS store, created if it does not exist.")
+    parser.add_argument("--checkpoint", help="Checkpoint file, by default <database>.ingestion.sqlite.")
+    parser.add_argument("--batch-size", type=int, help="Chunks per embedding request.")
+    parser.add_argument("--concurrency", type=int, help="Maximum embedding requests in flight.")
+    parser.add_argument("--checkpoint-every", type=int, help="Batches between two checkpoints.")
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    store_type = os.getenv("STORE_TYPE", "faiss")
+    if store_type == "faiss" and not args.database:
+        parser.error("--database is required for FAISS stores")
+    embedding_factory = EmbeddingFactory(os.getenv("EMBEDDING_MODEL"))
+    store = StoreFactory(store_type, embedding_factory.create_embedding(), embedding_factory.model_id()).get_store()
+    if store_type == "faiss" and Path(args.database).exists():
+        store.load_vector_store(args.database, writable=True)
+    checkpoint = IngestionCheckpoint(args.checkpoint or f"{args.database or os.getenv('PINECONE_INDEX')}.ingestion.sqlite")
+    try:
+        pipeline = IngestionPipeline(store, checkpoint, args.database if store_type == "faiss" else None,
+                                     args.batch_size, args.concurrency, args.checkpoint_every)
+        print(pipeline.run(iter_source_documents(args.source)))
+    finally:
+        checkpoint.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import threading
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from services.metrics import register_metrics
+
+
+class RAGMetrics:
+    """Accumulates call latency and concurrency statistics of the agentic RAG."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._builds = [0, 0.0, 0.0]
+        self._calls = [0, 0.0, 0.0]
+        self._in_flight = 0
+        self._max_in_flight = 0
+        self._counters = {}
+        self._distributions = {}
+
+    def record_build(self, seconds: float):
+        self._record(self._builds, seconds)
+
+    def increment(self, name: str, value: int = 1):
+        """Increment a named counter, e.g. the number of questions served without an LLM call."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float):
+        """Record a value of a named distribution, e.g. the number of documents kept by a retrieval."""
+        with self._lock:
+            bucket = self._distributions.setdefault(name, [0, 0.0, 0.0])
+            bucket[0] += 1
+            bucket[1] += value
+            bucket[2] = max(bucket[2], value)
+
+    def call_started(self):
+        with self._lock:
+            self._in_flight += 1
+            self._max_in_flight = max(self._max_in_flight, self._in_flight)
+
+    def call_finished(self, seconds: float):
+        with self._lock:
+            self._in_flight -= 1
+        self._record(self._calls, seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "graph_builds": self._summary(self._builds),
+                "calls": self._summary(self._calls),
+                "in_flight": self._in_flight,
+                "max_in_flight": self._max_in_flight,
+                "counters": dict(self._counters),
+                "distributions": {
+                    name: {"count": count, "avg": total / count, "max": maximum}
+                    for name, (count, total, maximum) in self._distributions.items()
+                },
+            }
+
+    def _record(self, bucket, seconds):
+        with self._lock:
+            bucket[0] += 1
+            bucket[1] += seconds
+            bucket[2] = max(bucket[2], seconds)
+
+    @staticmethod
+    def _summary(bucket) -> dict:
+        count, total, maximum = bucket
+        return {
+            "count": count,
+            "total_ms": total * 1000,
+            "avg_ms": total * 1000 / count if count else 0.0,
+            "max_ms": maximum * 1000,
+        }
+
+
+class LLMCallCounter(BaseCallbackHandler):
+    """Callback handler counting the language model calls of a run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        with self._lock:
+            self.calls += 1
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        with self._lock:
+            self.calls += 1
+
+
+rag_metrics = RAGMetrics()
+register_metrics("agentic_rag", rag_metrics.stats)
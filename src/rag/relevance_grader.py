@@ -0,0 +1,130 @@
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from rag.country_gazetteer import normalize
+
+GENERATE = "generate"
+REWRITE = "rewrite"
+
+STOPWORDS = {
+    "a", "about", "an", "and", "any", "are", "as", "at", "be", "by", "can", "did", "do", "does", "for", "from", "has",
+    "have", "how", "i", "in", "is", "it", "its", "me", "of", "on", "or", "say", "tell", "that", "the", "their", "there",
+    "this", "to", "was", "were", "what", "when", "where", "which", "who", "why", "will", "with", "you", "your",
+}
+
+
+def content_tokens(text: str) -> List[str]:
+    """Return the normalized words of a text, without stopwords."""
+    return [token for token in re.findall(r"\w+", normalize(text)) if token not in STOPWORDS and len(token) > 1]
+
+
+def lexical_overlap(question: str, text: str) -> float:
+    """Return the share of the content words of the question that appear in the text."""
+    question_tokens = set(content_tokens(question))
+    if not question_tokens:
+        return 0.0
+    return len(question_tokens & set(content_tokens(text))) / len(question_tokens)
+
+
+@dataclass
+class GradeSignal:
+    vector_score: float
+    lexical_score: float
+    combined: float
+
+
+class ScoreGrader:
+    """
+    Grades retrieved documents from their vector relevance scores and their lexical overlap with the question.
+
+    The combined signal is compared to `threshold`. Signals within `margin` of the threshold are
+    borderline: no decision is taken and the caller falls back to the LLM grader.
+    """
+
+    def __init__(self, threshold: float = None, margin: float = None, lexical_weight: float = None):
+        self.threshold = float(threshold if threshold is not None else os.getenv("RAG_SCORE_THRESHOLD", 0.5))
+        self.margin = float(margin if margin is not None else os.getenv("RAG_SCORE_BORDERLINE_MARGIN", 0.1))
+        self.lexical_weight = float(lexical_weight if lexical_weight is not None else os.getenv("RAG_LEXICAL_WEIGHT", 0.3))
+
+    def signal(self, question: str, documents: Sequence[str], scores: Sequence[float]) -> GradeSignal:
+        """Combine the best vector relevance score with the lexical overlap of the question and the documents."""
+        vector_score = max(scores) if scores else 0.0
+        lexical_score = lexical_overlap(question, "\n".join(documents))
+        combined = (1 - self.lexical_weight) * vector_score + self.lexical_weight * lexical_score
+        return GradeSignal(vector_score=vector_score, lexical_score=lexical_score, combined=combined)
+
+    def decide(self, signal: GradeSignal) -> Optional[str]:
+        """Return "generate" or "rewrite", or None when the signal is borderline."""
+        if signal.combined >= self.threshold + self.margin:
+            return GENERATE
+        if signal.combined < self.threshold - self.margin:
+            return REWRITE
+        return None
+
+
+@dataclass
+class CalibrationReport:
+    samples: int
+    llm_relevant_rate: float
+    current_threshold: float
+    current_agreement: float
+    threshold: float
+    agreement: float
+    margin: float
+    borderline_rate: float
+    agreement_outside_band: float
+
+    def describe(self) -> str:
+        return "\n".join([
+            f"Samples: {self.samples} ({self.llm_relevant_rate:.1%} graded relevant by the LLM)",
+            f"Current threshold {self.current_threshold:.3f}: {self.current_agreement:.1%} agreement with the LLM grader",
+            f"Best threshold {self.threshold:.3f}: {self.agreement:.1%} agreement with the LLM grader",
+            f"With a borderline margin of {self.margin:.3f}: {self.borderline_rate:.1%} of the questions go to the LLM grader, "
+            f"{self.agreement_outside_band:.1%} agreement on the others",
+            f"Suggested settings: RAG_SCORE_THRESHOLD={self.threshold:.3f} RAG_SCORE_BORDERLINE_MARGIN={self.margin:.3f}",
+        ])
+
+
+def calibrate(samples: Sequence[Tuple[float, float]], relevance_threshold: float = None, current_threshold: float = None,
+              margin: float = None) -> CalibrationReport:
+    """
+    Find the score threshold that best agrees with the LLM grader.
+
+    Args:
+        samples (list[tuple]): (combined score signal, LLM confidence) pairs for the same retrievals.
+        relevance_threshold (float): The LLM confidence above which documents are relevant, `RAG_RELEVANCE_THRESHOLD` by default.
+        current_threshold (float): The score threshold currently configured, `RAG_SCORE_THRESHOLD` by default.
+        margin (float): The borderline margin to evaluate, `RAG_SCORE_BORDERLINE_MARGIN` by default.
+
+    Returns:
+        CalibrationReport: The agreement of the current and best thresholds, and the effect of the borderline band.
+    """
+    if not samples:
+        raise ValueError("At least one sample is needed to calibrate the grader.")
+    relevance_threshold = float(relevance_threshold if relevance_threshold is not None else os.getenv("RAG_RELEVANCE_THRESHOLD", 0.7))
+    grader = ScoreGrader(threshold=current_threshold, margin=margin)
+    signals = np.array([signal for signal, _ in samples], dtype=float)
+    labels = np.array([confidence > relevance_threshold for _, confidence in samples])
+
+    values = np.unique(signals)
+    candidates = np.concatenate([[values[0] - 1e-6], (values[:-1] + values[1:]) / 2, [values[-1] + 1e-6]])
+    agreements = ((signals[None, :] >= candidates[:, None]) == labels[None, :]).mean(axis=1)
+    best = candidates[int(np.argmax(agreements))]
+
+    outside = np.abs(signals - best) >= grader.margin
+    agreement_outside = float(((signals[outside] >= best) == labels[outside]).mean()) if outside.any() else 1.0
+    return CalibrationReport(
+        samples=len(samples),
+        llm_relevant_rate=float(labels.mean()),
+        current_threshold=grader.threshold,
+        current_agreement=float(((signals >= grader.threshold) == labels).mean()),
+        threshold=float(best),
+        agreement=float(agreements.max()),
+        margin=grader.margin,
+        borderline_rate=float(1 - outside.mean()),
+        agreement_outside_band=agreement_outside,
+    )
@@ -0,0 +1,184 @@
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+PartitionKey = Tuple[str, Tuple[str, ...]]
+
+
+def partition_key(language: Optional[str], countries: Iterable[str]) -> PartitionKey:
+    """Key of the cache partition of a question: its language and the countries it mentions."""
+    return (language or "").lower(), tuple(sorted({country.lower() for country in countries or ()}))
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    answer: str
+    vector: np.ndarray
+    created: float
+
+
+class _Partition:
+    """HNSW index over the cached questions of one partition, with lazy deletion."""
+
+    def __init__(self, dimension: int, neighbours: int):
+        self.index = faiss.IndexHNSWFlat(dimension, neighbours, faiss.METRIC_INNER_PRODUCT)
+        self.neighbours = neighbours
+        self.positions = []  # Entry id of each vector of the index, None once removed.
+        self.entries: Dict[int, CachedAnswer] = {}
+
+    def add(self, entry_id: int, entry: CachedAnswer):
+        self.entries[entry_id] = entry
+        self.positions.append(entry_id)
+        self.index.add(entry.vector[None, :])
+
+    def remove(self, entry_id: int):
+        self.entries.pop(entry_id, None)
+        # HNSW indexes do not support removal: rebuild once removed vectors outnumber live ones.
+        if len(self.positions) - len(self.entries) > max(len(self.entries), 16):
+            live = list(self.entries.items())
+            self.index = faiss.IndexHNSWFlat(self.index.d, self.neighbours, faiss.METRIC_INNER_PRODUCT)
+            self.positions = []
+            self.entries = {}
+            for live_id, live_entry in live:
+                self.add(live_id, live_entry)
+
+    def search(self, vector: np.ndarray, k: int):
+        """Yield the (entry id, similarity) of the nearest live cached questions, most similar first."""
+        k = min(k + len(self.positions) - len(self.entries), len(self.positions))
+        if k == 0:
+            return
+        similarities, positions = self.index.search(vector[None, :], k)
+        for similarity, position in zip(similarities[0], positions[0]):
+            if position >= 0 and self.positions[position] in self.entries:
+                yield self.positions[position], float(similarity)
+
+
+class SemanticAnswerCache:
+    """
+    Caches generated answers keyed by the embedding of the question.
+
+    Questions are partitioned by language and mentioned countries, so that "Who scored for Spain?"
+    never answers "Who scored for Italy?" however close their embeddings are. Within a partition,
+    a question hits the cache when its cosine similarity to a cached question reaches `threshold`.
+    Entries expire after `ttl_seconds`, and the least recently used ones are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, threshold: float = None, ttl_seconds: float = None, max_entries: int = None,
+                 clock=time.monotonic):
+        self.threshold = float(threshold if threshold is not None else os.getenv("RAG_ANSWER_CACHE_THRESHOLD", 0.92))
+        self.ttl_seconds = float(ttl_seconds if ttl_seconds is not None else os.getenv("RAG_ANSWER_CACHE_TTL_SECONDS", 3600))
+        self.max_entries = int(max_entries if max_entries is not None else os.getenv("RAG_ANSWER_CACHE_MAX_ENTRIES", 2000))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._partitions: Dict[PartitionKey, _Partition] = {}
+        self._recency: "OrderedDict[int, PartitionKey]" = OrderedDict()
+        self._generation = None
+        self._hits = 0
+        self._misses = 0
+        self._expirations = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def lookup(self, embedding: Sequence[float], language: Optional[str], countries: Iterable[str],
+               generation: int = 0) -> Optional[str]:
+        """
+        Return the answer cached for a similar question of the same partition, or None.
+
+        Args:
+            embedding (list[float]): The embedding of the question.
+            language (str): The language of the question.
+            countries (list[str]): The countries mentioned in the question.
+            generation (int): The generation of the vector store; a new one invalidates the cache.
+
+        Returns:
+            str: The cached answer, or None on a miss.
+        """
+        vector = self._normalize(embedding)
+        key = partition_key(language, countries)
+        with self._lock:
+            self._check_generation(generation)
+            partition = self._partitions.get(key)
+            if partition is not None:
+                now = self._clock()
+                for entry_id, similarity in partition.search(vector, 4):
+                    entry = partition.entries[entry_id]
+                    if now - entry.created > self.ttl_seconds:
+                        self._remove(entry_id, key)
+                        self._expirations += 1
+                        continue
+                    if similarity < self.threshold:
+                        break
+                    self._recency.move_to_end(entry_id)
+                    self._hits += 1
+                    return entry.answer
+            self._misses += 1
+            return None
+
+    def store(self, question: str, embedding: Sequence[float], language: Optional[str], countries: Iterable[str],
+              answer: str, generation: int = 0):
+        """Cache the answer generated for a question."""
+        vector = self._normalize(embedding)
+        key = partition_key(language, countries)
+        with self._lock:
+            self._check_generation(generation)
+            partition = self._partitions.get(key)
+            if partition is None or partition.index.d != len(vector):
+                partition = self._partitions[key] = _Partition(len(vector), 16)
+            entry_id = next(self._ids)
+            partition.add(entry_id, CachedAnswer(question=question, answer=answer, vector=vector, created=self._clock()))
+            self._recency[entry_id] = key
+            while len(self._recency) > self.max_entries:
+                oldest_id, oldest_key = next(iter(self._recency.items()))
+                self._remove(oldest_id, oldest_key)
+                self._evictions += 1
+
+    def invalidate(self):
+        """Drop every cached answer, e.g. when the documents they were generated from changed."""
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._recency),
+                "partitions": len(self._partitions),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "expirations": self._expirations,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+    def _check_generation(self, generation):
+        if self._generation is not None and generation != self._generation and self._recency:
+            self._clear()
+        self._generation = generation
+
+    def _clear(self):
+        self._partitions.clear()
+        self._recency.clear()
+        self._invalidations += 1
+
+    def _remove(self, entry_id: int, key: PartitionKey):
+        self._recency.pop(entry_id, None)
+        partition = self._partitions[key]
+        partition.remove(entry_id)
+        if not partition.entries:
+            del self._partitions[key]
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -1,6 +1,31 @@
 from abc import ABC, abstractmethod
+from typing import List, NamedTuple, Sequence
+
+from langchain_core.documents import Document
+
+
+class SearchResult(NamedTuple):
+    """A retrieved document with its relevance score between 0 and 1, higher is more relevant."""
+    document: Document
+    score: float
+
+
+class ReadOnlyStoreError(Exception):
+    """Raised when adding or deleting documents in a store that was loaded read-only."""
+
 
 class BaseStore(ABC):
+    # Incremented whenever the content of the store changes, to invalidate anything derived from it.
+    generation = 0
+    # BM25 index over the same chunks, searched alongside the vector index by the hybrid retrieval.
+    sparse_index = None
+
+    def bump_generation(self):
+        """
+        Mark the content of the store as changed.
+        """
+        self.generation += 1
+
     @abstractmethod
     def add_documents(self, chunks):
         """
@@ -8,6 +33,13 @@ class BaseStore(ABC):
         """
         pass
 
+    def add_embeddings(self, chunks, embeddings):
+        """
+        Add chunks whose embeddings were already computed, e.g. in batches by the ingestion pipeline.
+        Stores that cannot take precomputed embeddings embed the chunks again.
+        """
+        self.add_documents(chunks)
+
     @abstractmethod
     def search(self, query_embedding, top_k=5):
         """
@@ -15,6 +47,24 @@ class BaseStore(ABC):
         """
         pass
 
+    @abstractmethod
+    def search_with_scores(self, query, top_k=5, filter=None):
+        """
+        Search for the most similar documents, with a relevance score between 0 and 1, higher is more relevant.
+        """
+        pass
+
+    def search_batch(self, queries: Sequence[str], top_k=5, filter=None) -> List[List[SearchResult]]:
+        """
+        Search several queries at once, e.g. the reformulations of a question or an evaluation set.
+        Stores that cannot batch the queries search them one by one.
+
+        Returns:
+            list[list[SearchResult]]: The results of each query, in the order of the queries, best first.
+        """
+        return [[SearchResult(doc, score) for doc, score in self.search_with_scores(query, top_k=top_k, filter=filter)]
+                for query in queries]
+
     @abstractmethod
     def delete(self, ids):
         """
@@ -0,0 +1,54 @@
+"""
+Build a FAISS vector store with the configured index type from an existing one.
+
+The vectors are read back from the source index, so nothing is embedded again: the new index
+is created and trained with the "vector_index" section of config/config.json (or the FAISS_*
+environment variables), filled in batches, and saved with the documents of the source, in the
+memory-mapped format unless FAISS_PERSISTENCE=pickle.
+
+Usage:
+    python -m rag.vector_stores.build_faiss_index --source euro2025 --output euro2025_hnsw [--type hnsw]
+"""
+import argparse
+import os
+import time
+
+import faiss
+from dotenv import load_dotenv
+from langchain_community.vectorstores import FAISS
+
+from rag.embeddings.embedding_factory import EmbeddingFactory
+from rag.vector_stores.faiss_index_factory import FAISSIndexFactory, IndexConfig, build_index
+from rag.vector_stores.faiss_persistence import read_vectors
+from rag.vector_stores.faiss_store import FAISSStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", required=True, help="Directory of the saved FAISS store to read the vectors from.")
+    parser.add_argument("--output", required=True, help="Directory to save the new FAISS store to.")
+    parser.add_argument("--type", help="Index type (flat, hnsw, ivf_flat, ivf_pq), instead of the configured one.")
+    args = parser.parse_args()
+
+    load_dotenv()
+    config = IndexConfig.from_config()
+    if args.type:
+        config.type = args.type.lower()
+    embedding_factory = EmbeddingFactory(os.getenv("EMBEDDING_MODEL"))
+    embedding_model = embedding_factory.create_embedding()
+    store = FAISSStore(embedding_model, config, model_id=embedding_factory.model_id())
+    store.load_vector_store(args.source)
+    source = store.vector_store
+
+    start = time.perf_counter()
+    vectors = read_vectors(source.index)
+    index = build_index(vectors, FAISSIndexFactory(config))
+    store.vector_store = FAISS(embedding_function=embedding_model, index=index, docstore=source.docstore,
+                               index_to_docstore_id=source.index_to_docstore_id)
+    store.save_data_base(args.output)
+    print(f"Built a {config.type} index of {index.ntotal} vectors of dimension {index.d} in {time.perf_counter() - start:.1f}s")
+    print(f"Index size: {len(faiss.serialize_index(index)) / 2**20:.1f} MiB (source vectors: {vectors.nbytes / 2**20:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import json
+import os
+from dataclasses import dataclass, fields
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent.parent / "config" / "config.json"
+
+# Minimum number of training vectors per IVF list recommended by FAISS.
+MIN_POINTS_PER_LIST = 39
+
+# Training vectors of the int8 scalar quantizer, which learns the range of every component.
+MIN_SQ_TRAINING_VECTORS = 1000
+
+# Enough vectors to train the IVF and PQ quantizers of corpora up to millions of chunks.
+MAX_TRAINING_VECTORS = 256 * 1024
+BATCH_SIZE = 65536
+
+# Scalar quantizers of the stored vectors: 2 bytes (fp16) or 1 byte (int8) per component instead of 4.
+QUANTIZERS = {"fp16": faiss.ScalarQuantizer.QT_fp16, "int8": faiss.ScalarQuantizer.QT_8bit}
+
+
+@dataclass
+class IndexConfig:
+    """Type and parameters of the FAISS index of the vector store."""
+    type: str = "flat"
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 64
+    nlist: int = 1024
+    nprobe: int = 16
+    pq_bytes: int = 64
+    pq_nbits: int = 8
+    quantization: str = "none"
+
+    @classmethod
+    def from_config(cls, config_path: Path = CONFIG_PATH) -> "IndexConfig":
+        """
+        Read the "vector_index" section of the config file, e.g. {"type": "hnsw", "params": {"hnsw_m": 32}}.
+
+        Every field can be overridden by an environment variable: FAISS_INDEX_TYPE, FAISS_HNSW_M,
+        FAISS_EF_CONSTRUCTION, FAISS_EF_SEARCH, FAISS_NLIST, FAISS_NPROBE, FAISS_PQ_BYTES, FAISS_PQ_NBITS,
+        FAISS_QUANTIZATION.
+        """
+        values = {}
+        try:
+            with open(config_path, "r") as f:
+                section = json.load(f).get("vector_index", {})
+            values = {"type": section.get("type", cls.type), **section.get("params", {})}
+        except (OSError, ValueError) as e:
+            print(f"Error reading the vector index config: {e}")
+        for field in fields(cls):
+            env_value = os.getenv(f"FAISS_{'INDEX_TYPE' if field.name == 'type' else field.name.upper()}")
+            if env_value is not None:
+                values[field.name] = env_value
+        config = cls(**{field.name: field.type(values[field.name]) for field in fields(cls) if field.name in values})
+        config.type = config.type.lower()
+        config.quantization = config.quantization.lower()
+        return config
+
+
+def describe_index(index) -> tuple:
+    """Return the (type, quantization) of an index, e.g. ("hnsw", "int8"), with the names of `IndexConfig`."""
+    qtypes = {qtype: name for name, qtype in QUANTIZERS.items()}
+    if isinstance(index, faiss.IndexHNSW):
+        storage = faiss.downcast_index(index.storage)
+        return "hnsw", qtypes.get(storage.sq.qtype) if isinstance(storage, faiss.IndexScalarQuantizer) else "none"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq", "pq"
+    if isinstance(index, faiss.IndexIVFScalarQuantizer):
+        return "ivf_flat", qtypes.get(index.sq.qtype)
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat", "none"
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        return "flat", qtypes.get(index.sq.qtype)
+    return "flat", "none"
+
+
+class FAISSIndexFactory:
+    """Factory class for creating the FAISS index of the vector store, from an `IndexConfig`."""
+
+    def __init__(self, config: IndexConfig = None):
+        self.config = config or IndexConfig.from_config()
+        self.index_registry = {
+            "flat": self._create_flat,
+            "hnsw": self._create_hnsw,
+            "ivf_flat": self._create_ivf_flat,
+            "ivf_pq": self._create_ivf_pq,
+        }
+
+    def create(self, dimension: int, training_size: int = None):
+        """
+        Create an empty index.
+
+        Args:
+            dimension (int): The dimension of the embeddings.
+            training_size (int): The number of vectors the index will be trained on, if known. The number
+                of IVF lists is capped so that each list gets enough training vectors.
+
+        Returns:
+            faiss.Index: The index, untrained for the IVF types and int8 quantization, whose per-component
+                ranges are learnt from the training vectors.
+        """
+        if self.config.type not in self.index_registry:
+            raise ValueError(f"Unknown index type: {self.config.type}")
+        if self.config.quantization != "none" and self.config.quantization not in QUANTIZERS:
+            raise ValueError(f"Unknown quantization: {self.config.quantization}")
+        index = self.index_registry[self.config.type](dimension, training_size)
+        self.configure(index)
+        return index
+
+    def configure(self, index):
+        """Apply the search-time parameters to an index, e.g. after loading it."""
+        if isinstance(index, faiss.IndexHNSW):
+            index.hnsw.efSearch = self.config.ef_search
+        elif isinstance(index, faiss.IndexIVF):
+            index.nprobe = min(self.config.nprobe, index.nlist)
+
+    def needs_training(self) -> bool:
+        """Return True when the configured index type learns from the vectors before they can be added."""
+        return self.config.type in ("ivf_flat", "ivf_pq") or (self.config.type != "ivf_pq" and self.config.quantization == "int8")
+
+    def min_training_vectors(self) -> int:
+        """Number of vectors to train the configured index type on with its full number of IVF lists and PQ centroids."""
+        needed = 0
+        if self.config.type in ("ivf_flat", "ivf_pq"):
+            needed = self.config.nlist * MIN_POINTS_PER_LIST
+        if self.config.type == "ivf_pq":
+            needed = max(needed, 2 ** self.config.pq_nbits * MIN_POINTS_PER_LIST)
+        elif self.config.quantization == "int8":
+            needed = max(needed, MIN_SQ_TRAINING_VECTORS)
+        return needed
+
+    @staticmethod
+    def train(index, vectors: np.ndarray):
+        """Train the index on the vectors, when its type needs training."""
+        if not index.is_trained:
+            index.train(np.ascontiguousarray(vectors, dtype=np.float32))
+
+    @property
+    def _qtype(self):
+        return QUANTIZERS.get(self.config.quantization)
+
+    def _create_flat(self, dimension, training_size):
+        if self._qtype is not None:
+            return faiss.IndexScalarQuantizer(dimension, self._qtype, faiss.METRIC_L2)
+        return faiss.IndexFlatL2(dimension)
+
+    def _create_hnsw(self, dimension, training_size):
+        if self._qtype is not None:
+            index = faiss.IndexHNSWSQ(dimension, self._qtype, self.config.hnsw_m)
+        else:
+            index = faiss.IndexHNSWFlat(dimension, self.config.hnsw_m)
+        index.hnsw.efConstruction = self.config.ef_construction
+        return index
+
+    def _nlist(self, training_size):
+        if training_size is None:
+            return self.config.nlist
+        return max(1, min(self.config.nlist, training_size // MIN_POINTS_PER_LIST))
+
+    def _create_ivf_flat(self, dimension, training_size):
+        if self._qtype is not None:
+            return faiss.IndexIVFScalarQuantizer(faiss.IndexFlatL2(dimension), dimension, self._nlist(training_size), self._qtype)
+        return faiss.IndexIVFFlat(faiss.IndexFlatL2(dimension), dimension, self._nlist(training_size))
+
+    def _create_ivf_pq(self, dimension, training_size):
+        # The product quantizer already compresses the vectors: `quantization` does not apply.
+        # Each PQ sub-quantizer encodes dimension / m components in one code of pq_nbits bits.
+        m = max(divisor for divisor in range(1, min(self.config.pq_bytes, dimension) + 1) if dimension % divisor == 0)
+        nbits = self.config.pq_nbits
+        if training_size is not None:
+            nbits = min(nbits, max(1, int(np.log2(max(training_size // MIN_POINTS_PER_LIST, 2)))))
+        return faiss.IndexIVFPQ(faiss.IndexFlatL2(dimension), dimension, self._nlist(training_size), m, nbits)
+
+
+def build_index(vectors: np.ndarray, factory: FAISSIndexFactory, seed: int = 0):
+    """Create, train and fill an index of the configured type with the vectors."""
+    training = vectors
+    if len(vectors) > MAX_TRAINING_VECTORS:
+        training = vectors[np.random.default_rng(seed).choice(len(vectors), MAX_TRAINING_VECTORS, replace=False)]
+    index = factory.create(vectors.shape[1], training_size=len(training))
+    factory.train(index, training)
+    for start in range(0, len(vectors), BATCH_SIZE):
+        index.add(np.ascontiguousarray(vectors[start:start + BATCH_SIZE]))
+    return index
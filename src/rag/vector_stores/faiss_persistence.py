@@ -0,0 +1,414 @@
+import json
+import math
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from collections.abc import Mapping
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+import faiss
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+
+from rag.bm25_index import BM25Index, matches_filter
+from rag.relevance_grader import content_tokens
+
+from .base_store import ReadOnlyStoreError
+from .faiss_index_factory import describe_index
+
+MANIFEST_FILE = "manifest.json"
+DOCSTORE_FILE = "docstore.sqlite"
+FLAT_VECTORS_FILE = "vectors.npy"
+INDEX_FILE = "vectors.faiss"
+PICKLE_INDEX_FILE = "index.faiss"
+BM25_POSTINGS_FILE = "bm25_postings.npy"
+BM25_FREQUENCIES_FILE = "bm25_frequencies.npy"
+BM25_LENGTHS_FILE = "bm25_lengths.npy"
+
+METRICS = {faiss.METRIC_L2: "l2", faiss.METRIC_INNER_PRODUCT: "ip"}
+
+
+def embedding_model_id(embedding_model) -> str:
+    """Identifier of an embedding model, e.g. "openai:text-embedding-3-large" for a `CachedEmbeddings`."""
+    model_id = getattr(embedding_model, "model_id", None)
+    if isinstance(model_id, str):
+        return model_id
+    model = getattr(embedding_model, "model", None)
+    return f"{type(embedding_model).__name__}:{model}" if isinstance(model, str) else type(embedding_model).__name__
+
+
+@dataclass
+class IndexManifest:
+    """
+    Description of a saved store, written next to the index and checked when it is loaded.
+
+    The dimension is the one the vectors are stored with, after any truncation by the embedding model,
+    whose id then ends with "@<dimensions>". `index_type` and `quantization` are None for stores saved
+    before they were recorded.
+    """
+    model_id: str
+    dimension: int
+    metric: str
+    documents: int
+    format: str = "mmap"
+    index_file: str = FLAT_VECTORS_FILE
+    built_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat(timespec="seconds"))
+    index_type: Optional[str] = None
+    quantization: Optional[str] = None
+
+    @classmethod
+    def for_index(cls, index, model_id: str, documents: int, **kwargs) -> "IndexManifest":
+        index_type, quantization = describe_index(index)
+        return cls(model_id=model_id, dimension=int(index.d), metric=METRICS[index.metric_type], documents=int(documents),
+                   index_type=index_type, quantization=quantization, **kwargs)
+
+    @classmethod
+    def load(cls, directory: Union[str, Path]) -> Optional["IndexManifest"]:
+        """Read the manifest of a saved store, or None for stores saved without one."""
+        path = Path(directory) / MANIFEST_FILE
+        if not path.exists():
+            return None
+        with open(path) as f:
+            return cls(**json.load(f))
+
+    def save(self, directory: Union[str, Path]):
+        with open(Path(directory) / MANIFEST_FILE, "w") as f:
+            json.dump(asdict(self), f, indent=2)
+
+    def validate(self, model_id: str, index=None):
+        """
+        Check that the store was built with the configured embedding model.
+
+        Raises:
+            ValueError: When the embedding model, or the dimension, metric or quantization of the loaded index, do not match.
+        """
+        if self.model_id != model_id:
+            raise ValueError(f"The vector store was built with the embedding model {self.model_id}, not {model_id}: rebuild it or configure that model.")
+        if index is not None and (int(index.d) != self.dimension or METRICS.get(index.metric_type) != self.metric):
+            raise ValueError(f"The index ({index.d} dimensions, {METRICS.get(index.metric_type)}) does not match its manifest "
+                             f"({self.dimension} dimensions, {self.metric}).")
+        if index is not None and self.quantization is not None and describe_index(index)[1] != self.quantization:
+            raise ValueError(f"The index is stored with {describe_index(index)[1]} quantization, its manifest records {self.quantization}.")
+
+
+class SQLiteDocstore(Docstore):
+    """
+    Read-only docstore over a SQLite file: documents are fetched lazily by id, nothing is unpickled.
+
+    The file is opened read-only, so every worker process shares it through the page cache.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = str(path)
+        self._connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._query("SELECT COUNT(*) FROM documents")[0][0]
+
+    def search(self, search: str) -> Union[str, Document]:
+        rows = self._query("SELECT doc_id, page_content, metadata FROM documents WHERE doc_id = ?", (search,))
+        if not rows:
+            return f"ID {search} not found."
+        return self._document(*rows[0])
+
+    def add(self, texts):
+        raise ReadOnlyStoreError("The SQLite docstore is read-only: rebuild the store to add documents.")
+
+    def delete(self, ids):
+        raise ReadOnlyStoreError("The SQLite docstore is read-only: rebuild the store to delete documents.")
+
+    def documents(self) -> Iterator[Document]:
+        """Yield every document, in position order."""
+        for row in self._query("SELECT doc_id, page_content, metadata FROM documents ORDER BY position"):
+            yield self._document(*row)
+
+    def countries(self) -> Iterator[Tuple[int, dict]]:
+        """Yield the (position, {"country": ...}) pairs of the documents, read from an indexed column."""
+        for position, country in self._query("SELECT position, country FROM documents WHERE country IS NOT NULL"):
+            yield position, {"country": country}
+
+    def doc_id(self, position: int):
+        rows = self._query("SELECT doc_id FROM documents WHERE position = ?", (int(position),))
+        if not rows:
+            raise KeyError(position)
+        return rows[0][0]
+
+    def document_at(self, position: int) -> Optional[Document]:
+        rows = self._query("SELECT doc_id, page_content, metadata FROM documents WHERE position = ?", (int(position),))
+        return self._document(*rows[0]) if rows else None
+
+    def postings_range(self, term: str) -> Optional[Tuple[int, int]]:
+        """Return the (start, count) of the BM25 postings of a term in the postings files, or None."""
+        rows = self._query("SELECT start, count FROM bm25_terms WHERE term = ?", (term,))
+        return rows[0] if rows else None
+
+    def bm25_stats(self) -> Tuple[int, int]:
+        """Return the number of documents and the total number of tokens of the BM25 index."""
+        return self._query("SELECT documents, total_length FROM bm25_stats")[0]
+
+    def _query(self, sql: str, params=()):
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _document(doc_id, page_content, metadata) -> Document:
+        return Document(id=doc_id, page_content=page_content, metadata=json.loads(metadata))
+
+
+class PositionMap(Mapping):
+    """Lazy `index_to_docstore_id` mapping of the FAISS positions to the ids of a SQLite docstore."""
+
+    def __init__(self, docstore: SQLiteDocstore, size: int):
+        self.docstore = docstore
+        self.size = size
+
+    def __getitem__(self, position):
+        return self.docstore.doc_id(position)
+
+    def __iter__(self):
+        return iter(range(self.size))
+
+    def __len__(self):
+        return self.size
+
+
+class MmapFlatIndex:
+    """
+    Exhaustive-search index over a memory-mapped .npy file of vectors.
+
+    Exposes the part of the FAISS index interface used by the stores. FAISS cannot memory-map flat
+    indexes, so the vectors are scanned with `faiss.knn` directly from the mapped file.
+    """
+
+    is_trained = True
+
+    def __init__(self, path: Union[str, Path], metric_type: int = faiss.METRIC_L2):
+        self.vectors = np.load(path, mmap_mode="r")
+        self.ntotal, self.d = self.vectors.shape
+        self.metric_type = metric_type
+
+    def search(self, x, k, params=None):
+        return faiss.knn(np.ascontiguousarray(x, dtype=np.float32), self.vectors, k, metric=self.metric_type)
+
+    def reconstruct(self, key):
+        return np.array(self.vectors[key])
+
+    def reconstruct_n(self, start, count):
+        return np.array(self.vectors[start:start + count])
+
+    def reconstruct_batch(self, keys):
+        return np.array(self.vectors[np.asarray(keys)])
+
+    def add(self, x):
+        raise ReadOnlyStoreError("Memory-mapped indexes are read-only: rebuild the store to add documents.")
+
+
+class MmapBM25Index(BM25Index):
+    """
+    Read-only BM25 index over postings saved with the store, scored like `BM25Index`.
+
+    The postings and document lengths are memory-mapped .npy files and the offsets of the terms
+    are read from the SQLite docstore, so worker processes share the index through the page cache
+    instead of each tokenizing every document. Positions are the FAISS positions of the documents.
+    """
+
+    def __init__(self, directory: Union[str, Path], docstore: SQLiteDocstore, k1: float = None, b: float = None):
+        super().__init__(k1, b)
+        directory = Path(directory)
+        self.docstore = docstore
+        self.postings = np.load(directory / BM25_POSTINGS_FILE, mmap_mode="r")
+        self.frequencies = np.load(directory / BM25_FREQUENCIES_FILE, mmap_mode="r")
+        self.lengths = np.load(directory / BM25_LENGTHS_FILE, mmap_mode="r")
+        self._count, self._total_length = docstore.bm25_stats()
+
+    @staticmethod
+    def exists(directory: Union[str, Path]) -> bool:
+        return (Path(directory) / BM25_POSTINGS_FILE).exists()
+
+    def add_documents(self, documents):
+        raise ReadOnlyStoreError("Memory-mapped BM25 indexes are read-only: rebuild the store to add documents.")
+
+    def remove(self, ids):
+        raise ReadOnlyStoreError("Memory-mapped BM25 indexes are read-only: rebuild the store to delete documents.")
+
+    def search(self, query: str, top_k: int = 5, filter: dict = None) -> List[Tuple[Document, float]]:
+        if self._count == 0:
+            return []
+        average_length = self._total_length / self._count or 1.0
+        positions, contributions = [], []
+        for token in set(content_tokens(query)):
+            postings_range = self.docstore.postings_range(token)
+            if postings_range is None:
+                continue
+            start, count = postings_range
+            token_positions = np.asarray(self.postings[start:start + count])
+            frequencies = np.asarray(self.frequencies[start:start + count], dtype=np.float64)
+            idf = math.log(1 + (self._count - count + 0.5) / (count + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[token_positions] / average_length)
+            positions.append(token_positions)
+            contributions.append(idf * frequencies * (self.k1 + 1) / (frequencies + norm))
+        if not positions:
+            return []
+        unique, inverse = np.unique(np.concatenate(positions), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(contributions))
+        results = []
+        # Best score first, ties broken by the latest position like `BM25Index`.
+        for i in np.lexsort((-unique, -scores)):
+            document = self.docstore.document_at(unique[i])
+            if document is None or (filter and not matches_filter(document.metadata, filter)):
+                continue
+            results.append((document, float(scores[i])))
+            if len(results) == top_k:
+                break
+        return results
+
+
+def flat_vectors(index):
+    """Return the vectors of a flat index as an array without copying them, or None for other index types."""
+    if isinstance(index, MmapFlatIndex):
+        return index.vectors
+    if isinstance(index, faiss.IndexFlat):
+        return faiss.rev_swig_ptr(index.get_xb(), index.ntotal * index.d).reshape(index.ntotal, index.d)
+    return None
+
+
+def read_vectors(index, positions: np.ndarray = None) -> np.ndarray:
+    """Return the vectors of an index at the given positions, or all of them, in position order."""
+    vectors = flat_vectors(index)
+    if vectors is not None:
+        return np.array(vectors if positions is None else vectors[positions])
+    try:
+        faiss.extract_index_ivf(index).make_direct_map()
+    except RuntimeError:
+        pass
+    if positions is None:
+        return index.reconstruct_n(0, index.ntotal)
+    return index.reconstruct_batch(positions)
+
+
+def save_store(directory: Union[str, Path], index, documents: Iterable[Tuple[int, Document]], model_id: str) -> IndexManifest:
+    """
+    Save a store in the memory-mappable format.
+
+    Flat indexes are saved as a raw .npy matrix, other index types with `faiss.write_index`;
+    the documents go to a SQLite file keyed by their FAISS position, and their BM25 postings to
+    .npy files read by `MmapBM25Index`.
+
+    Args:
+        directory (str): The directory to save the store to.
+        index (faiss.Index): The index of the store.
+        documents (iterable): The (position, document) pairs of the store.
+        model_id (str): The id of the embedding model of the vectors, recorded in the manifest.
+
+    Returns:
+        IndexManifest: The manifest written with the store.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    vectors = flat_vectors(index)
+    if vectors is not None:
+        index_file = FLAT_VECTORS_FILE
+        np.save(directory / index_file, np.asarray(vectors, dtype=np.float32))
+    else:
+        index_file = INDEX_FILE
+        faiss.write_index(index, str(directory / index_file))
+
+    docstore_path = directory / DOCSTORE_FILE
+    if docstore_path.exists():
+        docstore_path.unlink()
+    connection = sqlite3.connect(docstore_path)
+    try:
+        connection.execute(
+            "CREATE TABLE documents (position INTEGER PRIMARY KEY, doc_id TEXT NOT NULL UNIQUE, page_content TEXT NOT NULL, "
+            "metadata TEXT NOT NULL, country TEXT)"
+        )
+        postings = defaultdict(list)
+        lengths = np.zeros(index.ntotal, dtype=np.int32)
+        connection.executemany(
+            "INSERT INTO documents VALUES (?, ?, ?, ?, ?)",
+            ((int(position), str(doc.id if doc.id is not None else position), doc.page_content, json.dumps(doc.metadata),
+              doc.metadata.get("country")) for position, doc in _record_tokens(documents, postings, lengths)),
+        )
+        connection.execute("CREATE INDEX documents_country ON documents (country)")
+        _save_bm25(directory, connection, postings, lengths)
+        connection.commit()
+        count = connection.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+    finally:
+        connection.close()
+
+    manifest = IndexManifest.for_index(index, model_id, count, index_file=index_file)
+    manifest.save(directory)
+    return manifest
+
+
+def _record_tokens(documents: Iterable[Tuple[int, Document]], postings: dict, lengths: np.ndarray):
+    """Yield the documents, recording the BM25 postings and length of each one by position."""
+    for position, document in documents:
+        tokens = content_tokens(document.page_content)
+        lengths[position] = len(tokens)
+        for token, frequency in Counter(tokens).items():
+            postings[token].append((position, frequency))
+        yield position, document
+
+
+def _save_bm25(directory: Path, connection, postings: dict, lengths: np.ndarray):
+    """Save the postings of every term contiguously, with their offsets in the docstore."""
+    terms = sorted(postings)
+    counts = [len(postings[term]) for term in terms]
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64) if terms else []
+    entries = [entry for term in terms for entry in postings[term]]
+    np.save(directory / BM25_POSTINGS_FILE, np.array([position for position, _ in entries], dtype=np.int64))
+    np.save(directory / BM25_FREQUENCIES_FILE, np.array([frequency for _, frequency in entries], dtype=np.int32))
+    np.save(directory / BM25_LENGTHS_FILE, lengths)
+    connection.execute("CREATE TABLE bm25_terms (term TEXT PRIMARY KEY, start INTEGER NOT NULL, count INTEGER NOT NULL) WITHOUT ROWID")
+    connection.executemany("INSERT INTO bm25_terms VALUES (?, ?, ?)", zip(terms, map(int, starts), counts))
+    connection.execute("CREATE TABLE bm25_stats (documents INTEGER NOT NULL, total_length INTEGER NOT NULL)")
+    connection.execute("INSERT INTO bm25_stats VALUES ((SELECT COUNT(*) FROM documents), ?)", (int(lengths.sum()),))
+
+
+def load_store(directory: Union[str, Path], manifest: IndexManifest, writable: bool = False):
+    """
+    Load a store saved with `save_store`, memory-mapping the vectors.
+
+    IVF inverted lists are memory-mapped by FAISS (`IO_FLAG_MMAP`); other FAISS index types are read
+    into memory. Documents are only read from SQLite when a search returns them.
+
+    Args:
+        directory (str): The directory of the store.
+        manifest (IndexManifest): The manifest of the store.
+        writable (bool): Read the index and documents into memory instead, so that the store can be modified.
+
+    Returns:
+        tuple: The index, the docstore and the position to document id mapping.
+    """
+    directory = Path(directory)
+    metric = {name: metric for metric, name in METRICS.items()}[manifest.metric]
+    if writable:
+        return _load_writable(directory, manifest, metric)
+    if manifest.index_file == FLAT_VECTORS_FILE:
+        index = MmapFlatIndex(directory / FLAT_VECTORS_FILE, metric)
+    else:
+        index = faiss.read_index(str(directory / manifest.index_file), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    docstore = SQLiteDocstore(directory / DOCSTORE_FILE)
+    return index, docstore, PositionMap(docstore, index.ntotal)
+
+
+def _load_writable(directory: Path, manifest: IndexManifest, metric: int):
+    if manifest.index_file == FLAT_VECTORS_FILE:
+        index = faiss.IndexFlat(manifest.dimension, metric)
+        index.add(np.load(directory / FLAT_VECTORS_FILE))
+    else:
+        index = faiss.read_index(str(directory / manifest.index_file))
+    sqlite_docstore = SQLiteDocstore(directory / DOCSTORE_FILE)
+    try:
+        documents = list(sqlite_docstore.documents())
+    finally:
+        sqlite_docstore._connection.close()
+    docstore = InMemoryDocstore({doc.id: doc for doc in documents})
+    return index, docstore, {position: doc.id for position, doc in enumerate(documents)}
@@ -1,34 +1,363 @@
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
 import faiss
+import numpy as np
 from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from rag.bm25_index import BM25Index, matches_filter
+
+from .base_store import BaseStore, ReadOnlyStoreError, SearchResult
+from .faiss_index_factory import FAISSIndexFactory, IndexConfig, build_index
+from .faiss_persistence import (PICKLE_INDEX_FILE, IndexManifest, MmapBM25Index, SQLiteDocstore, embedding_model_id, load_store,
+                                read_vectors, save_store)
+from .metadata_partitions import MetadataPartitions, search_positions, search_positions_batch, selector_parameters
+
+logger = logging.getLogger(__name__)
 
-from .base_store import BaseStore
+# Compactions run one at a time, off the request threads.
+_compaction_executor = ThreadPoolExecutor(max_workers=1)
 
 class FAISSStore(BaseStore):
-    def __init__(self, embedding_model):
+    def __init__(self, embedding_model, index_config: IndexConfig = None, model_id: str = None, dimension: int = None):
+        """
+        Args:
+            embedding_model (Embeddings): The embedding model of the store.
+            index_config (IndexConfig): The type and parameters of the index, by default the configured ones.
+            model_id (str): The id of the embedding model, recorded in the manifest of saved stores and
+                checked when they are loaded. By default it is read from the embedding model.
+            dimension (int): The dimension of the embeddings. When unknown, the index is created on the
+                first `add_documents` or `load_vector_store` call, so no embedding is computed here.
+
+        Index types that learn from the vectors (IVF, IVF-PQ, int8) are not trained on the first batch:
+        a new store keeps its vectors in an exact flat index until it holds `min_training_vectors` of them,
+        then builds the configured index from all of them. Stores saved before that stay flat; rebuild
+        them with build_faiss_index.
+        """
         self.embedding_model = embedding_model
-        self.index = faiss.IndexFlatL2(len(embedding_model.embed_query("test"))) 
+        self.model_id = model_id or embedding_model_id(embedding_model)
+        self.manifest = None
+        self.index_factory = FAISSIndexFactory(index_config)
+        self._training_pending = False
+        self.index = self._new_index(dimension) if dimension else None
         self.docstore = InMemoryDocstore({})
         self.vector_store = FAISS(index = self.index, embedding_function = embedding_model, docstore = self.docstore, index_to_docstore_id={})
+        self.sparse_index = BM25Index()
+        self.partitions = MetadataPartitions("country")
+        self.persistence = os.getenv("FAISS_PERSISTENCE", "mmap").lower()
+        self.compaction_threshold = float(os.getenv("FAISS_COMPACTION_THRESHOLD", 0.2))
+        # Positions of the deleted vectors, until the next compaction. Searches read them as an array,
+        # built again on the first search after a delete.
+        self.tombstones = set()
+        self._tombstone_array = None
+        self._positions = {}
+        self._lock = threading.RLock()
+        self._swap_lock = threading.Lock()
+        self._compaction = None
+
+    @property
+    def sparse_index(self):
+        # Memory-mapped stores saved without BM25 postings only read their documents on the first hybrid search.
+        if self._sparse_documents is not None:
+            sparse_index = BM25Index()
+            sparse_index.add_documents(self._sparse_documents())
+            self._sparse_index, self._sparse_documents = sparse_index, None
+        return self._sparse_index
+
+    @sparse_index.setter
+    def sparse_index(self, sparse_index):
+        self._sparse_index, self._sparse_documents = sparse_index, None
 
     def add_documents(self, chunks):
-        self.vector_store.add_documents(documents=chunks)
+        self.add_embeddings(chunks, self.embedding_model.embed_documents([chunk.page_content for chunk in chunks]))
+
+    def add_embeddings(self, chunks, embeddings):
+        """Add or replace chunks with precomputed embeddings: chunks whose id is already in the store replace it."""
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        # The last of several chunks with the same id wins.
+        latest = {chunk.id: j for j, chunk in enumerate(chunks) if chunk.id is not None}
+        keep = [j for j, chunk in enumerate(chunks) if chunk.id is None or latest[chunk.id] == j]
+        chunks, vectors = [chunks[j] for j in keep], vectors[keep]
+        with self._lock:
+            self._check_writable()
+            index = self.vector_store.index
+            if index is None:
+                # The index is created with the dimension of the first batch.
+                self.index = self._new_index(vectors.shape[1])
+                self.vector_store.index = index = self.index
+            documents = [Document(id=chunk.id or str(uuid.uuid4()), page_content=chunk.page_content, metadata=chunk.metadata)
+                         for chunk in chunks]
+            self._tombstone([document.id for document in documents])
+            start = index.ntotal
+            index.add(vectors)
+            self.vector_store.docstore.add({document.id: document for document in documents})
+            for position, document in enumerate(documents, start=start):
+                self.vector_store.index_to_docstore_id[position] = document.id
+                self._positions[document.id] = position
+                self.partitions.add(position, document.metadata)
+            self.sparse_index.add_documents(documents)
+            if self._training_pending and index.ntotal >= self.index_factory.min_training_vectors():
+                self._train_index()
+            self.bump_generation()
+
+    def _new_index(self, dimension):
+        if not self.index_factory.needs_training():
+            return self.index_factory.create(dimension)
+        self._training_pending = True
+        return faiss.IndexFlatL2(dimension)
+
+    def _train_index(self):
+        """Replace the flat index of a new store by the configured one, trained on all its vectors. Positions are unchanged."""
+        vector_store = self.vector_store
+        index = build_index(read_vectors(vector_store.index), self.index_factory)
+        trained = FAISS(index=index, embedding_function=self.embedding_model, docstore=vector_store.docstore,
+                        index_to_docstore_id=vector_store.index_to_docstore_id)
+        with self._swap_lock:
+            self.vector_store, self.index = trained, index
+        self._training_pending = False
+        logger.info(f"Trained the {self.index_factory.config.type} index on {index.ntotal} vectors")
+
+    def delete(self, ids):
+        """
+        Delete documents by id. Their vectors are only marked as deleted (tombstoned) and skipped by the
+        searches, so a delete costs O(len(ids)); the index is compacted in the background once the share
+        of deleted vectors reaches FAISS_COMPACTION_THRESHOLD.
+        """
+        with self._lock:
+            self._check_writable()
+            if self._tombstone(ids):
+                self.bump_generation()
+        self._schedule_compaction()
+
+    def compact(self):
+        """
+        Rebuild the index without the deleted vectors. Document ids are unchanged, their positions are renumbered.
+        Searches keep using the previous index until the new one is swapped in.
+        """
+        with self._lock:
+            vector_store = self.vector_store
+            if not len(self.tombstones) or vector_store.index is None:
+                return
+            live = sorted(vector_store.index_to_docstore_id.items())
+            ids = [doc_id for _, doc_id in live]
+            vectors = read_vectors(vector_store.index, np.array([position for position, _ in live], dtype=np.int64))
+            # A reset clone keeps the trained IVF quantizers and the index parameters.
+            index = faiss.clone_index(vector_store.index)
+            index.reset()
+            if len(vectors):
+                index.add(vectors)
+            self.index_factory.configure(index)
+            documents = [vector_store.docstore.search(doc_id) for doc_id in ids]
+            partitions = MetadataPartitions("country")
+            partitions.rebuild((position, document.metadata) for position, document in enumerate(documents))
+            sparse_index = BM25Index()
+            sparse_index.add_documents(documents)
+            compacted = FAISS(index=index, embedding_function=self.embedding_model, docstore=vector_store.docstore,
+                              index_to_docstore_id=dict(enumerate(ids)))
+            with self._swap_lock:
+                self.vector_store, self.index, self.partitions = compacted, index, partitions
+                self.tombstones, self._tombstone_array = set(), None
+            self.sparse_index = sparse_index
+            self._positions = {doc_id: position for position, doc_id in enumerate(ids)}
+            logger.info(f"Compacted the FAISS index: {len(live)} vectors kept")
+
+    def _tombstone(self, ids):
+        """Remove the documents from the mappings and mark their positions as deleted. Returns the removed ids."""
+        removed, positions = [], []
+        for doc_id in ids:
+            position = self._positions.pop(doc_id, None)
+            if position is None:
+                continue
+            self.vector_store.index_to_docstore_id.pop(position, None)
+            removed.append(doc_id)
+            positions.append(position)
+        if removed:
+            self.vector_store.docstore.delete(removed)
+            self.sparse_index.remove(removed)
+            with self._swap_lock:
+                self.tombstones.update(positions)
+                self._tombstone_array = None
+        return removed
+
+    def _schedule_compaction(self):
+        index = self.vector_store.index
+        if index is None or not index.ntotal or len(self.tombstones) / index.ntotal < self.compaction_threshold:
+            return
+        if self._compaction is None or self._compaction.done():
+            self._compaction = _compaction_executor.submit(self.compact)
+
+    def _check_writable(self):
+        if isinstance(self.vector_store.docstore, SQLiteDocstore):
+            raise ReadOnlyStoreError("Memory-mapped stores are read-only: load them with writable=True to modify them.")
+
+    def _snapshot(self):
+        with self._swap_lock:
+            if self._tombstone_array is None:
+                self._tombstone_array = np.fromiter(self.tombstones, dtype=np.int64, count=len(self.tombstones))
+            return self.vector_store, self.partitions, self._tombstone_array
 
     def search(self, query, top_k=5):
-        results = self.vector_store.similarity_search(query, k=top_k)
+        vector_store, _, tombstones = self._snapshot()
+        if vector_store.index is None:
+            return []
+        if len(tombstones):
+            return [doc for doc, _ in self.search_with_scores(query, top_k)]
+        results = vector_store.similarity_search(query, k=top_k)
+        return results
+
+    def search_with_scores(self, query, top_k=5, filter=None):
+        vector_store, partitions, tombstones = self._snapshot()
+        if vector_store.index is None:
+            return []
+        # Country filters only scan the vectors of the matching countries, instead of post-filtering.
+        positions = partitions.ids_for(filter) if filter and len(partitions) else None
+        if positions is not None:
+            if len(tombstones):
+                positions = np.setdiff1d(positions, tombstones, assume_unique=True)
+            return self._search_positions(vector_store, query, top_k, positions)
+        if len(tombstones):
+            return self._search_live(vector_store, query, top_k, filter, tombstones)
+        # IndexFlatL2 returns squared L2 distances, mapped to a relevance in (0, 1].
+        results = vector_store.similarity_search_with_score(query, k=top_k, filter=filter)
+        return [(doc, 1.0 / (1.0 + float(distance))) for doc, distance in results]
+
+    def _search_positions(self, vector_store, query, top_k, positions):
+        embedding = np.asarray(self.embedding_model.embed_query(query), dtype=np.float32)
+        distances, found = search_positions(vector_store.index, embedding, top_k, positions)
+        return self._scored(vector_store, distances, found)
+
+    def search_batch(self, queries, top_k=5, filter=None):
+        """Embed the queries in one call and search them with one matrix search of the index."""
+        vector_store, partitions, tombstones = self._snapshot()
+        if vector_store.index is None or not len(queries):
+            return [[] for _ in queries]
+        embeddings = np.asarray(self.embedding_model.embed_documents(list(queries)), dtype=np.float32)
+        positions = partitions.ids_for(filter) if filter and len(partitions) else None
+        if positions is not None:
+            if len(tombstones):
+                positions = np.setdiff1d(positions, tombstones, assume_unique=True)
+            results = [self._scored(vector_store, distances, found)
+                       for distances, found in search_positions_batch(vector_store.index, embeddings, top_k, positions)]
+        else:
+            results = self._search_vectors(vector_store, embeddings, top_k, filter, tombstones)
+        return [[SearchResult(doc, score) for doc, score in scored] for scored in results]
+
+    def _search_live(self, vector_store, query, top_k, filter, tombstones):
+        """Search the vectors that are not deleted, post-filtering on the metadata like LangChain."""
+        embedding = np.asarray(self.embedding_model.embed_query(query), dtype=np.float32).reshape(1, -1)
+        return self._search_vectors(vector_store, embedding, top_k, filter, tombstones)[0]
+
+    def _search_vectors(self, vector_store, embeddings, top_k, filter, tombstones):
+        index = vector_store.index
+        k = min(top_k if not filter else max(4 * top_k, 20), index.ntotal - len(tombstones))
+        if k <= 0:
+            return [[] for _ in embeddings]
+        params = None
+        if len(tombstones):
+            deleted = faiss.IDSelectorBatch(tombstones)
+            selector = faiss.IDSelectorNot(deleted)
+            params = selector_parameters(index, selector)
+        distances, found = index.search(np.ascontiguousarray(embeddings), k, params=params)
+        results = []
+        for row_distances, row_found in zip(distances, found):
+            valid = row_found >= 0
+            scored = self._scored(vector_store, row_distances[valid], row_found[valid])
+            if filter:
+                scored = [(doc, score) for doc, score in scored if matches_filter(doc.metadata, filter)]
+            results.append(scored[:top_k])
+        return results
+
+    @staticmethod
+    def _scored(vector_store, distances, positions):
+        results = []
+        for distance, position in zip(distances, positions):
+            # Positions deleted while the search ran have no document any more.
+            doc_id = vector_store.index_to_docstore_id.get(int(position))
+            if doc_id is None:
+                continue
+            doc = vector_store.docstore.search(doc_id)
+            if vector_store.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+                results.append((doc, min(max(float(distance), 0.0), 1.0)))
+            else:
+                results.append((doc, 1.0 / (1.0 + float(distance))))
         return results
 
-    def delete(self, ids):
-        raise NotImplementedError("Deletion is not supported in FAISS.")
-    
     def save_data_base(self, database_name):
-        self.vector_store.save_local(database_name)
+        """
+        Save the store. By default the index and documents are saved in a memory-mappable, pickle-free
+        format; FAISS_PERSISTENCE=pickle keeps LangChain's index.faiss/index.pkl files.
+        """
+        # Saved stores never contain deleted vectors.
+        self.compact()
+        index = self.vector_store.index
+        if index is None:
+            raise ValueError("Cannot save an empty vector store.")
+        if self.persistence == "pickle":
+            self.vector_store.save_local(database_name)
+            self.manifest = IndexManifest.for_index(index, self.model_id, len(self.vector_store.index_to_docstore_id),
+                                                    format="pickle", index_file=PICKLE_INDEX_FILE)
+            self.manifest.save(database_name)
+            return
+        docstore, index_to_docstore_id = self.vector_store.docstore, self.vector_store.index_to_docstore_id
+        self.manifest = save_store(database_name, index,
+                                   ((position, docstore.search(doc_id)) for position, doc_id in index_to_docstore_id.items()),
+                                   self.model_id)
     
     def get_vector_store(self):
         return self.vector_store
 
-    def load_vector_store(self, database_name = r"f:\Python\AgenticEuro2025\src\rag\euro2025"):
-        self.vector_store = FAISS.load_local(database_name, self.embedding_model, allow_dangerous_deserialization=True)
+    def load_vector_store(self, database_name = r"f:\Python\AgenticEuro2025\src\rag\euro2025", writable: bool = False):
+        """
+        Load a saved store. Stores in the memory-mapped format are opened read-only: the vectors and BM25
+        postings stay in the page cache shared by every worker process and documents are fetched by id when returned.
+        With `writable`, they are read into memory instead, so documents can be added, e.g. to ingest them.
+        Stores saved with LangChain's pickle format are still loaded.
+
+        Raises:
+            ValueError: When the store was built with another embedding model than the configured one.
+        """
+        manifest = IndexManifest.load(database_name)
+        if manifest is None:
+            logger.warning(f"The vector store {database_name} has no manifest: its embedding model cannot be checked.")
+        else:
+            manifest.validate(self.model_id)
+        self.partitions = MetadataPartitions("country")
+        if manifest is not None and manifest.format == "mmap":
+            index, self.docstore, index_to_docstore_id = load_store(database_name, manifest, writable=writable)
+            self.vector_store = FAISS(index=index, embedding_function=self.embedding_model, docstore=self.docstore,
+                                      index_to_docstore_id=index_to_docstore_id)
+        else:
+            self.vector_store = FAISS.load_local(database_name, self.embedding_model, allow_dangerous_deserialization=True)
+            self.docstore = self.vector_store.docstore
+        if isinstance(self.docstore, SQLiteDocstore):
+            self.partitions.rebuild(self.docstore.countries())
+            if MmapBM25Index.exists(database_name):
+                self.sparse_index = MmapBM25Index(database_name, self.docstore)
+            else:
+                # Stores saved without BM25 postings build their index on the first hybrid search.
+                self._sparse_index, self._sparse_documents = BM25Index(), self.docstore.documents
+        else:
+            self.partitions.rebuild(
+                (position, self.docstore.search(doc_id).metadata) for position, doc_id in self.vector_store.index_to_docstore_id.items()
+            )
+            self.sparse_index = BM25Index()
+            self.sparse_index.add_documents(self.docstore._dict.values())
         self.index = self.vector_store.index
-        self.docstore = self.vector_store.docstore
+        # A loaded store keeps its index type, even when another one is configured.
+        self._training_pending = False
+        self.tombstones, self._tombstone_array = set(), None
+        # Read-only stores cannot delete documents, so their ids are not mapped back to positions.
+        self._positions = {} if isinstance(self.docstore, SQLiteDocstore) else {
+            doc_id: position for position, doc_id in self.vector_store.index_to_docstore_id.items()
+        }
+        if manifest is not None:
+            manifest.validate(self.model_id, self.index)
+        self.manifest = manifest
+        self.index_factory.configure(self.index)
+        self.bump_generation()
 
@@ -0,0 +1,124 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from .faiss_persistence import flat_vectors
+
+
+class MetadataPartitions:
+    """
+    Inverted lists of FAISS positions per value of a metadata field, e.g. the chunks of each country.
+
+    Used to search only the vectors that match a filter instead of post-filtering over-fetched results.
+    """
+
+    def __init__(self, field: str = "country"):
+        self.field = field
+        self._positions: Dict[object, list] = defaultdict(list)
+        self._arrays: Dict[object, np.ndarray] = {}
+
+    def __len__(self):
+        return sum(len(positions) for positions in self._positions.values())
+
+    def add(self, position: int, metadata: dict):
+        value = (metadata or {}).get(self.field)
+        if value is not None:
+            self._positions[value].append(position)
+            self._arrays.pop(value, None)
+
+    def rebuild(self, entries: Iterable[Tuple[int, dict]]):
+        """Rebuild the lists from (position, metadata) pairs."""
+        self._positions.clear()
+        self._arrays.clear()
+        for position, metadata in entries:
+            self.add(position, metadata)
+
+    def ids_for(self, filter: dict) -> Optional[np.ndarray]:
+        """
+        Return the sorted positions matching a filter on the partition field.
+
+        Args:
+            filter (dict): A vector store filter, `{field: value}` or `{field: {"$in": [...]}}`.
+
+        Returns:
+            np.ndarray: The matching positions, or None when the filter is not on the partition field alone.
+        """
+        if not filter or set(filter) != {self.field}:
+            return None
+        condition = filter[self.field]
+        if isinstance(condition, dict):
+            if set(condition) != {"$in"}:
+                return None
+            values = condition["$in"]
+        else:
+            values = [condition]
+        arrays = [self._array(value) for value in values]
+        arrays = [array for array in arrays if len(array)]
+        if not arrays:
+            return np.empty(0, dtype=np.int64)
+        return arrays[0] if len(arrays) == 1 else np.unique(np.concatenate(arrays))
+
+    def _array(self, value) -> np.ndarray:
+        if value not in self._arrays:
+            self._arrays[value] = np.array(sorted(self._positions.get(value, [])), dtype=np.int64)
+        return self._arrays[value]
+
+
+def selector_parameters(index, selector) -> faiss.SearchParameters:
+    """Return the search parameters of the index type with an ID selector, keeping the index search settings."""
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    if isinstance(index, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=index.nprobe)
+    return faiss.SearchParameters(sel=selector)
+
+
+def search_positions(index, query: np.ndarray, k: int, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Search the k nearest neighbours of the query among the given positions of a FAISS index.
+
+    Flat indexes are searched by scanning the matching vectors only; other index types search
+    with an ID selector, so the filter is applied inside the index traversal.
+
+    Returns:
+        tuple: The distances and positions of the neighbours, best first, at most k of each.
+    """
+    return search_positions_batch(index, np.asarray(query, dtype=np.float32).reshape(1, -1), k, positions)[0]
+
+
+def search_positions_batch(index, queries: np.ndarray, k: int, positions: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Search the k nearest neighbours of each query among the given positions, in one matrix search."""
+    k = min(k, len(positions))
+    if k == 0:
+        return [(np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)) for _ in range(len(queries))]
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    vectors = flat_vectors(index)
+    if vectors is not None:
+        return _scan(queries, vectors[positions], k, positions, index.metric_type)
+    selector = faiss.IDSelectorBatch(positions)
+    distances, neighbours = index.search(queries, k, params=selector_parameters(index, selector))
+    results, candidates = [], None
+    for row, (row_distances, row_neighbours) in enumerate(zip(distances, neighbours)):
+        found = row_neighbours >= 0
+        if found.sum() < k:
+            # Graph and cluster traversals can miss the matches of very selective filters: scan them instead.
+            try:
+                if candidates is None:
+                    candidates = index.reconstruct_batch(positions)
+                results.append(_scan(queries[row:row + 1], candidates, k, positions, index.metric_type)[0])
+                continue
+            except RuntimeError:
+                pass
+        results.append((row_distances[found], row_neighbours[found]))
+    return results
+
+
+def _scan(queries: np.ndarray, vectors: np.ndarray, k: int, positions: np.ndarray, metric) -> List[Tuple[np.ndarray, np.ndarray]]:
+    distances, neighbours = faiss.knn(queries, np.ascontiguousarray(vectors), k, metric=metric)
+    results = []
+    for row_distances, row_neighbours in zip(distances, neighbours):
+        found = row_neighbours >= 0
+        results.append((row_distances[found], positions[row_neighbours[found]]))
+    return results
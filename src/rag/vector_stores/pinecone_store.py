@@ -1,23 +1,56 @@
 import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 from langchain_pinecone import PineconeVectorStore
 
-from .base_store import BaseStore
+from .base_store import BaseStore, SearchResult
+
+_query_executor = ThreadPoolExecutor(max_workers=int(os.getenv("PINECONE_QUERY_WORKERS", 8)), thread_name_prefix="pinecone-query")
 
 class PineconeStore(BaseStore):
     def __init__(self, embedding_model):
         self.embedding_model = embedding_model
         self.vector_store = PineconeVectorStore.from_existing_index(index_name=os.getenv("PINECONE_INDEX"), embedding=embedding_model)
+        # No BM25 index: Pinecone cannot list the chunks of an existing index, so it would only cover the
+        # chunks added by this process. AgenticRAG falls back to dense retrieval.
 
     def add_documents(self, chunks):
         self.vector_store.add_documents(chunks)
+        self.bump_generation()
+
+    def add_embeddings(self, chunks, embeddings):
+        # Upserts the vectors like PineconeVectorStore.add_texts, without embedding the texts again.
+        text_key = self.vector_store._text_key
+        vectors = [(chunk.id or str(uuid.uuid4()), list(map(float, embedding)), {**chunk.metadata, text_key: chunk.page_content})
+                   for chunk, embedding in zip(chunks, embeddings)]
+        self.vector_store.index.upsert(vectors=vectors, namespace=self.vector_store._namespace)
+        self.bump_generation()
 
     def search(self, query, top_k=5):
         results = self.vector_store.similarity_search(query, k=top_k)
         return [res.page_content for res in results]
 
+    def search_with_scores(self, query, top_k=5, filter=None):
+        # The index uses cosine similarity, clipped to [0, 1].
+        results = self.vector_store.similarity_search_with_score(query, k=top_k, filter=filter)
+        return [(doc, min(max(float(score), 0.0), 1.0)) for doc, score in results]
+
+    def search_batch(self, queries, top_k=5, filter=None):
+        """Embed the queries in one call, then query the index concurrently."""
+        if not len(queries):
+            return []
+        embeddings = self.embedding_model.embed_documents(list(queries))
+
+        def query(embedding):
+            results = self.vector_store.similarity_search_by_vector_with_score(embedding, k=top_k, filter=filter)
+            return [SearchResult(doc, min(max(float(score), 0.0), 1.0)) for doc, score in results]
+
+        return list(_query_executor.map(query, embeddings))
+
     def delete(self, ids):
         self.vector_store.delete(ids=ids)
+        self.bump_generation()
 
     def get_vector_store(self):
         return self.vector_store
@@ -1,7 +1,8 @@
 class StoreFactory:
-    def __init__(self,  store_type: str, embedding_model):
+    def __init__(self,  store_type: str, embedding_model, model_id: str = None):
         self.store_type = store_type
         self.embedding_model = embedding_model
+        self.model_id = model_id
         self.store_registry = {
             "faiss": self._create_faiss_store,
             "pinecone": self._create_pinecone_store,
@@ -22,4 +23,4 @@ class StoreFactory:
         """Create an FAISSStore store."""
         from rag.vector_stores.faiss_store import FAISSStore      
         # Create the Ollama model
-        return FAISSStore(self.embedding_model)
\ No newline at end of file
+        return FAISSStore(self.embedding_model, model_id=self.model_id)
\ No newline at end of file
@@ -0,0 +1,69 @@
+import os
+import threading
+import time
+
+from sqlalchemy import text
+
+TABLE_WRITE_COUNTERS_QUERY = text(
+    "SELECT relname, n_tup_ins + n_tup_upd + n_tup_del AS writes FROM pg_stat_user_tables"
+)
+
+
+class DataVersionTracker:
+    """
+    Keeps a data version per table, used to invalidate anything derived from that table.
+
+    A table version changes when a write is reported in-process through `bump` or when
+    PostgreSQL reports new writes on the table in `pg_stat_user_tables`, which is polled
+    at most once every `poll_interval` seconds once an engine is attached.
+    """
+
+    def __init__(self, poll_interval: float = None):
+        self.poll_interval = float(poll_interval if poll_interval is not None else os.getenv("DATA_VERSION_POLL_SECONDS", 5))
+        self.engine = None
+        self._local_versions = {}
+        self._write_counters = {}
+        self._last_poll = 0.0
+        self._lock = threading.Lock()
+
+    def attach(self, engine):
+        """Attach the engine used to poll the table write counters."""
+        self.engine = engine
+        self._last_poll = 0.0
+
+    def bump(self, *tables: str):
+        """Bump the version of the given tables after a write."""
+        with self._lock:
+            for table in tables:
+                table = table.lower()
+                self._local_versions[table] = self._local_versions.get(table, 0) + 1
+
+    def version(self, table: str) -> tuple:
+        """Return the current version of a table."""
+        return self.versions([table])[table.lower()]
+
+    def versions(self, tables) -> dict:
+        """Return the current version of each of the given tables."""
+        self._poll()
+        with self._lock:
+            return {
+                table.lower(): (self._local_versions.get(table.lower(), 0), self._write_counters.get(table.lower(), 0))
+                for table in tables
+            }
+
+    def _poll(self):
+        """Refresh the table write counters from PostgreSQL when the poll interval has elapsed."""
+        if self.engine is None or time.monotonic() - self._last_poll < self.poll_interval:
+            return
+        self._last_poll = time.monotonic()
+        try:
+            with self.engine.connect() as connection:
+                rows = connection.execute(TABLE_WRITE_COUNTERS_QUERY).fetchall()
+        except Exception as e:
+            print(f"Error polling table write counters: {e}")
+            return
+        with self._lock:
+            self._write_counters = {row[0].lower(): int(row[1] or 0) for row in rows}
+
+
+data_versions = DataVersionTracker()
@@ -1,15 +1,16 @@
-import os
 import time
 import uuid
 
-from sqlalchemy import Column, MetaData, String, Table, Text, create_engine
+from sqlalchemy import Column, MetaData, String, Table, Text
 from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker
 
+from services.data_versions import data_versions
+from services.db_engines import get_primary_engine
+
 class DatabaseService:
     def __init__(self):
-        self.database_url = os.getenv("DATABASE_URL", os.getenv("POSTGRES_HOST"))
-        self.engine = create_engine(self.database_url)
+        self.engine = get_primary_engine()
         self.metadata = MetaData()
 
         self.question_answer_table = Table(
@@ -61,6 +62,7 @@ class DatabaseService:
                         )
                     )
                     session.commit()
+                    data_versions.bump(self.question_answer_table.name)
                     return
             except OperationalError as e:
                 attempt += 1
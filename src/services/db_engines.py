@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+from functools import lru_cache
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+from services.metrics import register_metrics
+
+
+class EngineMetrics:
+    """Accumulates pool-wait and query-time statistics for an engine."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool_waits = [0, 0.0, 0.0]
+        self._queries = [0, 0.0, 0.0]
+
+    def record_pool_wait(self, seconds: float):
+        self._record(self._pool_waits, seconds)
+
+    def record_query(self, seconds: float):
+        self._record(self._queries, seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pool_wait": self._summary(self._pool_waits),
+                "query_time": self._summary(self._queries),
+            }
+
+    def _record(self, bucket, seconds):
+        with self._lock:
+            bucket[0] += 1
+            bucket[1] += seconds
+            bucket[2] = max(bucket[2], seconds)
+
+    @staticmethod
+    def _summary(bucket) -> dict:
+        count, total, maximum = bucket
+        return {
+            "count": count,
+            "total_ms": total * 1000,
+            "avg_ms": total * 1000 / count if count else 0.0,
+            "max_ms": maximum * 1000,
+        }
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited for a connection."""
+
+    metrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_pool_wait(time.perf_counter() - start)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def primary_database_url() -> str:
+    """URL of the primary database, used for writes."""
+    return os.getenv("DATABASE_URL", os.getenv("POSTGRES_HOST"))
+
+
+def read_database_url() -> str:
+    """URL used for read-only agent queries, the replica when one is configured."""
+    return os.getenv("POSTGRES_REPLICA_HOST") or primary_database_url()
+
+
+def build_engine(url: str, read_only: bool = False, metrics: EngineMetrics = None):
+    """
+    Create an engine with the configured pool settings and statement timeout.
+
+    Args:
+        url (str): The database URL.
+        read_only (bool): Whether every transaction opened by the engine is read-only.
+        metrics (EngineMetrics): Where pool-wait and query-time statistics are recorded.
+
+    Returns:
+        Engine: The SQLAlchemy engine.
+    """
+    options = {
+        "poolclass": TimedQueuePool,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+    }
+    if make_url(url).get_backend_name() == "postgresql":
+        server_options = [f"-c statement_timeout={int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 15000))}"]
+        if read_only:
+            server_options.append("-c default_transaction_read_only=on")
+        options["connect_args"] = {"options": " ".join(server_options)}
+
+    engine = create_engine(url, **options)
+    if metrics is not None:
+        engine.pool.metrics = metrics
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+            metrics.record_query(time.perf_counter() - conn.info["query_start_time"].pop())
+
+        @event.listens_for(engine, "handle_error")
+        def _discard_query_timer(context):
+            if context.connection is not None and context.connection.info.get("query_start_time"):
+                metrics.record_query(time.perf_counter() - context.connection.info["query_start_time"].pop())
+    return engine
+
+
+def _pool_stats(engine, metrics: EngineMetrics) -> dict:
+    pool = engine.pool
+    return {
+        "pool_size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        **metrics.stats(),
+    }
+
+
+@lru_cache(maxsize=None)
+def get_primary_engine():
+    """Shared engine for the primary database, used for writes."""
+    metrics = EngineMetrics()
+    engine = build_engine(primary_database_url(), metrics=metrics)
+    register_metrics("db_primary", lambda: _pool_stats(engine, metrics))
+    return engine
+
+
+@lru_cache(maxsize=None)
+def get_read_engine():
+    """Shared read-only engine for agent generated queries, routed to the replica when configured."""
+    metrics = EngineMetrics()
+    engine = build_engine(read_database_url(), read_only=True, metrics=metrics)
+    register_metrics("db_read", lambda: _pool_stats(engine, metrics))
+    return engine
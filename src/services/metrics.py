@@ -0,0 +1,29 @@
+import threading
+
+_providers = {}
+_lock = threading.Lock()
+
+
+def register_metrics(name: str, provider):
+    """
+    Register a metrics provider under the given name.
+
+    Args:
+        name (str): The key under which the metrics are exposed.
+        provider (callable): A function with no arguments that returns a dict of metrics.
+    """
+    with _lock:
+        _providers[name] = provider
+
+
+def collect_metrics() -> dict:
+    """Return a snapshot of all registered metrics, keyed by provider name."""
+    with _lock:
+        providers = dict(_providers)
+    snapshot = {}
+    for name, provider in providers.items():
+        try:
+            snapshot[name] = provider()
+        except Exception as e:
+            snapshot[name] = {"error": str(e)}
+    return snapshot
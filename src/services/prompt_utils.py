@@ -7,6 +7,7 @@ class PromptUtils:
     yaml_paths = {
         "qualification_analysis": Path(__file__).parent / "prompts" / "qualification_prompt_templates.yaml",
         "sql_agent": Path(__file__).parent / "prompts" / "sql_prompt_templates.yaml",
+        "tournament_simulation": Path(__file__).parent / "prompts" / "simulation_prompt_templates.yaml",
         "validation_question": Path(__file__).parent / "prompts" / "validation_template.yaml"
     }
 
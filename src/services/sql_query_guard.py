@@ -0,0 +1,149 @@
+import logging
+import os
+import re
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import List
+
+from langchain_community.utilities.sql_database import truncate_word
+from sqlalchemy import text
+
+from services.metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_COMMENT_OR_LITERAL = re.compile(r"('(?:[^']|'')*')|--[^\n]*|/\*.*?\*/", re.DOTALL)
+_READ_ONLY_STATEMENT = re.compile(r"^\s*(?:select|with)\b", re.IGNORECASE)
+_TRAILING_LIMIT = re.compile(r"\blimit\s+(\d+|all)(\s+offset\s+\d+)?\s*$", re.IGNORECASE)
+_TRAILING_FETCH = re.compile(r"\bfetch\s+(first|next)\s+\d*\s*rows?\s+only\s*$", re.IGNORECASE)
+
+COST_BUCKETS = [10, 100, 1_000, 10_000, 100_000, 1_000_000]
+
+
+class QueryRejectedError(Exception):
+    """Raised when the planner estimates a query to be too expensive to run."""
+
+
+@dataclass
+class QueryResult:
+    columns: List[str]
+    rows: List[tuple]
+    truncated: bool = False
+    notes: List[str] = field(default_factory=list)
+
+
+class QueryGuardMetrics:
+    """Counts guarded queries, rejections, caps and the distribution of plan costs."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {"checked": 0, "rejected": 0, "limit_injected": 0, "row_capped": 0, "byte_capped": 0}
+        self._cost_histogram = [0] * (len(COST_BUCKETS) + 1)
+
+    def increment(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def record_cost(self, cost: float):
+        with self._lock:
+            self._cost_histogram[bisect_left(COST_BUCKETS, cost)] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            labels = [f"<={bucket}" for bucket in COST_BUCKETS] + [f">{COST_BUCKETS[-1]}"]
+            return {**self._counters, "cost_histogram": dict(zip(labels, self._cost_histogram))}
+
+
+guard_metrics = QueryGuardMetrics()
+register_metrics("sql_query_guard", guard_metrics.stats)
+
+
+class SQLQueryGuard:
+    """
+    Guards agent generated SQL before and after it reaches the database.
+
+    Read-only queries without a trailing LIMIT get one injected, every query is planned with
+    EXPLAIN and rejected when its estimated cost exceeds `max_cost`, and the returned rows are
+    capped by count and size before they are handed to the LLM.
+    """
+
+    def __init__(self, engine, max_cost: float = None, default_limit: int = None, max_rows: int = None, max_bytes: int = None, max_string_length: int = 300, metrics: QueryGuardMetrics = guard_metrics):
+        self.engine = engine
+        self.max_cost = float(max_cost if max_cost is not None else os.getenv("SQL_GUARD_MAX_COST", 100_000))
+        self.default_limit = int(default_limit if default_limit is not None else os.getenv("SQL_GUARD_DEFAULT_LIMIT", 100))
+        self.max_rows = int(max_rows if max_rows is not None else os.getenv("SQL_GUARD_MAX_ROWS", 50))
+        self.max_bytes = int(max_bytes if max_bytes is not None else os.getenv("SQL_GUARD_MAX_BYTES", 8_000))
+        self.max_string_length = max_string_length
+        self.metrics = metrics
+
+    def prepare(self, query: str) -> str:
+        """Strip comments and trailing semicolons, and append a LIMIT to read-only queries that have none."""
+        # A comment after the LIMIT would hide it, and a trailing line comment would swallow an appended one.
+        query = _COMMENT_OR_LITERAL.sub(lambda match: match.group(1) or " ", query)
+        query = query.strip().rstrip(";").strip()
+        if not _READ_ONLY_STATEMENT.match(query):
+            return query
+        without_literals = _STRING_LITERAL.sub("''", query)
+        if _TRAILING_LIMIT.search(without_literals) or _TRAILING_FETCH.search(without_literals):
+            return query
+        self.metrics.increment("limit_injected")
+        return f"{query}\nLIMIT {self.default_limit}"
+
+    def execute(self, query: str) -> QueryResult:
+        """
+        Run a query through the guard.
+
+        Args:
+            query (str): The SQL query generated by the agent.
+
+        Returns:
+            QueryResult: The columns and the capped rows of the result.
+
+        Raises:
+            QueryRejectedError: If the estimated cost of the query exceeds the threshold.
+        """
+        query = self.prepare(query)
+        with self.engine.connect() as connection:
+            cost = self._estimate_cost(connection, query)
+            self.metrics.increment("checked")
+            self.metrics.record_cost(cost)
+            if cost > self.max_cost:
+                self.metrics.increment("rejected")
+                logger.warning("Rejected SQL query with estimated cost %.0f (max %.0f): %s", cost, self.max_cost, query)
+                raise QueryRejectedError(
+                    f"Query rejected: estimated cost {cost:.0f} exceeds the limit of {self.max_cost:.0f}. "
+                    "Add filters, aggregate the data or select fewer rows and try again."
+                )
+            cursor = connection.execute(text(query))
+            if not cursor.returns_rows:
+                connection.commit()
+                return QueryResult(columns=[], rows=[])
+            columns = list(cursor.keys())
+            rows = cursor.fetchmany(self.max_rows + 1)
+        return self._cap(columns, rows)
+
+    def _estimate_cost(self, connection, query: str) -> float:
+        plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {query}")).scalar()
+        return float(plan[0]["Plan"]["Total Cost"])
+
+    def _cap(self, columns, rows) -> QueryResult:
+        result = QueryResult(columns=columns, rows=[])
+        if len(rows) > self.max_rows:
+            rows = rows[: self.max_rows]
+            result.truncated = True
+            result.notes.append(f"Only the first {self.max_rows} rows are shown.")
+            self.metrics.increment("row_capped")
+
+        size = 0
+        for row in rows:
+            row = tuple(truncate_word(value, length=self.max_string_length) for value in row)
+            size += len(str(row).encode("utf-8")) + 2
+            if size > self.max_bytes:
+                result.truncated = True
+                result.notes.append(f"Result truncated to {len(result.rows)} rows to stay under {self.max_bytes} bytes.")
+                self.metrics.increment("byte_capped")
+                break
+            result.rows.append(row)
+        return result
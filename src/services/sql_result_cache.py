@@ -0,0 +1,172 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from services.data_versions import data_versions
+from services.metrics import register_metrics
+
+_STRING_LITERAL = re.compile(r"('(?:[^']|'')*')")
+_TABLE_REFERENCE = re.compile(r"\b(?:from|join|into|update)\s+([a-z_][\w.]*)", re.IGNORECASE)
+_NOT_AN_ALIAS = (r"(?!(?:where|join|inner|left|right|full|cross|natural|group|order|limit|offset|having|union|intersect|except"
+                 r"|on|using|window|fetch|for|lateral)\b)")
+# Comma-separated tables of a FROM clause, e.g. "FROM matches m, teams AS t".
+_FROM_LIST = re.compile(
+    rf"\bfrom\s+((?:[a-z_][\w.]*(?:\s+(?:as\s+)?{_NOT_AN_ALIAS}[a-z_]\w*)?\s*,\s*)*[a-z_][\w.]*)", re.IGNORECASE
+)
+_READ_ONLY_STATEMENT = re.compile(r"^\s*(?:select|with)\b", re.IGNORECASE)
+# Statements starting with SELECT or WITH can still write: data-modifying CTEs, SELECT INTO, row locks.
+_WRITE_KEYWORD = re.compile(r"\b(?:insert|update|delete|merge|truncate|drop|alter|create|grant|revoke|copy|into|returning)\b",
+                            re.IGNORECASE)
+
+
+def normalize_sql(query: str) -> str:
+    """
+    Normalize a SQL query so that formatting differences map to the same cache key.
+
+    Whitespace is collapsed and keywords/identifiers are lower-cased, while string
+    literals are kept verbatim. A trailing semicolon is removed.
+    """
+    parts = _STRING_LITERAL.split(query.strip().rstrip(";").strip())
+    normalized = []
+    for i, part in enumerate(parts):
+        if i % 2 == 1:
+            normalized.append(part)
+        else:
+            normalized.append(re.sub(r"\s+", " ", part).lower())
+    return "".join(normalized).strip()
+
+
+def referenced_tables(query: str) -> set:
+    """Return the table names referenced in FROM (including comma-joined tables), JOIN, INTO and UPDATE clauses of a query."""
+    without_literals = _STRING_LITERAL.sub("''", query)
+    names = _TABLE_REFERENCE.findall(without_literals)
+    for from_list in _FROM_LIST.findall(without_literals):
+        names.extend(item.split()[0] for item in from_list.split(","))
+    return {name.split(".")[-1].lower() for name in names}
+
+
+class SQLResultCache:
+    """
+    LRU cache of SQL query results keyed on the normalized query text.
+
+    Each entry remembers the data version of the tables it reads from and is treated as
+    a miss as soon as any of them changes. Entries also expire after `ttl_seconds` as a
+    fallback for writes that are not reflected in the data versions.
+    """
+
+    def __init__(self, max_entries: int = None, ttl_seconds: float = None, max_bytes: int = None, versions=data_versions):
+        self.max_entries = int(max_entries if max_entries is not None else os.getenv("SQL_CACHE_MAX_ENTRIES", 1024))
+        self.ttl_seconds = float(ttl_seconds if ttl_seconds is not None else os.getenv("SQL_CACHE_TTL_SECONDS", 600))
+        self.max_bytes = int(max_bytes if max_bytes is not None else os.getenv("SQL_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+        self.versions = versions
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._evictions = 0
+        self._bytes_served = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_cacheable(query: str) -> bool:
+        """Only read-only statements are cached: a SELECT or WITH query without any writing clause."""
+        without_literals = _STRING_LITERAL.sub("''", query)
+        return bool(_READ_ONLY_STATEMENT.match(without_literals)) and not _WRITE_KEYWORD.search(without_literals)
+
+    def snapshot(self, query: str) -> dict:
+        """Return the data versions of the tables a query reads, to be taken before running it and passed to `set`."""
+        return self.versions.versions(referenced_tables(query))
+
+    def get(self, query: str):
+        """
+        Return the cached result for the query, or None on a miss.
+
+        Args:
+            query (str): The SQL query.
+
+        Returns:
+            str | None: The cached result if present, fresh and still valid for the current data versions.
+        """
+        key = normalize_sql(query)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            with self._lock:
+                self._misses += 1
+            return None
+
+        result, tables_versions, created_at = entry
+        is_expired = time.monotonic() - created_at > self.ttl_seconds
+        is_stale = self.versions.versions(tables_versions.keys()) != tables_versions
+        with self._lock:
+            if is_expired or is_stale:
+                if self._entries.get(key) is entry:
+                    self._remove(key)
+                self._invalidations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            self._bytes_served += len(result.encode("utf-8"))
+        return result
+
+    def set(self, query: str, result: str, tables_versions: dict = None):
+        """
+        Store the result of a query.
+
+        Args:
+            query (str): The SQL query.
+            result (str): The result returned by the database.
+            tables_versions (dict): The `snapshot` of the data versions taken before the query ran. Versions
+                read afterwards could already include a write the result does not reflect.
+        """
+        size = len(result.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        key = normalize_sql(query)
+        if tables_versions is None:
+            tables_versions = self.snapshot(query)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (result, tables_versions, time.monotonic())
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def record_write(self, query: str):
+        """Bump the data version of the tables touched by a write statement."""
+        self.versions.bump(*referenced_tables(query))
+
+    def clear(self):
+        """Drop all cached entries."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and memory usage of the cache."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "invalidations": self._invalidations,
+                "evictions": self._evictions,
+                "bytes_served": self._bytes_served,
+            }
+
+    def _remove(self, key):
+        result, _, _ = self._entries.pop(key)
+        self._bytes -= len(result.encode("utf-8"))
+
+
+sql_result_cache = SQLResultCache()
+register_metrics("sql_result_cache", sql_result_cache.stats)
@@ -0,0 +1,150 @@
+import os
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+
+from services.metrics import register_metrics
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model("gpt-4o")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count the tokens of a text with the gpt-4o tokenizer, or estimate them when it is unavailable."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+
+@dataclass
+class FormattedResult:
+    text: str
+    tokens_before: int
+    tokens_after: int
+    rows_shown: int
+    rows_total: int
+
+
+class FormatterMetrics:
+    """Accumulates the token savings of the compact result encoding."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._results = 0
+        self._tokens_before = 0
+        self._tokens_after = 0
+        self._truncated = 0
+
+    def record(self, result: FormattedResult):
+        with self._lock:
+            self._results += 1
+            self._tokens_before += result.tokens_before
+            self._tokens_after += result.tokens_after
+            self._truncated += result.rows_shown < result.rows_total
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "results": self._results,
+                "truncated": self._truncated,
+                "tokens_before": self._tokens_before,
+                "tokens_after": self._tokens_after,
+                "tokens_saved": self._tokens_before - self._tokens_after,
+                "savings_ratio": 1 - self._tokens_after / self._tokens_before if self._tokens_before else 0.0,
+            }
+
+
+formatter_metrics = FormatterMetrics()
+register_metrics("sql_result_formatter", formatter_metrics.stats)
+
+
+class SQLResultFormatter:
+    """
+    Renders SQL results as a compact header-plus-rows table for the LLM.
+
+    Strings repeated across the result (team and stadium names, cities...) are replaced by short
+    codes defined once in a legend line, and rows past the token budget are replaced by a summary.
+    """
+
+    def __init__(self, token_budget: int = None, metrics: FormatterMetrics = formatter_metrics):
+        self.token_budget = int(token_budget if token_budget is not None else os.getenv("SQL_RESULT_TOKEN_BUDGET", 1500))
+        self.metrics = metrics
+
+    def format(self, columns, rows, notes=()) -> FormattedResult:
+        """
+        Format the rows of a query result.
+
+        Args:
+            columns (list[str]): The column names.
+            rows (list[tuple]): The rows of the result.
+            notes (list[str]): Extra lines appended after the rows, such as truncation notices.
+
+        Returns:
+            FormattedResult: The formatted text and its token count compared to the plain tuple list.
+        """
+        tokens_before = count_tokens(str([tuple(row) for row in rows]) if rows else "")
+        if not rows:
+            return FormattedResult(text="", tokens_before=tokens_before, tokens_after=0, rows_shown=0, rows_total=0)
+
+        codes = self._dictionary(rows)
+        header = [f"{len(rows)} rows | columns: " + " | ".join(columns)]
+        if codes:
+            header.append("where " + ", ".join(f"{code} = {value}" for value, code in codes.items()))
+        tokens = count_tokens("\n".join(header))
+
+        lines = []
+        for row in rows:
+            line = " | ".join(self._render(value, codes) for value in row)
+            line_tokens = count_tokens(line) + 1
+            if tokens + line_tokens > self.token_budget and lines:
+                break
+            lines.append(line)
+            tokens += line_tokens
+
+        footer = list(notes)
+        if len(lines) < len(rows):
+            footer.append(f"... {len(rows) - len(lines)} more rows not shown ({len(rows)} total). Refine the query to see them.")
+        text = "\n".join(header + lines + footer)
+
+        result = FormattedResult(
+            text=text,
+            tokens_before=tokens_before,
+            tokens_after=count_tokens(text),
+            rows_shown=len(lines),
+            rows_total=len(rows),
+        )
+        self.metrics.record(result)
+        return result
+
+    @staticmethod
+    def _render(value, codes: dict) -> str:
+        if isinstance(value, str) and value in codes:
+            return codes[value]
+        if value is None:
+            return "null"
+        text = str(value).replace("\n", " ").replace("|", "/")
+        if text.startswith("@"):
+            return "\\" + text
+        return text
+
+    @staticmethod
+    def _dictionary(rows) -> dict:
+        """Assign a short code to every string whose repetitions cost more than its legend entry."""
+        counts = Counter(value for row in rows for value in row if isinstance(value, str))
+        codes = {}
+        for value, count in counts.most_common():
+            if count < 2:
+                break
+            code = f"@{len(codes) + 1}"
+            legend_cost = len(code) + len(value) + 5
+            if count * len(value) > count * len(code) + legend_cost:
+                codes[value] = code
+        return codes
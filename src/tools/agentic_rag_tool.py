@@ -1,4 +1,5 @@
-
+import threading
+import weakref
 from typing import Annotated
 
 from langchain.tools import tool
@@ -6,8 +7,21 @@ from langchain_core.messages import HumanMessage
 from langchain_core.tools import InjectedToolArg
 
 from rag.agentic_rag import AgenticRAG
+from rag.country_gazetteer import get_country_gazetteer
 from rag.vector_stores.base_store import BaseStore
 
+_agentic_rags = weakref.WeakKeyDictionary()
+_agentic_rags_lock = threading.Lock()
+
+def get_agentic_rag(vector_store: BaseStore) -> AgenticRAG:
+    """Return the shared AgenticRAG of a vector store, building it on first use."""
+    with _agentic_rags_lock:
+        agentic_rag_instance = _agentic_rags.get(vector_store)
+        if agentic_rag_instance is None:
+            agentic_rag_instance = AgenticRAG(vector_store, gazetteer=get_country_gazetteer())
+            _agentic_rags[vector_store] = agentic_rag_instance
+        return agentic_rag_instance
+
 @tool("agentic_rag", return_direct=True, description=(
                     "Use this tool for general background, historical knowledge, or open-ended questions "
                     "about the Women's Eurocup 2025. This includes rules (e.g., VAR), past tournaments, hosts, and top scorers in history. "
@@ -26,6 +40,4 @@ def agentic_rag(vector_store: Annotated[BaseStore, InjectedToolArg], question: s
         "messages": [HumanMessage(content=question)],
         "question_language": question_language
     }
-    argentic_rag = AgenticRAG(vector_store)
-    return argentic_rag(initial_state)["messages"][-1].content
-     
\ No newline at end of file
+    return get_agentic_rag(vector_store)(initial_state)["messages"][-1].content
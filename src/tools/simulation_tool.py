@@ -0,0 +1,15 @@
+from typing import Annotated
+
+from langchain.tools import tool
+from langchain_core.tools import InjectedToolArg
+from langchain_openai import ChatOpenAI
+
+from agents.simulation_agent import handle_simulation_question
+
+@tool("simulation_tool", return_direct=True, description="Use to know the chances or probability of a team to reach a stage or win the tournament. Example: 'What are Spain's chances?', or 'How likely is England to reach the final?'")
+def get_tournament_chances(model: Annotated[ChatOpenAI, InjectedToolArg], question: str = "", question_language: Annotated[str, InjectedToolArg] = "English"):
+    """
+    Use to know the chances or probability of a team to reach a stage or win the tournament. Example: 'What are Spain's chances?', or 'How likely is England to reach the final?'
+    """
+    result = handle_simulation_question(llm=model, question=question, question_language=question_language)
+    return result.content.strip()
@@ -0,0 +1,62 @@
+from typing import Any, Optional
+
+from langchain_community.tools.sql_database.tool import QuerySQLDatabaseTool
+from langchain_core.callbacks import CallbackManagerForToolRun
+from pydantic import Field
+from sqlalchemy.exc import SQLAlchemyError
+
+from services.sql_query_guard import QueryRejectedError, QueryResult, SQLQueryGuard
+from services.sql_result_cache import SQLResultCache
+from services.sql_result_formatter import SQLResultFormatter
+
+
+class ManagedQuerySQLDatabaseTool(QuerySQLDatabaseTool):
+    """
+    Drop-in replacement for the toolkit's `sql_db_query` tool.
+
+    Results of read-only queries are served from the SQL result cache when possible.
+    Write statements are executed as usual and bump the data version of the tables they touch.
+    When a guard is set, queries are cost-checked and their results capped before reaching the LLM,
+    and a formatter, when set, renders them as a compact table instead of a list of tuples.
+    """
+
+    cache: Optional[Any] = Field(default=None, exclude=True)
+    guard: Optional[Any] = Field(default=None, exclude=True)
+    formatter: Optional[Any] = Field(default=None, exclude=True)
+
+    @classmethod
+    def from_tool(cls, tool: QuerySQLDatabaseTool, cache: SQLResultCache = None, guard: SQLQueryGuard = None, formatter: SQLResultFormatter = None):
+        """Build the managed tool from the toolkit's `sql_db_query` tool, keeping its name and description."""
+        return cls(db=tool.db, name=tool.name, description=tool.description, cache=cache, guard=guard, formatter=formatter)
+
+    def _run(self, query: str, run_manager: Optional[CallbackManagerForToolRun] = None) -> str:
+        """Execute the query or serve it from the cache, return the results or an error message."""
+        is_cacheable = self.cache is not None and self.cache.is_cacheable(query)
+        if is_cacheable:
+            cached = self.cache.get(query)
+            if cached is not None:
+                return cached
+            tables_versions = self.cache.snapshot(query)
+
+        result = self._execute(query)
+        if self.cache is not None and not is_cacheable:
+            self.cache.record_write(query)
+        elif is_cacheable and not result.startswith("Error:"):
+            self.cache.set(query, result, tables_versions)
+        return result
+
+    def _execute(self, query: str) -> str:
+        if self.guard is None:
+            return self.db.run_no_throw(query)
+        try:
+            return self._render(self.guard.execute(query))
+        except (QueryRejectedError, SQLAlchemyError) as e:
+            return f"Error: {e}"
+
+    def _render(self, result: QueryResult) -> str:
+        if not result.rows:
+            # The byte cap can drop every row: the agent still needs to know the result was cut.
+            return "\n".join(result.notes)
+        if self.formatter is not None:
+            return self.formatter.format(result.columns, result.rows, result.notes).text
+        return "\n".join([str(result.rows)] + result.notes)
@@ -0,0 +1,255 @@
+import re
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Optional
+
+from sqlalchemy import bindparam, text
+
+from services.data_versions import data_versions
+from services.db_engines import get_primary_engine, get_read_engine
+from services.metrics import register_metrics
+from tournament.scenario_engine import GroupState
+
+TEAM_NAMES_QUERY = text("SELECT country FROM teams ORDER BY country")
+
+GROUP_OF_TEAM_QUERY = text("""
+    SELECT g.group_id, g.group_name
+    FROM group_standings gs
+    JOIN groups g ON g.group_id = gs.group_id
+    JOIN teams t ON t.team_id = gs.team_id
+    WHERE t.country = :team
+    LIMIT 1
+""").bindparams(bindparam("team"))
+
+GROUP_STANDINGS_QUERY = text("""
+    SELECT t.country, gs.points, gs.matches_played, gs.wins, gs.draws, gs.losses,
+           gs.goals_for, gs.goals_against, gs.goal_difference, gs.group_position
+    FROM group_standings gs
+    JOIN teams t ON t.team_id = gs.team_id
+    WHERE gs.group_id = :group_id
+    ORDER BY gs.group_position
+""").bindparams(bindparam("group_id"))
+
+GROUP_FIXTURES_QUERY = text("""
+    SELECT m.match_id, ht.country, at.country, m.match_datetime, m.home_score, m.away_score,
+           (m.home_score IS NOT NULL AND m.away_score IS NOT NULL AND m.match_datetime <= NOW()) AS is_played
+    FROM matches m
+    LEFT JOIN teams ht ON ht.team_id = m.home_team_id
+    LEFT JOIN teams at ON at.team_id = m.away_team_id
+    WHERE m.group_id = :group_id
+    ORDER BY m.match_datetime
+""").bindparams(bindparam("group_id"))
+
+GROUPS_QUERY = text("SELECT group_id, group_name FROM groups ORDER BY group_name")
+
+KNOCKOUT_RESULTS_QUERY = text("""
+    SELECT cs.stage_name, ht.country, at.country, m.home_score, m.away_score,
+           COALESCE(m.home_penalties_score, 0), COALESCE(m.away_penalties_score, 0)
+    FROM matches m
+    JOIN competition_stages cs ON cs.stage_id = m.stage_id
+    JOIN teams ht ON ht.team_id = m.home_team_id
+    JOIN teams at ON at.team_id = m.away_team_id
+    WHERE cs.stage_name <> 'Group Stage'
+      AND m.home_score IS NOT NULL AND m.away_score IS NOT NULL AND m.match_datetime <= NOW()
+    ORDER BY m.match_datetime
+""")
+
+HISTORICAL_RESULTS_QUERY = text("""
+    SELECT ht.country, at.country, hm.home_score, hm.away_score
+    FROM historical_matches hm
+    JOIN teams ht ON ht.team_id = hm.home_team_id
+    JOIN teams at ON at.team_id = hm.away_team_id
+    WHERE hm.home_score IS NOT NULL AND hm.away_score IS NOT NULL
+""")
+
+SHOTS_ON_TARGET_QUERY = text("""
+    SELECT t.country, AVG(ts.shots_on_target), COUNT(*)
+    FROM team_match_stats ts
+    JOIN teams t ON t.team_id = ts.team_id
+    WHERE ts.shots_on_target IS NOT NULL
+    GROUP BY t.country
+""")
+
+GROUP_TABLES = ("groups", "group_standings", "matches", "teams")
+TOURNAMENT_TABLES = GROUP_TABLES + ("competition_stages", "match_events", "historical_matches", "team_match_stats")
+
+
+@dataclass(frozen=True)
+class TeamGroup:
+    group_id: int
+    group_name: str
+
+
+@dataclass(frozen=True)
+class StandingRow:
+    team: str
+    points: int
+    matches_played: int
+    wins: int
+    draws: int
+    losses: int
+    goals_for: int
+    goals_against: int
+    goal_difference: int
+    group_position: int
+
+
+@dataclass(frozen=True)
+class KnockoutResult:
+    stage_name: str
+    home_team: str
+    away_team: str
+    home_score: int
+    away_score: int
+    home_shootout_goals: int
+    away_shootout_goals: int
+
+    @property
+    def winner(self) -> str:
+        """The team that went through, deciding level scores with the penalty shootout."""
+        if (self.home_score, self.home_shootout_goals) > (self.away_score, self.away_shootout_goals):
+            return self.home_team
+        return self.away_team
+
+
+@dataclass(frozen=True)
+class Fixture:
+    match_id: int
+    home_team: str
+    away_team: str
+    match_datetime: Optional[datetime]
+    home_score: Optional[int]
+    away_score: Optional[int]
+    is_played: bool
+
+
+def find_team(question: str, teams: List[str]) -> Optional[str]:
+    """Return the first team mentioned in the question, preferring the longest name at the same position."""
+    mentions = []
+    for team in teams:
+        match = re.search(rf"\b{re.escape(team)}\b", question, re.IGNORECASE)
+        if match:
+            mentions.append((match.start(), -len(team), team))
+    return min(mentions)[2] if mentions else None
+
+
+class TournamentRepository:
+    """
+    Typed access to the group data of the competition through fixed, parametrized queries.
+
+    Results are cached per team/group and dropped as soon as the data version of any of the
+    group tables changes, so that a recorded match result is picked up on the next read.
+    """
+
+    def __init__(self, engine, versions=data_versions):
+        self.engine = engine
+        self.versions = versions
+        self._cache = {}
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def team_names(self) -> List[str]:
+        """Return the names of all teams of the competition."""
+        return self._cached(("team_names",), lambda rows: [row[0] for row in rows], TEAM_NAMES_QUERY)
+
+    def group_of_team(self, team: str) -> Optional[TeamGroup]:
+        """Return the group of a team, or None if the team is not in any group."""
+        return self._cached(("group_of_team", team), lambda rows: TeamGroup(*rows[0]) if rows else None, GROUP_OF_TEAM_QUERY, team=team)
+
+    def standings(self, group_id: int) -> List[StandingRow]:
+        """Return the standings of a group, ordered by position."""
+        return self._cached(("standings", group_id), lambda rows: [StandingRow(*row) for row in rows], GROUP_STANDINGS_QUERY, group_id=group_id)
+
+    def fixtures(self, group_id: int) -> List[Fixture]:
+        """Return every match of a group, played or not, ordered by date."""
+        return self._cached(("fixtures", group_id), lambda rows: [Fixture(*row) for row in rows], GROUP_FIXTURES_QUERY, group_id=group_id)
+
+    def remaining_fixtures(self, group_id: int) -> List[Fixture]:
+        """Return the matches of a group that have not been played yet."""
+        return [fixture for fixture in self.fixtures(group_id) if not fixture.is_played]
+
+    def group_state(self, team: str) -> Optional[GroupState]:
+        """
+        Return the played results and remaining fixtures of the group of a team.
+
+        Args:
+            team (str): The team name, as stored in `teams.country`.
+
+        Returns:
+            GroupState | None: The state of the group, or None if the team is not in any group.
+        """
+        group = self.group_of_team(team)
+        if group is None:
+            return None
+        return self._group_state(group)
+
+    def groups(self) -> List[TeamGroup]:
+        """Return every group of the competition, ordered by name."""
+        return self._cached(("groups",), lambda rows: [TeamGroup(*row) for row in rows], GROUPS_QUERY)
+
+    def group_states(self) -> List[GroupState]:
+        """Return the state of every group of the competition."""
+        return [self._group_state(group) for group in self.groups()]
+
+    def knockout_results(self) -> List[KnockoutResult]:
+        """Return the played knockout matches, with the penalty shootout score of each team."""
+        return self._cached(("knockout_results",), lambda rows: [KnockoutResult(*row) for row in rows], KNOCKOUT_RESULTS_QUERY, tables=TOURNAMENT_TABLES)
+
+    def historical_results(self) -> List[tuple]:
+        """Return the (home, away, home_score, away_score) results of the matches before the competition."""
+        return self._cached(("historical_results",), lambda rows: [tuple(row) for row in rows], HISTORICAL_RESULTS_QUERY, tables=TOURNAMENT_TABLES)
+
+    def shots_on_target(self) -> dict:
+        """Return the average shots on target per match and the number of matches of every team."""
+        return self._cached(("shots_on_target",), lambda rows: {row[0]: (float(row[1]), int(row[2])) for row in rows}, SHOTS_ON_TARGET_QUERY, tables=TOURNAMENT_TABLES)
+
+    def _group_state(self, group: TeamGroup) -> GroupState:
+        fixtures = self.fixtures(group.group_id)
+        teams = [row.team for row in self.standings(group.group_id)]
+        for fixture in fixtures:
+            for name in (fixture.home_team, fixture.away_team):
+                if name not in teams:
+                    teams.append(name)
+        return GroupState(
+            group_name=group.group_name,
+            teams=teams,
+            played=[(f.home_team, f.away_team, f.home_score, f.away_score) for f in fixtures if f.is_played],
+            remaining=[(f.home_team, f.away_team) for f in fixtures if not f.is_played],
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._cache),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+
+    def _cached(self, key, build, query, tables=GROUP_TABLES, **params):
+        version = self.versions.versions(tables)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] == version:
+                self._hits += 1
+                return entry[1]
+            self._misses += 1
+        with self.engine.connect() as connection:
+            value = build(connection.execute(query, params).fetchall())
+        with self._lock:
+            self._cache[key] = (version, value)
+        return value
+
+
+@lru_cache(maxsize=None)
+def get_tournament_repository() -> TournamentRepository:
+    """Shared repository reading from the read engine, invalidated on writes seen on the primary."""
+    if data_versions.engine is None:
+        data_versions.attach(get_primary_engine())
+    repository = TournamentRepository(get_read_engine())
+    register_metrics("tournament_repository", repository.stats)
+    return repository
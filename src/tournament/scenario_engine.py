@@ -0,0 +1,233 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+HOME_WIN, DRAW, AWAY_WIN = 0, 1, 2
+HOME_POINTS = np.array([3, 1, 0])
+AWAY_POINTS = np.array([0, 1, 3])
+
+QUALIFIED = "qualified"
+ELIMINATED = "eliminated"
+DEPENDS_ON_GOALS = "depends on head-to-head goal difference or goals scored"
+UNDECIDED = "level on all head-to-head criteria"
+
+MAX_LISTED_SCENARIOS = 27
+
+
+@dataclass
+class GroupState:
+    """Results and remaining fixtures of a group, with team names as identifiers."""
+    group_name: str
+    teams: List[str]
+    played: List[Tuple[str, str, int, int]]
+    remaining: List[Tuple[str, str]]
+
+
+@dataclass
+class QualificationReport:
+    """Outcome of the scenario analysis for one team."""
+    team: str
+    group: GroupState
+    standings: List[Dict]
+    scenarios: List[Tuple[Tuple[int, ...], str]]
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def status(self) -> str:
+        if self.counts.get(QUALIFIED, 0) == len(self.scenarios):
+            return "already qualified"
+        if self.counts.get(ELIMINATED, 0) == len(self.scenarios):
+            return "cannot qualify anymore"
+        return "still possible"
+
+    def describe(self) -> str:
+        """Render the report as plain text for the LLM to phrase."""
+        lines = [f"Team: {self.team} (Group {self.group.group_name}). Qualification: {self.status}."]
+        lines.append("Current standings (team: points, played, goal difference, goals for):")
+        for row in self.standings:
+            lines.append(f"- {row['team']}: {row['points']} pts, {row['played']} played, GD {row['goal_difference']:+d}, GF {row['goals_for']}")
+        if not self.group.remaining:
+            lines.append("All group matches have been played.")
+            return "\n".join(lines)
+
+        lines.append("Remaining group matches: " + "; ".join(f"{home} vs {away}" for home, away in self.group.remaining))
+        lines.append(
+            f"Out of {len(self.scenarios)} possible combinations of results, {self.team} qualifies in {self.counts.get(QUALIFIED, 0)}, "
+            f"is eliminated in {self.counts.get(ELIMINATED, 0)} and depends on tie-breakers in "
+            f"{len(self.scenarios) - self.counts.get(QUALIFIED, 0) - self.counts.get(ELIMINATED, 0)}."
+        )
+        if len(self.scenarios) <= MAX_LISTED_SCENARIOS:
+            lines.append("Scenarios:")
+            for outcome, status in self.scenarios:
+                lines.append(f"- {self._describe_outcome(outcome)} -> {self.team} {status}")
+        else:
+            lines.append(f"Scenarios by the results of {self.team}'s own matches:")
+            lines.extend(self._describe_by_own_results())
+        return "\n".join(lines)
+
+    def _describe_outcome(self, outcome) -> str:
+        return self._describe_results(enumerate(outcome))
+
+    def _describe_results(self, results) -> str:
+        phrases = []
+        for i, result in results:
+            home, away = self.group.remaining[i]
+            if result == HOME_WIN:
+                phrases.append(f"{home} beat {away}")
+            elif result == AWAY_WIN:
+                phrases.append(f"{away} beat {home}")
+            else:
+                phrases.append(f"{home} draw with {away}")
+        return "; ".join(phrases)
+
+    def _describe_by_own_results(self) -> List[str]:
+        own = [i for i, fixture in enumerate(self.group.remaining) if self.team in fixture]
+        grouped = {}
+        for outcome, status in self.scenarios:
+            statuses = grouped.setdefault(tuple(outcome[i] for i in own), {})
+            statuses[status] = statuses.get(status, 0) + 1
+        lines = []
+        for own_results, statuses in grouped.items():
+            description = self._describe_results(zip(own, own_results)) or "Any result"
+            summary = ", ".join(f"{status} in {count}" for status, count in statuses.items())
+            lines.append(f"- {description}: {summary} of {sum(statuses.values())} combinations of the other results")
+        return lines
+
+
+class QualificationScenarioEngine:
+    """
+    Enumerates every combination of win/draw/loss for the remaining group matches and decides,
+    for each one, whether a team finishes in the qualifying places.
+
+    Points are computed for the whole 3^n result space at once with NumPy. Teams level on points
+    are separated with the head-to-head criteria of the competition rules (points, goal difference,
+    goals scored) applied to all of them, then re-applied to the teams that remain level on all three. When a criterion depends on the score
+    of a match that has not been played yet, the scenario is reported as depending on goals.
+    """
+
+    def __init__(self, group: GroupState, qualifying_places: int = 2):
+        self.group = group
+        self.qualifying_places = qualifying_places
+        self.team_index = {team: i for i, team in enumerate(group.teams)}
+
+    def outcome_matrix(self) -> np.ndarray:
+        """Return every combination of results of the remaining matches, one row per scenario."""
+        n = len(self.group.remaining)
+        scenarios = np.arange(3 ** n)[:, None]
+        return (scenarios // 3 ** np.arange(n)[::-1]) % 3
+
+    def points(self, outcomes: np.ndarray) -> np.ndarray:
+        """Return the final points of every team (columns) in every scenario (rows)."""
+        n_teams = len(self.group.teams)
+        base = np.zeros(n_teams, dtype=int)
+        for home, away, home_score, away_score in self.group.played:
+            result = HOME_WIN if home_score > away_score else AWAY_WIN if home_score < away_score else DRAW
+            base[self.team_index[home]] += HOME_POINTS[result]
+            base[self.team_index[away]] += AWAY_POINTS[result]
+
+        home_incidence = np.zeros((len(self.group.remaining), n_teams), dtype=int)
+        away_incidence = np.zeros((len(self.group.remaining), n_teams), dtype=int)
+        for i, (home, away) in enumerate(self.group.remaining):
+            home_incidence[i, self.team_index[home]] = 1
+            away_incidence[i, self.team_index[away]] = 1
+        return base + HOME_POINTS[outcomes] @ home_incidence + AWAY_POINTS[outcomes] @ away_incidence
+
+    def analyze(self, team: str) -> QualificationReport:
+        """
+        Decide the qualification status of a team in every scenario.
+
+        Args:
+            team (str): The team name, as listed in the group.
+
+        Returns:
+            QualificationReport: The status of the team per scenario and the aggregated counts.
+        """
+        t = self.team_index[team]
+        outcomes = self.outcome_matrix()
+        points = self.points(outcomes)
+        above = (points > points[:, [t]]).sum(axis=1)
+        level = (points == points[:, [t]]).sum(axis=1) - 1
+
+        statuses = np.full(len(outcomes), "", dtype=object)
+        statuses[above + level < self.qualifying_places] = QUALIFIED
+        statuses[above >= self.qualifying_places] = ELIMINATED
+        for s in np.flatnonzero(statuses == ""):
+            tied = [self.group.teams[i] for i in np.flatnonzero(points[s] == points[s, t])]
+            statuses[s] = self._tie_status(tied, team, self.qualifying_places - above[s], outcomes[s])
+
+        scenarios = [(tuple(int(result) for result in outcome), str(status)) for outcome, status in zip(outcomes, statuses)]
+        counts = {}
+        for _, status in scenarios:
+            counts[status] = counts.get(status, 0) + 1
+        return QualificationReport(team=team, group=self.group, standings=self.standings(), scenarios=scenarios, counts=counts)
+
+    def standings(self) -> List[Dict]:
+        """Current table computed from the played matches, ordered by points, goal difference and goals."""
+        table = {team: {"team": team, "points": 0, "played": 0, "goals_for": 0, "goals_against": 0} for team in self.group.teams}
+        for home, away, home_score, away_score in self.group.played:
+            result = HOME_WIN if home_score > away_score else AWAY_WIN if home_score < away_score else DRAW
+            for name, scored, conceded, points in ((home, home_score, away_score, HOME_POINTS[result]), (away, away_score, home_score, AWAY_POINTS[result])):
+                table[name]["points"] += int(points)
+                table[name]["played"] += 1
+                table[name]["goals_for"] += scored
+                table[name]["goals_against"] += conceded
+        for row in table.values():
+            row["goal_difference"] = row["goals_for"] - row["goals_against"]
+        return sorted(table.values(), key=lambda row: (row["points"], row["goal_difference"], row["goals_for"]), reverse=True)
+
+    def _tie_status(self, tied: List[str], team: str, places: int, outcome) -> str:
+        """
+        Apply the head-to-head criteria to the teams level on points with `team`.
+
+        Points, goal difference and goals scored are applied in turn to the whole tied group; only
+        then are they re-applied to the teams that are still level on all three.
+        """
+        keys = {name: () for name in tied}
+        for criterion in self._head_to_head(tied, outcome):
+            if criterion is None:
+                return DEPENDS_ON_GOALS
+            keys = {name: keys[name] + (criterion[name],) for name in tied}
+            above = sum(1 for other in tied if keys[other] > keys[team])
+            level = sum(1 for other in tied if keys[other] == keys[team]) - 1
+            if above + level < places:
+                return QUALIFIED
+            if above >= places:
+                return ELIMINATED
+        still_tied = [other for other in tied if keys[other] == keys[team]]
+        if len(still_tied) < len(tied):
+            return self._tie_status(still_tied, team, places - above, outcome)
+        return UNDECIDED
+
+    def _head_to_head(self, tied: List[str], outcome):
+        """
+        Return the head-to-head points, goal difference and goals scored among the tied teams.
+
+        Goal difference is unknown (None) when a decisive match between them is still to be played,
+        goals scored when any match between them is still to be played, unless only two teams are
+        level and that match is a draw, which adds the same goals to both.
+        """
+        tied_set = set(tied)
+        points = {name: 0 for name in tied}
+        goal_difference = {name: 0 for name in tied}
+        goals = {name: 0 for name in tied}
+        for home, away, home_score, away_score in self.group.played:
+            if home in tied_set and away in tied_set:
+                result = HOME_WIN if home_score > away_score else AWAY_WIN if home_score < away_score else DRAW
+                points[home] += HOME_POINTS[result]
+                points[away] += AWAY_POINTS[result]
+                goal_difference[home] += home_score - away_score
+                goal_difference[away] += away_score - home_score
+                goals[home] += home_score
+                goals[away] += away_score
+
+        unknown_results = []
+        for (home, away), result in zip(self.group.remaining, outcome):
+            if home in tied_set and away in tied_set:
+                points[home] += HOME_POINTS[result]
+                points[away] += AWAY_POINTS[result]
+                unknown_results.append(result)
+
+        goal_difference_known = all(result == DRAW for result in unknown_results)
+        goals_known = not unknown_results or (len(tied) == 2 and goal_difference_known)
+        return [points, goal_difference if goal_difference_known else None, goals if goals_known else None]
@@ -0,0 +1,361 @@
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.data_versions import data_versions
+from services.metrics import register_metrics
+from tournament.repository import TOURNAMENT_TABLES, TournamentRepository, get_tournament_repository
+from tournament.scenario_engine import GroupState
+
+KNOCKOUT_STAGES = ["Quarter Finals", "Semi Finals", "Final"]
+WINNER = "Winner"
+STAGES = KNOCKOUT_STAGES + [WINNER]
+
+# Quarter-final pairings as (group, position) seeds. Semi-finals pair the winners of quarter-finals
+# 1 and 2, and 3 and 4, and the final pairs the winners of the semi-finals.
+EURO_2025_QUARTER_FINALS = [
+    (("A", 1), ("B", 2)),
+    (("C", 1), ("D", 2)),
+    (("B", 1), ("A", 2)),
+    (("D", 1), ("C", 2)),
+]
+
+_GROUP_LETTER = re.compile(r"([A-Za-z])\s*$")
+
+DEFAULT_GOAL_RATE = 1.3
+EXTRA_TIME_FRACTION = 1 / 3
+
+# Ranking keys are packed into a single integer, 7 bits per criterion.
+_KEY_BITS = 7
+_KEY_OFFSET = 2 ** (_KEY_BITS - 1)
+
+
+def group_letter(group_name: str) -> str:
+    """Return the letter of a group as used in the bracket, e.g. "B" for "Group B" or "b"."""
+    match = _GROUP_LETTER.search(group_name)
+    return match.group(1).upper() if match else group_name
+
+
+def _pack_key(criteria) -> np.ndarray:
+    """Pack the ranking criteria, most important first, into one integer per team."""
+    key = np.zeros(criteria[0].shape, dtype=np.int64)
+    for criterion in criteria:
+        key = (key << _KEY_BITS) + np.clip(criterion, -_KEY_OFFSET + 1, _KEY_OFFSET - 1) + _KEY_OFFSET
+    return key
+
+
+def _rank(key: np.ndarray) -> np.ndarray:
+    """Return the number of teams of the group with a lower key, one row per simulation."""
+    return (key[:, None, :] < key[:, :, None]).sum(axis=2)
+
+
+def _ties(rank: np.ndarray) -> np.ndarray:
+    return rank[:, :, None] == rank[:, None, :]
+
+
+def _has_ties(rank: np.ndarray) -> np.ndarray:
+    """Return whether any two teams of the group are level, one value per simulation."""
+    return _ties(rank).sum(axis=(1, 2)) > rank.shape[1]
+
+
+@dataclass
+class TeamStrengths:
+    """Poisson scoring model: a team scores `base_rate * attack[team] * defence[opponent]` goals on average."""
+    teams: List[str]
+    attack: np.ndarray
+    defence: np.ndarray
+    base_rate: float
+
+    def index(self) -> Dict[str, int]:
+        return {team: i for i, team in enumerate(self.teams)}
+
+
+def estimate_strengths(teams: Sequence[str], results: Sequence[Tuple[str, str, int, int]], shots_on_target: Dict[str, Tuple[float, int]] = None,
+                       prior_matches: float = None, shots_weight: float = None, overrides: Dict[str, Tuple[float, float]] = None) -> TeamStrengths:
+    """
+    Estimate the attack and defence strength of every team from past results.
+
+    Args:
+        teams (list[str]): The teams to rate.
+        results (list[tuple]): Past (home, away, home_score, away_score) results, e.g. historical and played matches.
+        shots_on_target (dict): Average shots on target per match and number of matches of each team,
+            blended into the attack strength with weight `shots_weight`.
+        prior_matches (float): Number of average matches every team starts with, shrinking the ratings of
+            teams with few results towards the average.
+        shots_weight (float): Weight of the shots on target in the attack strength, between 0 and 1.
+        overrides (dict): (attack, defence) ratings that replace the estimate of some teams.
+
+    Returns:
+        TeamStrengths: The ratings of the teams, relative to the average team.
+    """
+    prior_matches = float(prior_matches if prior_matches is not None else os.getenv("SIMULATION_PRIOR_MATCHES", 5))
+    shots_weight = float(shots_weight if shots_weight is not None else os.getenv("SIMULATION_SHOTS_WEIGHT", 0.5))
+    index = {team: i for i, team in enumerate(teams)}
+    goals_for = np.zeros(len(teams))
+    goals_against = np.zeros(len(teams))
+    matches = np.zeros(len(teams))
+    total_goals, total_matches = 0, 0
+    for home, away, home_score, away_score in results:
+        total_goals += home_score + away_score
+        total_matches += 1
+        for team, scored, conceded in ((home, home_score, away_score), (away, away_score, home_score)):
+            if team in index:
+                goals_for[index[team]] += scored
+                goals_against[index[team]] += conceded
+                matches[index[team]] += 1
+
+    base_rate = total_goals / (2 * total_matches) if total_goals else DEFAULT_GOAL_RATE
+    weight = matches + prior_matches
+    attack = np.divide(goals_for + prior_matches * base_rate, weight * base_rate, out=np.ones(len(teams)), where=weight > 0)
+    defence = np.divide(goals_against + prior_matches * base_rate, weight * base_rate, out=np.ones(len(teams)), where=weight > 0)
+
+    if shots_on_target and shots_weight > 0:
+        rated = [(index[team], average, count) for team, (average, count) in shots_on_target.items() if team in index and count]
+        mean = sum(average * count for _, average, count in rated) / sum(count for _, _, count in rated) if rated else 0
+        if mean > 0:
+            shots_attack = np.ones(len(teams))
+            for i, average, count in rated:
+                shots_attack[i] = (average * count + prior_matches * mean) / (count + prior_matches) / mean
+            attack = attack ** (1 - shots_weight) * shots_attack ** shots_weight
+
+    for team, (team_attack, team_defence) in (overrides or {}).items():
+        if team in index:
+            attack[index[team]] = team_attack
+            defence[index[team]] = team_defence
+    return TeamStrengths(teams=list(teams), attack=attack, defence=defence, base_rate=base_rate)
+
+
+def strength_overrides(value: str = None) -> Dict[str, Tuple[float, float]]:
+    """
+    Parse the (attack, defence) ratings that replace the estimate of some teams.
+
+    Args:
+        value (str): A JSON object mapping team names to [attack, defence], by default the
+            SIMULATION_STRENGTH_OVERRIDES setting, e.g. '{"Spain": [1.4, 0.8]}'.
+
+    Returns:
+        dict: The ratings by team, empty when none are set or the setting is invalid.
+    """
+    value = value if value is not None else os.getenv("SIMULATION_STRENGTH_OVERRIDES", "")
+    if not value.strip():
+        return {}
+    try:
+        return {team: (float(attack), float(defence)) for team, (attack, defence) in json.loads(value).items()}
+    except (ValueError, TypeError, AttributeError) as e:
+        print(f"Error reading SIMULATION_STRENGTH_OVERRIDES: {e}")
+        return {}
+
+
+@dataclass
+class SimulationResult:
+    """Share of the simulated tournaments in which each team reached each stage."""
+    n_simulations: int
+    probabilities: Dict[str, Dict[str, float]]
+    stages: List[str] = field(default_factory=lambda: list(STAGES))
+
+    def describe(self, teams: Sequence[str] = None) -> str:
+        """Render the probabilities of the given teams, or of every team by chance of winning, as plain text."""
+        if teams is None:
+            teams = sorted(self.probabilities, key=lambda team: [self.probabilities[team][stage] for stage in reversed(self.stages)], reverse=True)
+        lines = [f"Probabilities over {self.n_simulations} simulated tournaments (reach {', '.join(self.stages[:-1])}, or win the tournament):"]
+        for team in teams:
+            chances = ", ".join(f"{stage} {self.probabilities[team][stage]:.1%}" for stage in self.stages)
+            lines.append(f"- {team}: {chances}")
+        return "\n".join(lines)
+
+
+class TournamentSimulator:
+    """
+    Monte Carlo simulation of the rest of the tournament.
+
+    Every remaining match is sampled for all simulations at once with NumPy: goals follow a Poisson
+    distribution given the strengths of both teams, and level knockout matches go to extra time and
+    then to a penalty shootout won by either team with equal probability. Played results, group and
+    knockout, are kept as they are.
+
+    Group tables are ranked with the Euro 2025 criteria: points, then head-to-head points, goal
+    difference and goals scored among the teams level on points, re-applied to the teams that remain
+    level as QualificationScenarioEngine does, then overall goal difference and goals scored, and
+    drawing of lots.
+    """
+
+    def __init__(self, groups: List[GroupState], strengths: TeamStrengths, knockout_results: Sequence = (),
+                 quarter_finals=EURO_2025_QUARTER_FINALS):
+        # Groups are stored as e.g. "Group B": the bracket refers to them by their letter.
+        self.groups = {group_letter(group.group_name): group for group in groups}
+        for seeds in quarter_finals:
+            for group_name, _ in seeds:
+                if group_name not in self.groups:
+                    raise ValueError(f"Group {group_name} of the knockout bracket is not in the tournament.")
+        self.strengths = strengths
+        self.team_index = strengths.index()
+        self.knockout_results = knockout_results
+        self.quarter_finals = quarter_finals
+
+    def run(self, n_simulations: int = None, seed: Optional[int] = None) -> SimulationResult:
+        """
+        Simulate the tournament `n_simulations` times.
+
+        Args:
+            n_simulations (int): The number of tournaments to simulate.
+            seed (int): Seed of the random generator, for reproducible results.
+
+        Returns:
+            SimulationResult: The probability of every team to reach every stage.
+        """
+        n = int(n_simulations if n_simulations is not None else os.getenv("SIMULATION_RUNS", 100000))
+        rng = np.random.default_rng(seed)
+        positions = {name: self._simulate_group(group, n, rng) for name, group in self.groups.items()}
+
+        reached = np.zeros((len(STAGES), len(self.strengths.teams)), dtype=np.int64)
+        pairs = [
+            (positions[home_group][:, home_position - 1], positions[away_group][:, away_position - 1])
+            for (home_group, home_position), (away_group, away_position) in self.quarter_finals
+        ]
+        for s, stage in enumerate(KNOCKOUT_STAGES):
+            for home, away in pairs:
+                reached[s] += np.bincount(home, minlength=reached.shape[1]) + np.bincount(away, minlength=reached.shape[1])
+            winners = [self._knockout(stage, home, away, rng) for home, away in pairs]
+            pairs = list(zip(winners[::2], winners[1::2]))
+        reached[-1] = np.bincount(winners[0], minlength=reached.shape[1])
+
+        teams = [team for group in self.groups.values() for team in group.teams]
+        probabilities = {team: {stage: float(reached[s, self.team_index[team]] / n) for s, stage in enumerate(STAGES)} for team in teams}
+        return SimulationResult(n_simulations=n, probabilities=probabilities)
+
+    def _simulate_group(self, group: GroupState, n: int, rng) -> np.ndarray:
+        """Return the team indices of the group ordered by final position, one row per simulation."""
+        teams = np.array([self.team_index[team] for team in group.teams])
+        local = {team: i for i, team in enumerate(group.teams)}
+        fixtures = [(home, away) for home, away, _, _ in group.played] + list(group.remaining)
+        home_incidence = np.zeros((len(fixtures), len(teams)), dtype=np.int64)
+        away_incidence = np.zeros((len(fixtures), len(teams)), dtype=np.int64)
+        for m, (home, away) in enumerate(fixtures):
+            home_incidence[m, local[home]] = 1
+            away_incidence[m, local[away]] = 1
+
+        played_home = np.array([home_score for _, _, home_score, _ in group.played], dtype=np.int64)
+        played_away = np.array([away_score for _, _, _, away_score in group.played], dtype=np.int64)
+        remaining_home = np.array([self.team_index[home] for home, _ in group.remaining], dtype=np.int64)
+        remaining_away = np.array([self.team_index[away] for _, away in group.remaining], dtype=np.int64)
+        sampled_home, sampled_away = self._sample_goals(remaining_home, remaining_away, (n, len(group.remaining)), rng)
+        home_goals = np.hstack([np.broadcast_to(played_home, (n, len(group.played))), sampled_home])
+        away_goals = np.hstack([np.broadcast_to(played_away, (n, len(group.played))), sampled_away])
+
+        home_points = 3 * (home_goals > away_goals) + (home_goals == away_goals)
+        away_points = 3 * (away_goals > home_goals) + (home_goals == away_goals)
+        points = home_points @ home_incidence + away_points @ away_incidence
+        goals_for = home_goals @ home_incidence + away_goals @ away_incidence
+        goals_against = away_goals @ home_incidence + home_goals @ away_incidence
+
+        # Teams are ranked by points, then the head-to-head criteria are applied to every set of teams level
+        # on them, and re-applied to the teams still level, until no set is split any further.
+        rank = _rank(points)
+        rows = np.flatnonzero(_has_ties(rank))
+        while len(rows):
+            # A match counts as head-to-head when both teams are level so far.
+            level = (rank[rows] @ home_incidence.T) == (rank[rows] @ away_incidence.T)
+            row_home_points, row_away_points = home_points[rows] * level, away_points[rows] * level
+            row_home_goals, row_away_goals = home_goals[rows] * level, away_goals[rows] * level
+            head_to_head_points = row_home_points @ home_incidence + row_away_points @ away_incidence
+            head_to_head_difference = (row_home_goals - row_away_goals) @ home_incidence + (row_away_goals - row_home_goals) @ away_incidence
+            head_to_head_goals = row_home_goals @ home_incidence + row_away_goals @ away_incidence
+            refined = _rank(_pack_key((rank[rows], head_to_head_points, head_to_head_difference, head_to_head_goals)))
+            split = ~(_ties(refined) == _ties(rank[rows])).all(axis=(1, 2))
+            rank[rows] = refined
+            rows = rows[split & _has_ties(refined)]
+
+        key = _pack_key((rank, goals_for - goals_against, goals_for))
+        key = (key << _KEY_BITS) + rng.integers(0, 2 ** _KEY_BITS, size=key.shape)
+        return teams[np.argsort(-key, axis=1)]
+
+    def _sample_goals(self, home: np.ndarray, away: np.ndarray, size, rng, fraction: float = 1.0):
+        strengths = self.strengths
+        home_rate = fraction * strengths.base_rate * strengths.attack[home] * strengths.defence[away]
+        away_rate = fraction * strengths.base_rate * strengths.attack[away] * strengths.defence[home]
+        return rng.poisson(np.broadcast_to(home_rate, size)), rng.poisson(np.broadcast_to(away_rate, size))
+
+    def _knockout(self, stage: str, home: np.ndarray, away: np.ndarray, rng) -> np.ndarray:
+        """Return the winner of a knockout match in every simulation."""
+        home_goals, away_goals = self._sample_goals(home, away, home.shape, rng)
+        extra_home, extra_away = self._sample_goals(home, away, home.shape, rng, fraction=EXTRA_TIME_FRACTION)
+        level = home_goals == away_goals
+        home_goals = home_goals + level * extra_home
+        away_goals = away_goals + level * extra_away
+        shootout = rng.random(home.shape) < 0.5
+        winners = np.where(home_goals > away_goals, home, np.where(away_goals > home_goals, away, np.where(shootout, home, away)))
+
+        for result in self.knockout_results:
+            if result.stage_name != stage or result.home_team not in self.team_index or result.away_team not in self.team_index:
+                continue
+            a, b = self.team_index[result.home_team], self.team_index[result.away_team]
+            played = ((home == a) & (away == b)) | ((home == b) & (away == a))
+            winners[played] = self.team_index[result.winner]
+        return winners
+
+
+class TournamentForecaster:
+    """
+    Serves the simulated stage probabilities of the tournament.
+
+    The simulation is run on the first request and reused until a new result is recorded in
+    any of the tables it is built from.
+    """
+
+    def __init__(self, repository: TournamentRepository, versions=data_versions, n_simulations: int = None, seed: Optional[int] = None,
+                 overrides: Dict[str, Tuple[float, float]] = None):
+        self.repository = repository
+        self.versions = versions
+        self.n_simulations = n_simulations
+        self.seed = seed
+        self.overrides = overrides if overrides is not None else strength_overrides()
+        self._result = None
+        self._version = None
+        self._lock = threading.Lock()
+        self._runs = 0
+        self._hits = 0
+        self._last_run_ms = 0.0
+
+    def forecast(self) -> SimulationResult:
+        """Return the stage probabilities of every team, simulating the tournament when the data changed."""
+        with self._lock:
+            version = self.versions.versions(TOURNAMENT_TABLES)
+            if self._result is not None and self._version == version:
+                self._hits += 1
+                return self._result
+
+            start = time.perf_counter()
+            groups = self.repository.group_states()
+            teams = [team for group in groups for team in group.teams]
+            results = list(self.repository.historical_results()) + [result for group in groups for result in group.played]
+            strengths = estimate_strengths(teams, results, shots_on_target=self.repository.shots_on_target(), overrides=self.overrides)
+            simulator = TournamentSimulator(groups, strengths, knockout_results=self.repository.knockout_results())
+            self._result = simulator.run(self.n_simulations, seed=self.seed)
+            self._version = version
+            self._runs += 1
+            self._last_run_ms = (time.perf_counter() - start) * 1000
+            return self._result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "runs": self._runs,
+                "hits": self._hits,
+                "last_run_ms": round(self._last_run_ms, 1),
+                "n_simulations": self._result.n_simulations if self._result else 0,
+            }
+
+
+@lru_cache(maxsize=None)
+def get_tournament_forecaster() -> TournamentForecaster:
+    """Shared forecaster reading from the shared tournament repository."""
+    forecaster = TournamentForecaster(get_tournament_repository())
+    register_metrics("tournament_forecast", forecaster.stats)
+    return forecaster
@@ -5,13 +5,15 @@ from unittest.mock import MagicMock, patch
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../src')))
 
-from agents.qualification_agent import handle_qualification_question
+from agents.qualification_agent import analyze_qualification, handle_qualification_question
+from tournament.scenario_engine import GroupState
 
 class TestQualificationAgent(unittest.TestCase):
     
+    @patch('agents.qualification_agent.analyze_qualification', return_value=None)
     @patch('agents.qualification_agent.get_sql_tool')
     @patch('agents.qualification_agent.PromptTemplate')
-    def test_handle_qualification_question_success(self, mock_prompt_template, mock_sql_tool):
+    def test_handle_qualification_question_success(self, mock_prompt_template, mock_sql_tool, mock_analyze_qualification):
         # GIVEN
         mock_llm = MagicMock()
         question = "What does Spain need to qualify?"
@@ -49,9 +51,10 @@ class TestQualificationAgent(unittest.TestCase):
             "language": question_language,
         })
 
+    @patch('agents.qualification_agent.analyze_qualification', return_value=None)
     @patch('agents.qualification_agent.get_sql_tool')
     @patch('agents.qualification_agent.PromptTemplate')
-    def test_handle_qualification_question_different_language(self, mock_prompt_template, mock_sql_tool):
+    def test_handle_qualification_question_different_language(self, mock_prompt_template, mock_sql_tool, mock_analyze_qualification):
         # GIVEN
         mock_llm = MagicMock()
         question = "¿Qué necesita España para clasificarse?"
@@ -80,9 +83,10 @@ class TestQualificationAgent(unittest.TestCase):
         call_args = mock_chain.invoke.call_args[0][0]
         self.assertEqual(call_args["language"], "Spanish")
 
+    @patch('agents.qualification_agent.analyze_qualification', return_value=None)
     @patch('agents.qualification_agent.get_sql_tool')
     @patch('agents.qualification_agent.PromptTemplate')
-    def test_handle_qualification_question_prompt_template_creation(self, mock_prompt_template, mock_sql_tool):
+    def test_handle_qualification_question_prompt_template_creation(self, mock_prompt_template, mock_sql_tool, mock_analyze_qualification):
         # GIVEN
         mock_llm = MagicMock()
         question = "What about France?"
@@ -105,5 +109,76 @@ class TestQualificationAgent(unittest.TestCase):
         self.assertEqual(call_args[1]["input_variables"], ["question", "sql_data", "rules", "language"])
         self.assertIn("template", call_args[1])
 
+    @patch('agents.qualification_agent.analyze_qualification')
+    @patch('agents.qualification_agent.get_sql_tool')
+    @patch('agents.qualification_agent.PromptTemplate')
+    def test_handle_qualification_question_with_computed_scenarios(self, mock_prompt_template, mock_sql_tool, mock_analyze_qualification):
+        # GIVEN
+        mock_llm = MagicMock()
+        question = "What does Spain need to qualify?"
+        mock_analyze_qualification.return_value.describe.return_value = "Team: Spain (Group B). Qualification: already qualified."
+        mock_chain = MagicMock()
+        mock_chain.invoke.return_value = "Spain is already qualified."
+        mock_template = MagicMock()
+        mock_template.__or__ = MagicMock(return_value=mock_chain)
+        mock_prompt_template.return_value = mock_template
+
+        # WHEN
+        result = handle_qualification_question(mock_llm, question, "English")
+
+        # THEN
+        self.assertEqual(result, "Spain is already qualified.")
+        mock_sql_tool.invoke.assert_not_called()
+        self.assertEqual(mock_prompt_template.call_args[1]["input_variables"], ["question", "analysis", "language"])
+        mock_chain.invoke.assert_called_once_with({
+            "question": question,
+            "analysis": "Team: Spain (Group B). Qualification: already qualified.",
+            "language": "English",
+        })
+
+    @patch('agents.qualification_agent.get_tournament_repository')
+    def test_analyze_qualification(self, mock_get_tournament_repository):
+        # GIVEN
+        repository = mock_get_tournament_repository.return_value
+        repository.team_names.return_value = ["Spain", "Italy", "Portugal", "Belgium"]
+        repository.group_state.return_value = GroupState(
+            group_name="B",
+            teams=["Spain", "Portugal", "Belgium", "Italy"],
+            played=[("Spain", "Portugal", 5, 0), ("Belgium", "Italy", 0, 1), ("Spain", "Belgium", 6, 2), ("Portugal", "Italy", 1, 1)],
+            remaining=[("Italy", "Spain"), ("Portugal", "Belgium")],
+        )
+
+        # WHEN
+        report = analyze_qualification("What does Spain need to qualify?")
+
+        # THEN
+        repository.group_state.assert_called_once_with("Spain")
+        self.assertEqual(report.team, "Spain")
+        self.assertEqual(report.status, "already qualified")
+
+    @patch('agents.qualification_agent.get_tournament_repository')
+    def test_analyze_qualification_of_the_team_asked_about(self, mock_get_tournament_repository):
+        # GIVEN
+        repository = mock_get_tournament_repository.return_value
+        repository.team_names.return_value = ["Spain", "Italy", "Portugal", "Belgium"]
+        repository.group_state.return_value = None
+
+        # WHEN
+        analyze_qualification("What does Spain need to qualify if Italy beats Portugal?")
+
+        # THEN
+        repository.group_state.assert_called_once_with("Spain")
+
+    @patch('agents.qualification_agent.get_tournament_repository')
+    def test_analyze_qualification_without_known_team(self, mock_get_tournament_repository):
+        # GIVEN
+        mock_get_tournament_repository.return_value.team_names.return_value = ["Spain"]
+
+        # WHEN
+        report = analyze_qualification("What does Atlantis need to qualify?")
+
+        # THEN
+        self.assertIsNone(report)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
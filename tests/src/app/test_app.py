@@ -25,6 +25,18 @@ class TestApp(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), {"greeting": "Hello UEFA Women's EURO 2025"})
 
+    @patch('app.collect_metrics')
+    def test_metrics_endpoint(self, mock_collect_metrics):
+        # GIVEN
+        mock_collect_metrics.return_value = {"sql_result_cache": {"hits": 3}}
+
+        # WHEN
+        response = self.client.get("/metrics")
+
+        # THEN
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"sql_result_cache": {"hits": 3}})
+
     @patch('app.agent')
     def test_send_message_success(self, mock_agent):
         # GIVEN
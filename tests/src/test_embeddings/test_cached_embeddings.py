@@ -0,0 +1,91 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../src')))
+from rag.embeddings.cached_embeddings import CachedEmbeddings, normalize_text
+
+
+def fake_model():
+    model = MagicMock()
+    model.embed_query.side_effect = lambda text: [float(len(text)), 1.0]
+    model.embed_documents.side_effect = lambda texts: [[float(len(text)), 2.0] for text in texts]
+    return model
+
+
+class TestCachedEmbeddings(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache.sqlite")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_normalize_text(self):
+        self.assertEqual(normalize_text("  Who is\n the  coach? "), "Who is the coach?")
+
+    def test_identical_queries_are_embedded_once(self):
+        # GIVEN
+        model = fake_model()
+        embeddings = CachedEmbeddings(model, "test:model", path=None)
+        embeddings.embed_query("Who is the coach of Spain?")
+
+        # WHEN
+        vector = embeddings.embed_query("Who is the  coach of Spain? ")
+
+        # THEN
+        self.assertEqual(vector, [26.0, 1.0])
+        model.embed_query.assert_called_once()
+        self.assertEqual(embeddings.stats()["memory_hits"], 1)
+
+    def test_documents_only_embed_missing_texts(self):
+        # GIVEN
+        model = fake_model()
+        embeddings = CachedEmbeddings(model, "test:model", path=None)
+        embeddings.embed_documents(["chunk a", "chunk bb"])
+
+        # WHEN
+        vectors = embeddings.embed_documents(["chunk bb", "chunk ccc", "chunk ccc"])
+
+        # THEN
+        self.assertEqual(vectors, [[8.0, 2.0], [9.0, 2.0], [9.0, 2.0]])
+        model.embed_documents.assert_called_with(["chunk ccc"])
+
+    def test_vectors_persist_on_disk(self):
+        # GIVEN
+        CachedEmbeddings(fake_model(), "test:model", path=self.path).embed_documents(["chunk a"])
+        model = fake_model()
+
+        # WHEN
+        vector = CachedEmbeddings(model, "test:model", path=self.path).embed_query("chunk a")
+
+        # THEN
+        self.assertEqual(vector, [7.0, 2.0])
+        model.embed_query.assert_not_called()
+
+    def test_keys_include_the_model(self):
+        # GIVEN
+        CachedEmbeddings(fake_model(), "test:model", path=self.path).embed_query("chunk a")
+        model = fake_model()
+
+        # WHEN
+        CachedEmbeddings(model, "test:other-model", path=self.path).embed_query("chunk a")
+
+        # THEN
+        model.embed_query.assert_called_once_with("chunk a")
+
+    def test_memory_is_bounded(self):
+        # GIVEN
+        embeddings = CachedEmbeddings(fake_model(), "test:model", max_entries=2, path=None)
+
+        # WHEN
+        embeddings.embed_documents(["a", "bb", "ccc"])
+
+        # THEN
+        self.assertEqual(embeddings.stats()["entries"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,7 +4,9 @@ import unittest
 from unittest.mock import mock_open, patch
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../src')))
+from rag.embeddings.cached_embeddings import CachedEmbeddings
 from rag.embeddings.embedding_factory import EmbeddingFactory
+from rag.embeddings.truncated_embeddings import TruncatedEmbeddings
 
 class TestEmbeddingFactory(unittest.TestCase):
 
@@ -15,7 +17,7 @@ class TestEmbeddingFactory(unittest.TestCase):
         factory = EmbeddingFactory(embedding_type="openai")
 
         # WHEN
-        embedding = factory.create_embedding()
+        embedding = factory.create_embedding(cached=False)
 
         # THEN
         self.assertEqual(embedding, "MockOpenAIEmbedding")
@@ -29,12 +31,65 @@ class TestEmbeddingFactory(unittest.TestCase):
         factory = EmbeddingFactory(embedding_type="ollama")
 
         # WHEN
-        embedding = factory.create_embedding()
+        embedding = factory.create_embedding(cached=False)
 
         # THEN
         self.assertEqual(embedding, "MockOllamaEmbedding")
         mock_ollama_embeddings.assert_called_once_with(model="test-model")
 
+    @patch.dict(os.environ, {"EMBEDDING_CACHE_PATH": ""})
+    @patch("langchain_openai.OpenAIEmbeddings")
+    def test_create_cached_embedding(self, mock_openai_embeddings):
+        # GIVEN
+        factory = EmbeddingFactory(embedding_type="openai")
+
+        # WHEN
+        embedding = factory.create_embedding()
+
+        # THEN
+        self.assertIsInstance(embedding, CachedEmbeddings)
+        self.assertIs(embedding.embeddings, mock_openai_embeddings.return_value)
+        self.assertEqual(embedding.model_id, "openai:text-embedding-3-large")
+
+    @patch("langchain_openai.OpenAIEmbeddings")
+    def test_openai_returns_truncated_dimensions(self, mock_openai_embeddings):
+        # GIVEN
+        factory = EmbeddingFactory(embedding_type="openai", dimensions=256)
+
+        # WHEN
+        factory.create_embedding(cached=False)
+
+        # THEN
+        self.assertEqual(mock_openai_embeddings.call_args.kwargs["dimensions"], 256)
+        self.assertEqual(factory.model_id(), "openai:text-embedding-3-large@256")
+
+    @patch.dict(os.environ, {"EMBEDDING_DIMENSIONS": "512"})
+    @patch("builtins.open", new_callable=mock_open, read_data='{"embedding_models": [{"type": "ollama", "params": {"model": "mxbai-embed-large"}}]}')
+    @patch("langchain_ollama.OllamaEmbeddings")
+    def test_ollama_vectors_are_truncated(self, mock_ollama_embeddings, mock_file):
+        # GIVEN
+        factory = EmbeddingFactory(embedding_type="ollama")
+
+        # WHEN
+        embedding = factory.create_embedding(cached=False)
+
+        # THEN
+        self.assertIsInstance(embedding, TruncatedEmbeddings)
+        self.assertEqual(embedding.dimensions, 512)
+        mock_ollama_embeddings.assert_called_once_with(model="mxbai-embed-large")
+        self.assertEqual(factory.model_id(), "ollama:mxbai-embed-large@512")
+
+    @patch("builtins.open", new_callable=mock_open, read_data='{"embedding_models": [{"type": "ollama", "params": {"model": "llama3", "dimensions": 256}}]}')
+    def test_truncation_needs_a_matryoshka_model(self, mock_file):
+        # GIVEN
+        factory = EmbeddingFactory(embedding_type="ollama")
+
+        # WHEN / THEN
+        with self.assertRaises(ValueError):
+            factory.create_embedding(cached=False)
+        with self.assertRaises(ValueError):
+            EmbeddingFactory(embedding_type="openai", dimensions=4096).model_id()
+
     def test_invalid_embedding_type(self,):
         # GIVEN
         factory = EmbeddingFactory(embedding_type="invalid_type")
@@ -0,0 +1,32 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../src')))
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from rag.embeddings.truncated_embeddings import TruncatedEmbeddings
+
+
+class TestTruncatedEmbeddings(unittest.TestCase):
+    def test_vectors_are_truncated_and_renormalized(self):
+        # GIVEN
+        model = DeterministicFakeEmbedding(size=32)
+        embedding = TruncatedEmbeddings(model, 8)
+
+        # WHEN
+        query = embedding.embed_query("Who won the final?")
+        documents = embedding.embed_documents(["Spain", "Wales"])
+
+        # THEN
+        full = np.array(model.embed_query("Who won the final?"))[:8]
+        np.testing.assert_allclose(query, full / np.linalg.norm(full), rtol=1e-5)
+        self.assertEqual(np.array(documents).shape, (2, 8))
+        np.testing.assert_allclose(np.linalg.norm(documents, axis=1), [1.0, 1.0], rtol=1e-5)
+        self.assertEqual(embedding.embed_documents([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
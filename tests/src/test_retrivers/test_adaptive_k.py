@@ -0,0 +1,35 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../src')))
+
+from rag.adaptive_k import AdaptiveTopK
+
+
+class TestAdaptiveTopK(unittest.TestCase):
+    def setUp(self):
+        self.adaptive_k = AdaptiveTopK(min_k=2, max_k=6, fetch_k=10, min_gap=0.1, cumulative_share=0.5)
+
+    def test_sharp_query_cuts_at_elbow(self):
+        self.assertEqual(self.adaptive_k.cut([0.95, 0.9, 0.4, 0.38, 0.35]), 2)
+
+    def test_elbow_after_min_k(self):
+        self.assertEqual(self.adaptive_k.cut([0.9, 0.3, 0.28, 0.27]), 2)
+
+    def test_smooth_scores_use_cumulative_share(self):
+        self.assertEqual(self.adaptive_k.cut([0.6, 0.58, 0.56, 0.54, 0.52, 0.5, 0.48]), 3)
+
+    def test_bounded_by_max_k(self):
+        self.assertEqual(AdaptiveTopK(min_k=1, max_k=3, fetch_k=3, cumulative_share=1.0).cut([0.5] * 8), 3)
+
+    def test_few_candidates(self):
+        self.assertEqual(self.adaptive_k.cut([0.9]), 1)
+        self.assertEqual(self.adaptive_k.cut([]), 0)
+
+    def test_fetch_k_at_least_max_k(self):
+        self.assertEqual(AdaptiveTopK(min_k=1, max_k=8, fetch_k=4).fetch_k, 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
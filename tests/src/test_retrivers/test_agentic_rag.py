@@ -8,6 +8,7 @@ from unittest.mock import MagicMock, patch
 from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
 
 from rag.agentic_rag import AgenticRAG
+from rag.metadata_model import QuestionMetadataOutput
 
 class TestAgenticRAG(unittest.TestCase):
     def setUp(self):
@@ -81,30 +82,61 @@ class TestAgenticRAG(unittest.TestCase):
         # GIVEN
         mock_llm = MagicMock()
         mock_openai.return_value = mock_llm
+        state = {
+        "messages": [HumanMessage(content="¿Qué puedes decir de España y las Lionesses?")]
+        }
+        agentic_rag = AgenticRAG(self.mock_vector_store)
+
+        # WHEN
+        result = agentic_rag._extract_metadata(state)
+
+        # THEN
+        self.assertEqual(result["question_metadata"].countries, ["Spain", "England"])
+        mock_llm.with_structured_output.assert_not_called()
+
+    @patch('rag.agentic_rag.ChatOpenAI')
+    def test_extract_metadata_without_entities(self, mock_openai):
+        # GIVEN
+        mock_llm = MagicMock()
+        mock_openai.return_value = mock_llm
+        state = {"messages": [HumanMessage(content="Is there VAR?")]}
+        agentic_rag = AgenticRAG(self.mock_vector_store)
+
+        # WHEN
+        result = agentic_rag._extract_metadata(state)
+
+        # THEN
+        self.assertEqual(result["question_metadata"].countries, [])
+        mock_llm.with_structured_output.assert_not_called()
+
+    @patch('rag.agentic_rag.ChatOpenAI')
+    def test_extract_metadata_llm_fallback(self, mock_openai):
+        # GIVEN
+        mock_llm = MagicMock()
+        mock_openai.return_value = mock_llm
         
         # Mock the metadata response
         mock_metadata_result = MagicMock()
-        mock_metadata_result.countries = ["Spain"]
+        mock_metadata_result.countries = ["Australia"]
         
         # Mock the structured output chain
         mock_structured_llm = MagicMock()
         mock_structured_llm.invoke.return_value = mock_metadata_result
         mock_llm.with_structured_output.return_value = mock_structured_llm
         state = {
-        "messages": [HumanMessage(content="What can you say about Spain?")]
+        "messages": [HumanMessage(content="What can you say about the Matildas?")]
         }
         agentic_rag = AgenticRAG(self.mock_vector_store)
-        result = agentic_rag._extract_metadata(state)
-    
+
         # WHEN
-        self.assertIn("question_metadata", result)
-        self.assertEqual(result["question_metadata"].countries, ["Spain"])
+        result = agentic_rag._extract_metadata(state)
 
         # THEN
+        self.assertEqual(result["question_metadata"].countries, ["Australia"])
         mock_llm.with_structured_output.assert_called_once()
         mock_structured_llm.invoke.assert_called_once()
         call_args = mock_structured_llm.invoke.call_args[0][0]
-        self.assertIn("What can you say about Spain?", call_args)
+        self.assertIn("What can you say about the Matildas?", call_args)
 
     @patch('rag.agentic_rag.ChatOpenAI')
     def test_not_found(self, mock_openai):
@@ -215,5 +247,333 @@ class TestAgenticRAG(unittest.TestCase):
         # THEN
         self.assertEqual(result["messages"][-1].content, "Spain has a strong football team with excellent players.")
 
+    @patch.dict(os.environ, {"RAG_TOP_K_MODE": "fixed"})
+    @patch('rag.agentic_rag.ChatOpenAI')
+    def test_agent_keeps_search_kwargs_in_state(self, mock_openai):
+        # GIVEN
+        mock_llm = MagicMock()
+        mock_openai.return_value = mock_llm
+        mock_llm.bind_tools.return_value.invoke.return_value = AIMessage(content="")
+        agentic_rag = AgenticRAG(self.mock_vector_store)
+        state = {
+            "messages": [HumanMessage(content="What can you say about Spain?")],
+            "question_metadata": QuestionMetadataOutput(countries=["Spain"]),
+        }
+
+        # WHEN
+        result = agentic_rag._agent(state)
+
+        # THEN
+        self.assertEqual(result["search_kwargs"], {"filter": {"country": {"$in": ["spain"]}}, "k": 5})
+        mock_llm.bind_tools.assert_called_once()
+        self.assertFalse(hasattr(agentic_rag, "retriever"))
+
+    @patch('rag.agentic_rag.ChatOpenAI')
+    def test_retrieve_uses_search_kwargs_of_the_state(self, mock_openai):
+        # GIVEN
+        self.mock_vector_store.search_with_scores.return_value = [
+            (MagicMock(page_content="Spain won in 2025."), 0.8),
+            (MagicMock(page_content="Spain coach."), 0.6),
+        ]
+        agentic_rag = AgenticRAG(self.mock_vector_store)
+        state = {
+            "messages": [
+                HumanMessage(content="What can you say about Spain?"),
+                AIMessage(content="", tool_calls=[{"name": "retrieverTool", "args": {"__arg1": "Spain"}, "id": "call_1"}]),
+            ],
+            "search_kwargs": {"filter": {"country": {"$in": ["spain"]}}, "k": 3},
+        }
+
+        # WHEN
+        result = agentic_rag._retrieve(state)
+
+        # THEN
+        self.mock_vector_store.search_with_scores.assert_called_once_with("Spain", top_k=3, filter={"country": {"$in": ["spain"]}})
+        self.assertEqual(result["messages"][0].content, "Spain won in 2025.\n\nSpain coach.")
+        self.assertEqual(result["messages"][0].tool_call_id, "call_1")
+        self.assertEqual(result["retrieved_documents"], ["Spain won in 2025.", "Spain coach."])
+        self.assertEqual(result["retrieval_scores"], [0.8, 0.6])
+
+    @patch('rag.agentic_rag.ChatOpenAI')
+    def test_grade_documents_by_score_skips_llm(self, mock_openai):
+        # GIVEN
+        from rag.relevance_grader import ScoreGrader
+        mock_llm = MagicMock()
+        mock_openai.return_value = mock_llm
+        agentic_rag = AgenticRAG(self.mock_vector_store, grader=ScoreGrader(threshold=0.5, margin=0.1, lexical_weight=0.3))
+        state = {
+            "messages": [
+                HumanMessage(content="Who is the coach of Spain?"),
+                ToolMessage(content="Montse Tomé is the coach of Spain.", tool_call_id="call_123"),
+            ],
+            "retrieved_documents": ["Montse Tomé is the coach of Spain."],
+            "retrieval_scores": [0.9],
+        }
+
+        # WHEN
+        result = agentic_rag._grade_documents(state)
+
+        # THEN
+        self.assertEqual(result, "generate")
+        mock_llm.with_structured_output.assert_not_called()
+
+    @patch('rag.agentic_rag.ChatOpenAI')
+    def test_grade_documents_borderline_asks_llm(self, mock_openai):
+        # GIVEN
+        from rag.relevance_grader import ScoreGrader
+        mock_llm = MagicMock()
+        mock_openai.return_value = mock_llm
+        agentic_rag = AgenticRAG(self.mock_vector_store, grader=ScoreGrader(threshold=0.5, margin=0.1, lexical_weight=0.0))
+        agentic_rag._llm_grade = MagicMock(return_value=0.2)
+        state = {
+            "messages": [
+                HumanMessage(content="Who is the coach of Spain?"),
+                ToolMessage(content="Spain played in Bern.", tool_call_id="call_123"),
+            ],
+            "retrieved_documents": ["Spain played in Bern."],
+            "retrieval_scores": [0.5],
+        }
+
+        # WHEN
+        result = agentic_rag._grade_documents(state)
+
+        # THEN
+        self.assertEqual(result, "rewrite")
+        agentic_rag._llm_grade.assert_called_once_with("Who is the coach of Spain?", "Spain played in Bern.")
+
+    @patch('rag.agentic_rag.ChatOpenAI')
+    def test_call_records_metrics(self, mock_openai):
+        # GIVEN
+        from rag.rag_metrics import RAGMetrics
+        metrics = RAGMetrics()
+        agentic_rag = AgenticRAG(self.mock_vector_store, metrics=metrics)
+        agentic_rag.graph = MagicMock()
+
+        # WHEN
+        agentic_rag({"messages": [HumanMessage(content="Is there VAR?")]})
+
+        # THEN
+        stats = metrics.stats()
+        self.assertEqual(stats["graph_builds"]["count"], 1)
+        self.assertEqual(stats["calls"]["count"], 1)
+        self.assertEqual(stats["in_flight"], 0)
+
+    @patch.dict(os.environ, {"RAG_TOP_K_MODE": "fixed"})
+    @patch.object(AgenticRAG, '_generate_response', return_value={"messages": [AIMessage(content="Montse Tomé.")]})
+    @patch('rag.agentic_rag.ChatOpenAI')
+    def test_direct_variant_retrieves_without_agent_call(self, mock_openai, mock_generate_response):
+        # GIVEN
+        from rag.relevance_grader import ScoreGrader
+        mock_llm = MagicMock()
+        mock_openai.return_value = mock_llm
+        self.mock_vector_store.search_with_scores.return_value = [(MagicMock(page_content="Montse Tomé is the coach of Spain."), 0.9)]
+        agentic_rag = AgenticRAG(self.mock_vector_store, grader=ScoreGrader(threshold=0.5, margin=0.1), graph_variant="direct")
+
+        # WHEN
+        result = agentic_rag({"messages": [HumanMessage(content="Who is the coach of Spain?")], "question_language": "English"})
+
+        # THEN
+        self.assertEqual(result["messages"][-1].content, "Montse Tomé.")
+        self.assertNotIn("agent", agentic_rag.graph.get_graph().nodes)
+        self.mock_vector_store.search_with_scores.assert_called_once_with(
+            "Who is the coach of Spain?", top_k=5, filter={"country": {"$in": ["spain"]}}
+        )
+        mock_llm.bind_tools.return_value.invoke.assert_not_called()
+        mock_llm.with_structured_output.assert_not_called()
+
+    @patch.object(AgenticRAG, '_generate_response', return_value={"messages": ["Montse Tomé."]})
+    @patch('rag.agentic_rag.ChatOpenAI')
+    def test_answer_cache_skips_retrieval_for_similar_question(self, mock_openai, mock_generate_response):
+        # GIVEN
+        from rag.relevance_grader import ScoreGrader
+        from rag.semantic_cache import SemanticAnswerCache
+        self.mock_vector_store.generation = 1
+        self.mock_vector_store.embedding_model.embed_query.side_effect = lambda question: [1.0, 0.0] if "coach" in question else [0.0, 1.0]
+        self.mock_vector_store.search_with_scores.return_value = [(MagicMock(page_content="Montse Tomé is the coach of Spain."), 0.9)]
+        cache = SemanticAnswerCache(threshold=0.9, ttl_seconds=60, max_entries=10)
+        agentic_rag = AgenticRAG(self.mock_vector_store, grader=ScoreGrader(threshold=0.5, margin=0.1), answer_cache=cache)
+        agentic_rag({"messages": [HumanMessage(content="Who is the coach of Spain?")], "question_language": "English"})
+
+        # WHEN
+        result = agentic_rag({"messages": [HumanMessage(content="Who coaches Spain? (coach)")], "question_language": "English"})
+
+        # THEN
+        self.assertEqual(result["messages"][-1].content, "Montse Tomé.")
+        self.assertTrue(result["cache_hit"])
+        self.mock_vector_store.search_with_scores.assert_called_once()
+        mock_generate_response.assert_called_once()
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    @patch.object(AgenticRAG, '_generate_response', return_value={"messages": ["Montse Tomé."]})
+    @patch('rag.agentic_rag.ChatOpenAI')
+    def test_answer_cache_invalidated_by_store_reload(self, mock_openai, mock_generate_response):
+        # GIVEN
+        from rag.relevance_grader import ScoreGrader
+        from rag.semantic_cache import SemanticAnswerCache
+        self.mock_vector_store.generation = 1
+        self.mock_vector_store.embedding_model.embed_query.return_value = [1.0, 0.0]
+        self.mock_vector_store.search_with_scores.return_value = [(MagicMock(page_content="Montse Tomé is the coach of Spain."), 0.9)]
+        cache = SemanticAnswerCache(threshold=0.9, ttl_seconds=60, max_entries=10)
+        agentic_rag = AgenticRAG(self.mock_vector_store, grader=ScoreGrader(threshold=0.5, margin=0.1), answer_cache=cache)
+        agentic_rag({"messages": [HumanMessage(content="Who is the coach of Spain?")], "question_language": "English"})
+
+        # WHEN
+        self.mock_vector_store.generation = 2
+        result = agentic_rag({"messages": [HumanMessage(content="Who is the coach of Spain?")], "question_language": "English"})
+
+        # THEN
+        self.assertFalse(result["cache_hit"])
+        self.assertEqual(self.mock_vector_store.search_with_scores.call_count, 2)
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+    @patch('rag.agentic_rag.ChatOpenAI')
+    def test_search_is_hybrid_when_store_has_sparse_index(self, mock_openai):
+        # GIVEN
+        from langchain_core.documents import Document
+        from rag.bm25_index import BM25Index
+        self.mock_vector_store.sparse_index = BM25Index()
+        self.mock_vector_store.sparse_index.add_documents([Document(page_content="VAR is used in every match.")])
+        self.mock_vector_store.search_with_scores.return_value = []
+        agentic_rag = AgenticRAG(self.mock_vector_store, retrieval_mode="hybrid")
+
+        # WHEN
+        results = agentic_rag._search("Is there VAR?", {"filter": {}, "k": 5})
+
+        # THEN
+        self.assertEqual([doc.page_content for doc, _ in results], ["VAR is used in every match."])
+        self.mock_vector_store.search_with_scores.assert_called_once_with("Is there VAR?", top_k=20, filter=None)
+
+    @patch('rag.agentic_rag.ChatOpenAI')
+    def test_hybrid_retrieval_is_disabled_for_stores_without_sparse_index(self, mock_openai):
+        # GIVEN
+        self.mock_vector_store.sparse_index = None
+        self.mock_vector_store.search_with_scores.return_value = []
+
+        # WHEN
+        with self.assertLogs("rag.agentic_rag", level="WARNING") as logs:
+            agentic_rag = AgenticRAG(self.mock_vector_store, retrieval_mode="hybrid")
+        agentic_rag._search("Is there VAR?", {"filter": {}, "k": 5})
+
+        # THEN
+        self.assertEqual(agentic_rag.retrieval_mode, "dense")
+        self.assertIn("hybrid retrieval is disabled", logs.output[0])
+        self.mock_vector_store.search_with_scores.assert_called_once()
+
+    @patch('rag.agentic_rag.ChatOpenAI')
+    def test_multi_query_retrieve_fuses_reformulations(self, mock_openai):
+        # GIVEN
+        from langchain_core.documents import Document
+        from rag.agentic_rag import Reformulations
+        mock_llm = MagicMock()
+        mock_openai.return_value = mock_llm
+        mock_llm.with_structured_output.return_value.invoke.return_value = Reformulations(
+            questions=["Who manages the Spanish team?", "Spain head coach"]
+        )
+        coach = Document(page_content="Montse Tomé is the coach of Spain.")
+        stadium = Document(page_content="Spain play in Bern.")
+        results = {
+            "Who is the coach of Spain?": [(stadium, 0.3)],
+            "Who manages the Spanish team?": [(coach, 0.8), (stadium, 0.4)],
+            "Spain head coach": [(coach, 0.9)],
+        }
+        self.mock_vector_store.search_batch.side_effect = lambda queries, top_k, filter: [results[query] for query in queries]
+        agentic_rag = AgenticRAG(self.mock_vector_store, rewrite_mode="multi_query")
+        state = {
+            "messages": [HumanMessage(content="Who is the coach of Spain?")],
+            "search_kwargs": {"filter": {"country": {"$in": ["spain"]}}, "k": 5},
+        }
+
+        # WHEN
+        update = agentic_rag._multi_query_retrieve(state)
+
+        # THEN
+        mock_llm.with_structured_output.return_value.invoke.assert_called_once()
+        self.mock_vector_store.search_batch.assert_called_once_with(
+            ["Who is the coach of Spain?", "Who manages the Spanish team?", "Spain head coach"], top_k=5, filter={"country": {"$in": ["spain"]}}
+        )
+        self.assertEqual(update["retrieved_documents"], [coach.page_content, stadium.page_content])
+        self.assertEqual(update["retrieval_scores"], [0.9, 0.4])
+        self.assertEqual(update["messages"][0].tool_call_id, "multi_query")
+        self.assertEqual(update["rewrite_count"], 1)
+
+    @patch('rag.agentic_rag.ChatOpenAI')
+    def test_multi_query_mode_grades_once_then_gives_up(self, mock_openai):
+        # GIVEN
+        from rag.agentic_rag import Reformulations
+        from rag.relevance_grader import ScoreGrader
+        mock_llm = MagicMock()
+        mock_openai.return_value = mock_llm
+        mock_llm.with_structured_output.return_value.invoke.return_value = Reformulations(questions=["Who coaches the team?"])
+        mock_llm.invoke.return_value = AIMessage(content="I don't have information about the coach of Atlantis.")
+        tickets = (MagicMock(page_content="Tickets are sold online.", id=None), 0.1)
+        self.mock_vector_store.search_with_scores.return_value = [tickets]
+        self.mock_vector_store.search_batch.side_effect = lambda queries, top_k, filter: [[tickets] for _ in queries]
+        self.mock_vector_store.embedding_model.embed_query.return_value = [1.0, 0.0]
+        agentic_rag = AgenticRAG(self.mock_vector_store, grader=ScoreGrader(threshold=0.5, margin=0.1), rewrite_mode="multi_query")
+
+        # WHEN
+        result = agentic_rag({"messages": [HumanMessage(content="Who is the coach of the team?")], "question_language": "English"})
+
+        # THEN
+        self.assertEqual(result["messages"][-1].content, "I don't have information about the coach of Atlantis.")
+        self.assertEqual(self.mock_vector_store.search_with_scores.call_count, 1)
+        self.assertEqual(len(self.mock_vector_store.search_batch.call_args.args[0]), 2)
+        mock_llm.invoke.assert_called_once()
+
+    @patch('rag.agentic_rag.ChatOpenAI')
+    def test_adaptive_top_k_cuts_at_score_drop(self, mock_openai):
+        # GIVEN
+        from rag.adaptive_k import AdaptiveTopK
+        from rag.rag_metrics import RAGMetrics
+        metrics = RAGMetrics()
+        docs = [(MagicMock(page_content=f"chunk {i}"), score) for i, score in enumerate([0.9, 0.88, 0.86, 0.5, 0.48, 0.3])]
+        self.mock_vector_store.search_with_scores.return_value = docs
+        agentic_rag = AgenticRAG(self.mock_vector_store, metrics=metrics, retrieval_mode="dense",
+                                 adaptive_k=AdaptiveTopK(min_k=2, max_k=6, fetch_k=10, min_gap=0.05))
+
+        # WHEN
+        search_kwargs = agentic_rag._search_kwargs(None)
+        results = agentic_rag._search("Who is the coach of Spain?", search_kwargs)
+
+        # THEN
+        self.assertEqual(search_kwargs["k"], 10)
+        self.assertEqual(results, docs[:3])
+        self.assertEqual(metrics.stats()["distributions"]["adaptive_k"], {"count": 1, "avg": 3.0, "max": 3})
+
+    @patch('rag.agentic_rag.ChatOpenAI')
+    def test_adaptive_top_k_keeps_fused_order(self, mock_openai):
+        # GIVEN
+        from rag.adaptive_k import AdaptiveTopK
+        agentic_rag = AgenticRAG(self.mock_vector_store, retrieval_mode="dense",
+                                 adaptive_k=AdaptiveTopK(min_k=1, max_k=6, fetch_k=10, min_gap=0.05))
+        fused = [(MagicMock(page_content=f"chunk {i}"), score) for i, score in enumerate([0.6, 0.9, 0.58, 0.2, 0.95])]
+
+        # WHEN
+        results = agentic_rag._cut("Who won the final?", fused)
+
+        # THEN
+        self.assertEqual(results, fused[:3])
+
+    @patch('rag.agentic_rag.ChatOpenAI')
+    def test_agent_variant_keeps_agent_node(self, mock_openai):
+        # WHEN
+        agentic_rag = AgenticRAG(self.mock_vector_store, graph_variant="agent")
+
+        # THEN
+        self.assertIn("agent", agentic_rag.graph.get_graph().nodes)
+        self.assertIn("retrieverTool", agentic_rag.graph.get_graph().nodes)
+
+    def test_llm_call_counter(self):
+        # GIVEN
+        from rag.rag_metrics import LLMCallCounter
+        counter = LLMCallCounter()
+
+        # WHEN
+        counter.on_chat_model_start({}, [[HumanMessage(content="Is there VAR?")]])
+        counter.on_llm_start({}, ["Is there VAR?"])
+
+        # THEN
+        self.assertEqual(counter.calls, 2)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,103 @@
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../src')))
+
+from langchain_core.documents import Document
+
+from rag.bm25_index import BM25Index, matches_filter, reciprocal_rank_fusion
+from rag.hybrid_search import HybridSearcher, has_sparse_index
+
+DOCUMENTS = [
+    Document(id="1", page_content="Aitana Bonmatí plays for Spain.", metadata={"country": "spain"}),
+    Document(id="2", page_content="VAR is used in every match of the tournament.", metadata={"country": "all"}),
+    Document(id="3", page_content="Spain play their group matches in Bern and Thun.", metadata={"country": "spain"}),
+    Document(id="4", page_content="Italy play in Geneva.", metadata={"country": "italy"}),
+]
+
+
+class TestBM25Index(unittest.TestCase):
+    def setUp(self):
+        self.index = BM25Index()
+        self.index.add_documents(DOCUMENTS)
+
+    def test_exact_name_lookup(self):
+        # WHEN
+        results = self.index.search("Is there VAR?", top_k=2)
+
+        # THEN
+        self.assertEqual([doc.id for doc, _ in results], ["2"])
+
+    def test_rare_terms_rank_first(self):
+        # WHEN
+        results = self.index.search("Where does Spain play in Bern?", top_k=2)
+
+        # THEN
+        self.assertEqual(results[0][0].id, "3")
+        self.assertGreater(results[0][1], results[1][1])
+
+    def test_filter(self):
+        # WHEN
+        results = self.index.search("play", top_k=5, filter={"country": {"$in": ["italy"]}})
+
+        # THEN
+        self.assertEqual([doc.id for doc, _ in results], ["4"])
+
+    def test_remove(self):
+        # WHEN
+        self.index.remove(["2"])
+
+        # THEN
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index.search("VAR"), [])
+
+    def test_adding_an_indexed_id_replaces_the_document(self):
+        # WHEN
+        self.index.add_documents([Document(id="2", page_content="The referee checked the offside", metadata={"country": "spain"})])
+
+        # THEN
+        self.assertEqual(len(self.index), 4)
+        self.assertEqual(self.index.search("VAR"), [])
+        self.assertEqual([doc.id for doc, _ in self.index.search("offside")], ["2"])
+
+    def test_matches_filter(self):
+        self.assertTrue(matches_filter({"country": "spain"}, {"country": {"$in": ["spain", "italy"]}}))
+        self.assertFalse(matches_filter({"country": "wales"}, {"country": {"$in": ["spain"]}}))
+        self.assertTrue(matches_filter({"country": "spain"}, None))
+
+    def test_reciprocal_rank_fusion(self):
+        # WHEN
+        fused = reciprocal_rank_fusion([[DOCUMENTS[0], DOCUMENTS[1]], [DOCUMENTS[1], DOCUMENTS[2]]], k=60)
+
+        # THEN
+        self.assertEqual([doc.id for doc, _ in fused], ["2", "1", "3"])
+        self.assertAlmostEqual(fused[0][1], 1 / 62 + 1 / 61)
+
+
+class TestHybridSearcher(unittest.TestCase):
+    def test_merges_dense_and_sparse_results(self):
+        # GIVEN
+        store = MagicMock()
+        store.sparse_index = BM25Index()
+        store.sparse_index.add_documents(DOCUMENTS)
+        store.search_with_scores.return_value = [(DOCUMENTS[3], 0.4), (DOCUMENTS[0], 0.3)]
+        searcher = HybridSearcher(store, fetch_k=10)
+
+        # WHEN
+        results = searcher.search_with_scores("Is there VAR?", top_k=2)
+
+        # THEN
+        self.assertTrue(has_sparse_index(store))
+        self.assertEqual([doc.id for doc, _ in results], ["4", "2"])
+        self.assertEqual(results[0][1], 0.4)
+        self.assertEqual(results[1][1], 1.0)
+        store.search_with_scores.assert_called_once_with("Is there VAR?", top_k=10, filter=None)
+
+    def test_store_without_sparse_index(self):
+        self.assertFalse(has_sparse_index(MagicMock()))
+
+
+if __name__ == "__main__":
+    unittest.main()
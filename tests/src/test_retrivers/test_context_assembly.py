@@ -0,0 +1,76 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../src')))
+
+from langchain_core.documents import Document
+
+from rag.context_assembly import ContextAssembler, count_tokens, split_sentences, truncate
+
+COACH = "Montse Tomé is the coach of Spain. She was appointed in 2023. Spain won the Nations League."
+COACH_COPY = "Montse Tomé is the coach of Spain. She was appointed in 2023. Spain won the Nations League!"
+TICKETS = "Tickets are sold on the UEFA website. Prices start at 25 euros."
+
+
+class TestContextAssembler(unittest.TestCase):
+    def test_count_tokens(self):
+        self.assertEqual(count_tokens("Who is the coach of Spain?"), 7)
+
+    def test_split_sentences(self):
+        self.assertEqual(split_sentences("One. Two!\nThree"), ["One.", "Two!", "Three"])
+
+    def test_truncate(self):
+        self.assertEqual(truncate("Montse Tomé is the coach.", 3), "Montse Tomé is")
+
+    def test_near_duplicates_are_removed(self):
+        # GIVEN
+        assembler = ContextAssembler(token_budget=500, dedup_threshold=0.8, max_sentences=5)
+
+        # WHEN
+        context = assembler.assemble("Who is the coach of Spain?", [
+            (Document(page_content=COACH), 0.9), (Document(page_content=COACH_COPY), 0.8), (Document(page_content=TICKETS), 0.3)
+        ])
+
+        # THEN
+        self.assertEqual(context.documents, [COACH, TICKETS])
+        self.assertEqual(context.scores, [0.9, 0.3])
+        self.assertEqual(context.duplicates, 1)
+        self.assertLess(context.tokens_out, context.tokens_in)
+
+    def test_chunks_are_trimmed_to_matching_sentences(self):
+        # GIVEN
+        assembler = ContextAssembler(token_budget=500, max_sentences=1)
+
+        # WHEN
+        text = assembler.trim("When was she appointed?", COACH)
+
+        # THEN
+        self.assertEqual(text, "She was appointed in 2023.")
+
+    def test_packs_by_score_within_budget(self):
+        # GIVEN
+        assembler = ContextAssembler(token_budget=20, max_sentences=5)
+
+        # WHEN
+        context = assembler.assemble("Who is the coach of Spain?", [
+            (Document(page_content=TICKETS), 0.3), (Document(page_content=COACH), 0.9)
+        ])
+
+        # THEN
+        self.assertEqual(context.documents, [COACH])
+        self.assertLessEqual(context.tokens_out, 20)
+
+    def test_first_chunk_is_truncated_to_budget(self):
+        # GIVEN
+        assembler = ContextAssembler(token_budget=5, max_sentences=5)
+
+        # WHEN
+        context = assembler.assemble("coach", [(Document(page_content=COACH), 0.9)])
+
+        # THEN
+        self.assertEqual(context.text, "Montse Tomé is the coach")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../src')))
+
+from rag.country_gazetteer import AhoCorasick, CountryGazetteer
+
+class TestAhoCorasick(unittest.TestCase):
+    def test_finds_overlapping_patterns(self):
+        # GIVEN
+        matcher = AhoCorasick()
+        for pattern in ["he", "she", "his", "hers"]:
+            matcher.add(pattern, pattern)
+
+        # WHEN
+        matches = sorted(matcher.find("ushers"))
+
+        # THEN
+        self.assertEqual(matches, [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")])
+
+class TestCountryGazetteer(unittest.TestCase):
+    def setUp(self):
+        self.gazetteer = CountryGazetteer(["Ireland", "Northern Ireland"])
+
+    def test_extracts_aliases_in_any_language(self):
+        # WHEN
+        countries = self.gazetteer.extract("¿Qué tal jugó ESPAÑA contra Alemania y las Lionesses?")
+
+        # THEN
+        self.assertEqual(countries, ["Spain", "Germany", "England"])
+
+    def test_prefers_longest_match(self):
+        # WHEN
+        countries = self.gazetteer.extract("What does Northern Ireland need?")
+
+        # THEN
+        self.assertEqual(countries, ["Northern Ireland"])
+
+    def test_requires_word_boundaries(self):
+        # WHEN
+        countries = self.gazetteer.extract("Who are the Spaniards' rivals in Walesby?")
+
+        # THEN
+        self.assertEqual(countries, [])
+
+    def test_language_demonyms_need_a_team_noun(self):
+        # WHEN
+        languages = self.gazetteer.extract("Answer in English: what are the French-language rules on VAR?")
+        teams = self.gazetteer.extract("How did the English players and the Spanish team play?")
+
+        # THEN
+        self.assertEqual(languages, [])
+        self.assertEqual(teams, ["England", "Spain"])
+        self.assertFalse(self.gazetteer.looks_entity_bearing("Answer in English, please."))
+
+    def test_looks_entity_bearing(self):
+        # THEN
+        self.assertTrue(self.gazetteer.looks_entity_bearing("What can you say about argentina?"))
+        self.assertTrue(self.gazetteer.looks_entity_bearing("How did the Matildas play?"))
+        self.assertFalse(self.gazetteer.looks_entity_bearing("Is there VAR?"))
+        self.assertFalse(self.gazetteer.looks_entity_bearing("How can I buy tickets?"))
+
+if __name__ == "__main__":
+    unittest.main()
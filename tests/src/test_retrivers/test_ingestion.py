@@ -0,0 +1,128 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../src')))
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from rag.ingestion import IngestionCheckpoint, IngestionPipeline, content_hash, iter_source_documents
+from rag.vector_stores.base_store import ReadOnlyStoreError
+from rag.vector_stores.faiss_store import FAISSStore
+
+
+class TestIngestionPipeline(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.checkpoint = IngestionCheckpoint(os.path.join(self.directory.name, "checkpoint.sqlite"))
+
+    def tearDown(self):
+        self.checkpoint.close()
+        self.directory.cleanup()
+
+    def pipeline(self, store, **kwargs):
+        return IngestionPipeline(store, self.checkpoint, batch_size=2, concurrency=2, checkpoint_every=1, **kwargs)
+
+    def test_unchanged_chunks_are_not_embedded_again(self):
+        # GIVEN
+        store = FAISSStore(DeterministicFakeEmbedding(size=8))
+        documents = [Document(page_content=f"Match report {i}", metadata={"source": "reports.txt"}) for i in range(5)]
+        first = self.pipeline(store).run(documents)
+        store.embedding_model = MagicMock(wraps=store.embedding_model)
+
+        # WHEN
+        second = self.pipeline(store).run(documents + [Document(page_content="Match report 5", metadata={"source": "reports.txt"})])
+
+        # THEN
+        self.assertEqual((first.added, first.unchanged), (5, 0))
+        self.assertEqual((second.chunks, second.added, second.unchanged), (6, 1, 5))
+        store.embedding_model.embed_documents.assert_called_once_with(["Match report 5"])
+        self.assertEqual(store.vector_store.index.ntotal, 6)
+
+    def test_duplicate_chunks_are_added_once(self):
+        # GIVEN
+        store = FAISSStore(DeterministicFakeEmbedding(size=8))
+        document = Document(page_content="Spain won the final", metadata={"source": "a.txt"})
+
+        # WHEN
+        report = self.pipeline(store).run([document, document])
+
+        # THEN
+        self.assertEqual((report.added, report.duplicates), (1, 1))
+        self.assertEqual(store.vector_store.index.ntotal, 1)
+        self.assertEqual(store.vector_store.index_to_docstore_id[0], content_hash("Spain won the final", {"source": "a.txt"}))
+
+    def test_outdated_chunks_of_a_changed_source_are_deleted(self):
+        # GIVEN
+        store = MagicMock()
+        store.embedding_model = DeterministicFakeEmbedding(size=8)
+        self.pipeline(store).run([Document(page_content="Old lineup", metadata={"source": "spain.txt"})])
+
+        # WHEN
+        report = self.pipeline(store).run([Document(page_content="New lineup", metadata={"source": "spain.txt"})])
+
+        # THEN
+        self.assertEqual((report.added, report.removed), (1, 1))
+        store.delete.assert_called_once_with([content_hash("Old lineup", {"source": "spain.txt"})])
+        self.assertEqual(self.checkpoint.hashes_of("spain.txt"), {content_hash("New lineup", {"source": "spain.txt"})})
+
+    def test_outdated_chunks_of_a_read_only_store_are_kept(self):
+        # GIVEN
+        store = MagicMock()
+        store.embedding_model = DeterministicFakeEmbedding(size=8)
+        store.delete.side_effect = ReadOnlyStoreError("read-only")
+        self.pipeline(store).run([Document(page_content="Old lineup", metadata={"source": "spain.txt"})])
+
+        # WHEN
+        report = self.pipeline(store).run([Document(page_content="New lineup", metadata={"source": "spain.txt"})])
+
+        # THEN
+        self.assertEqual((report.added, report.removed), (1, 0))
+        self.assertIn(content_hash("Old lineup", {"source": "spain.txt"}), self.checkpoint.hashes_of("spain.txt"))
+
+    def test_interrupted_run_resumes_after_the_last_checkpoint(self):
+        # GIVEN
+        database = os.path.join(self.directory.name, "store")
+        embedding_model = DeterministicFakeEmbedding(size=8)
+        failing = MagicMock(wraps=embedding_model)
+        failing.embed_documents.side_effect = [embedding_model.embed_documents(["a", "b"]), RuntimeError("timeout")]
+        documents = [Document(page_content=f"Chunk {i}", metadata={"source": "a.txt"}) for i in range(4)]
+        store = FAISSStore(failing, model_id="fake")
+        pipeline = IngestionPipeline(store, self.checkpoint, database, batch_size=2, concurrency=1, checkpoint_every=1)
+        with self.assertRaises(RuntimeError):
+            pipeline.run(documents)
+        self.assertFalse(os.path.exists(database))
+
+        # WHEN
+        resumed = FAISSStore(embedding_model, model_id="fake")
+        report = IngestionPipeline(resumed, self.checkpoint, database, batch_size=2, concurrency=1).run(documents)
+
+        # THEN
+        self.assertEqual((report.unchanged, report.added), (2, 2))
+        self.assertEqual(resumed.vector_store.index.ntotal, 4)
+        self.assertEqual(self.checkpoint.pending()[0], [])
+        reloaded = FAISSStore(embedding_model, model_id="fake")
+        reloaded.load_vector_store(database)
+        self.assertEqual(sorted(doc.page_content for doc in reloaded.docstore.documents()), [f"Chunk {i}" for i in range(4)])
+        reloaded.docstore._connection.close()
+
+    def test_source_files_are_read_with_their_metadata(self):
+        # GIVEN
+        with open(os.path.join(self.directory.name, "notes.txt"), "w") as f:
+            f.write("Tickets are on sale.")
+        with open(os.path.join(self.directory.name, "teams.jsonl"), "w") as f:
+            f.write('{"page_content": "Wales debut", "metadata": {"country": "wales"}}\n')
+
+        # WHEN
+        documents = list(iter_source_documents([self.directory.name]))
+
+        # THEN
+        self.assertEqual([doc.page_content for doc in documents], ["Tickets are on sale.", "Wales debut"])
+        self.assertEqual(documents[1].metadata["country"], "wales")
+
+
+if __name__ == "__main__":
+    unittest.main()
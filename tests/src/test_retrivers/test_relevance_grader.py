@@ -0,0 +1,63 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../src')))
+
+from rag.relevance_grader import GENERATE, REWRITE, ScoreGrader, calibrate, lexical_overlap
+
+class TestScoreGrader(unittest.TestCase):
+    def setUp(self):
+        self.grader = ScoreGrader(threshold=0.5, margin=0.1, lexical_weight=0.5)
+
+    def test_lexical_overlap_ignores_stopwords_and_accents(self):
+        # WHEN
+        overlap = lexical_overlap("Who is the coach of España?", "Montse Tomé is the Espana coach.")
+
+        # THEN
+        self.assertEqual(overlap, 1.0)
+
+    def test_high_signal_generates(self):
+        # WHEN
+        signal = self.grader.signal("Who is the coach of Spain?", ["Montse Tomé is the Spain coach."], [0.8, 0.4])
+
+        # THEN
+        self.assertAlmostEqual(signal.combined, 0.9)
+        self.assertEqual(self.grader.decide(signal), GENERATE)
+
+    def test_low_signal_rewrites(self):
+        # WHEN
+        signal = self.grader.signal("Who is the coach of Spain?", ["Tickets go on sale in May."], [0.2])
+
+        # THEN
+        self.assertEqual(self.grader.decide(signal), REWRITE)
+
+    def test_borderline_signal_is_undecided(self):
+        # WHEN
+        signal = self.grader.signal("Who is the coach of Spain?", ["Spain played in Bern."], [0.5])
+
+        # THEN
+        self.assertAlmostEqual(signal.combined, 0.5)
+        self.assertIsNone(self.grader.decide(signal))
+
+class TestCalibrate(unittest.TestCase):
+    def test_finds_threshold_agreeing_with_llm(self):
+        # GIVEN
+        samples = [(0.2, 0.1), (0.3, 0.2), (0.45, 0.4), (0.6, 0.9), (0.7, 0.8), (0.9, 0.95)]
+
+        # WHEN
+        report = calibrate(samples, relevance_threshold=0.7, current_threshold=0.8, margin=0.05)
+
+        # THEN
+        self.assertEqual(report.agreement, 1.0)
+        self.assertTrue(0.45 < report.threshold <= 0.6)
+        self.assertAlmostEqual(report.current_agreement, 4 / 6)
+        self.assertIn("RAG_SCORE_THRESHOLD=", report.describe())
+
+    def test_requires_samples(self):
+        # THEN
+        with self.assertRaises(ValueError):
+            calibrate([])
+
+if __name__ == "__main__":
+    unittest.main()
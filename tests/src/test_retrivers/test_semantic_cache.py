@@ -0,0 +1,111 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../src')))
+
+from rag.semantic_cache import SemanticAnswerCache, partition_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSemanticAnswerCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = SemanticAnswerCache(threshold=0.9, ttl_seconds=60, max_entries=3, clock=self.clock)
+
+    def test_similar_question_hits(self):
+        # GIVEN
+        self.cache.store("Who is the coach of Spain?", [1.0, 0.0, 0.0], "English", ["Spain"], "Montse Tomé.")
+
+        # WHEN
+        answer = self.cache.lookup([0.98, 0.1, 0.0], "English", ["Spain"])
+
+        # THEN
+        self.assertEqual(answer, "Montse Tomé.")
+        self.assertEqual(self.cache.stats()["hit_rate"], 1.0)
+
+    def test_dissimilar_question_misses(self):
+        # GIVEN
+        self.cache.store("Who is the coach of Spain?", [1.0, 0.0, 0.0], "English", ["Spain"], "Montse Tomé.")
+
+        # WHEN
+        answer = self.cache.lookup([0.5, 0.5, 0.5], "English", ["Spain"])
+
+        # THEN
+        self.assertIsNone(answer)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_partitions_by_language_and_countries(self):
+        # GIVEN
+        self.cache.store("Who is the coach of Spain?", [1.0, 0.0, 0.0], "English", ["Spain"], "Montse Tomé.")
+
+        # WHEN
+        other_country = self.cache.lookup([1.0, 0.0, 0.0], "English", ["Italy"])
+        other_language = self.cache.lookup([1.0, 0.0, 0.0], "Spanish", ["Spain"])
+
+        # THEN
+        self.assertIsNone(other_country)
+        self.assertIsNone(other_language)
+        self.assertEqual(partition_key("English", ["Spain", "Italy"]), partition_key("english", ["italy", "spain"]))
+
+    def test_entries_expire(self):
+        # GIVEN
+        self.cache.store("Who is the coach of Spain?", [1.0, 0.0, 0.0], "English", ["Spain"], "Montse Tomé.")
+
+        # WHEN
+        self.clock.now = 61
+        answer = self.cache.lookup([1.0, 0.0, 0.0], "English", ["Spain"])
+
+        # THEN
+        self.assertIsNone(answer)
+        self.assertEqual(self.cache.stats()["expirations"], 1)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        # GIVEN
+        vectors = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+        for i, vector in enumerate(vectors):
+            self.cache.store(f"question {i}", vector, "English", [], f"answer {i}")
+        self.cache.lookup(vectors[0], "English", [])
+
+        # WHEN
+        self.cache.store("question 3", [0.0, 0.6, 0.8], "English", [], "answer 3")
+
+        # THEN
+        self.assertEqual(self.cache.lookup(vectors[0], "English", []), "answer 0")
+        self.assertIsNone(self.cache.lookup(vectors[1], "English", []))
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_new_generation_invalidates(self):
+        # GIVEN
+        self.cache.store("Who is the coach of Spain?", [1.0, 0.0, 0.0], "English", ["Spain"], "Montse Tomé.", generation=1)
+
+        # WHEN
+        answer = self.cache.lookup([1.0, 0.0, 0.0], "English", ["Spain"], generation=2)
+
+        # THEN
+        self.assertIsNone(answer)
+        self.assertEqual(self.cache.stats()["invalidations"], 1)
+
+    def test_removed_entries_are_compacted(self):
+        # GIVEN
+        cache = SemanticAnswerCache(threshold=0.9, ttl_seconds=60, max_entries=2, clock=self.clock)
+
+        # WHEN
+        for i in range(40):
+            cache.store(f"question {i}", [1.0, float(i)], "English", [], f"answer {i}")
+
+        # THEN
+        self.assertEqual(cache.stats()["entries"], 2)
+        self.assertEqual(cache.lookup([1.0, 39.0], "English", []), "answer 39")
+
+
+if __name__ == "__main__":
+    unittest.main()
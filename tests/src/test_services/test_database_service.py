@@ -8,9 +8,9 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 from services.database_service import DatabaseService
 class TestDatabaseService(unittest.TestCase):
 
-    @patch("services.database_service.create_engine")
+    @patch("services.database_service.get_primary_engine")
     @patch("services.database_service.sessionmaker")
-    def test_save_question_answer_with_mocked_session_local(self, mock_sessionmaker, mock_create_engine):
+    def test_save_question_answer_with_mocked_session_local(self, mock_sessionmaker, mock_get_primary_engine):
         # GIVEN
         mock_session = MagicMock()
         mock_session_context = MagicMock()
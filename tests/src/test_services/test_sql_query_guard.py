@@ -0,0 +1,94 @@
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../src')))
+
+from services.sql_query_guard import QueryGuardMetrics, QueryRejectedError, SQLQueryGuard
+
+class TestSQLQueryGuard(unittest.TestCase):
+    def setUp(self):
+        self.connection = MagicMock()
+        self.engine = MagicMock()
+        self.engine.connect.return_value.__enter__.return_value = self.connection
+        self.metrics = QueryGuardMetrics()
+        self.guard = SQLQueryGuard(self.engine, max_cost=1000, default_limit=100, max_rows=2, max_bytes=1000, metrics=self.metrics)
+
+    def _mock_database(self, cost, columns=(), rows=()):
+        plan = MagicMock()
+        plan.scalar.return_value = [{"Plan": {"Total Cost": cost}}]
+        cursor = MagicMock()
+        cursor.returns_rows = True
+        cursor.keys.return_value = list(columns)
+        cursor.fetchmany.return_value = list(rows)
+        self.connection.execute.side_effect = [plan, cursor]
+        return cursor
+
+    def test_prepare_injects_missing_limit(self):
+        # WHEN
+        query = self.guard.prepare("SELECT country FROM teams WHERE country ILIKE '%limit 5%';")
+
+        # THEN
+        self.assertEqual(query, "SELECT country FROM teams WHERE country ILIKE '%limit 5%'\nLIMIT 100")
+        self.assertEqual(self.metrics.stats()["limit_injected"], 1)
+
+    def test_prepare_keeps_existing_limit(self):
+        # WHEN
+        query = self.guard.prepare("SELECT country FROM teams ORDER BY country LIMIT 3 OFFSET 1")
+
+        # THEN
+        self.assertEqual(query, "SELECT country FROM teams ORDER BY country LIMIT 3 OFFSET 1")
+
+    def test_prepare_ignores_trailing_comments(self):
+        # WHEN
+        limited = self.guard.prepare("SELECT country FROM teams LIMIT 3; -- top three\n/* end */")
+        unlimited = self.guard.prepare("SELECT country FROM teams WHERE country <> '--' -- every team")
+
+        # THEN
+        self.assertEqual(limited, "SELECT country FROM teams LIMIT 3")
+        self.assertEqual(unlimited, "SELECT country FROM teams WHERE country <> '--'\nLIMIT 100")
+
+    def test_expensive_query_is_rejected(self):
+        # GIVEN
+        self._mock_database(cost=5000)
+
+        # WHEN
+        with self.assertRaises(QueryRejectedError):
+            self.guard.execute("SELECT * FROM match_events me JOIN historical_matches hm ON true")
+
+        # THEN
+        stats = self.metrics.stats()
+        self.assertEqual(stats["rejected"], 1)
+        self.assertEqual(stats["cost_histogram"]["<=10000"], 1)
+        self.assertEqual(self.connection.execute.call_count, 1)
+
+    def test_rows_are_capped(self):
+        # GIVEN
+        cursor = self._mock_database(cost=10, columns=["country"], rows=[("Spain",), ("France",), ("Italy",)])
+
+        # WHEN
+        result = self.guard.execute("SELECT country FROM teams")
+
+        # THEN
+        cursor.fetchmany.assert_called_once_with(3)
+        self.assertEqual(result.columns, ["country"])
+        self.assertEqual(result.rows, [("Spain",), ("France",)])
+        self.assertTrue(result.truncated)
+        self.assertEqual(self.metrics.stats()["row_capped"], 1)
+
+    def test_bytes_are_capped(self):
+        # GIVEN
+        self.guard.max_bytes = 20
+        self._mock_database(cost=10, columns=["club"], rows=[("Barcelona",), ("Chelsea FC Women",)])
+
+        # WHEN
+        result = self.guard.execute("SELECT club FROM players")
+
+        # THEN
+        self.assertEqual(result.rows, [("Barcelona",)])
+        self.assertTrue(result.truncated)
+        self.assertEqual(self.metrics.stats()["byte_capped"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../src')))
+
+from services.data_versions import DataVersionTracker
+from services.sql_result_cache import SQLResultCache, normalize_sql, referenced_tables
+
+class TestSQLResultCache(unittest.TestCase):
+    def setUp(self):
+        self.versions = DataVersionTracker(poll_interval=0)
+        self.cache = SQLResultCache(max_entries=2, ttl_seconds=60, max_bytes=1024, versions=self.versions)
+
+    def test_normalize_sql_keeps_literals(self):
+        # GIVEN
+        query = "SELECT  country\n FROM Teams WHERE country ILIKE '%Spain  %';"
+
+        # WHEN
+        normalized = normalize_sql(query)
+
+        # THEN
+        self.assertEqual(normalized, "select country from teams where country ilike '%Spain  %'")
+
+    def test_referenced_tables(self):
+        # GIVEN
+        query = "SELECT * FROM matches m LEFT JOIN public.teams t ON t.team_id = m.home_team_id WHERE t.country = 'from x'"
+
+        # WHEN
+        tables = referenced_tables(query)
+
+        # THEN
+        self.assertEqual(tables, {"matches", "teams"})
+
+    def test_referenced_tables_of_comma_join(self):
+        # WHEN
+        tables = referenced_tables("SELECT * FROM matches m, public.teams AS t WHERE t.team_id = m.home_team_id")
+
+        # THEN
+        self.assertEqual(tables, {"matches", "teams"})
+
+    def test_write_during_query_leaves_entry_stale(self):
+        # GIVEN
+        tables_versions = self.cache.snapshot("SELECT * FROM matches")
+        self.versions.bump("matches")
+
+        # WHEN
+        self.cache.set("SELECT * FROM matches", "[(1, 0)]", tables_versions)
+
+        # THEN
+        self.assertIsNone(self.cache.get("SELECT * FROM matches"))
+
+    def test_hit_on_equivalent_query(self):
+        # GIVEN
+        self.cache.set("SELECT coach FROM teams", "[('Montse Tomé',)]")
+
+        # WHEN
+        result = self.cache.get("select coach\n  from teams;")
+
+        # THEN
+        self.assertEqual(result, "[('Montse Tomé',)]")
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_miss_after_table_version_bump(self):
+        # GIVEN
+        self.cache.set("SELECT * FROM group_standings", "[(1, 3)]")
+
+        # WHEN
+        self.versions.bump("group_standings")
+        result = self.cache.get("SELECT * FROM group_standings")
+
+        # THEN
+        self.assertIsNone(result)
+        self.assertEqual(self.cache.stats()["invalidations"], 1)
+
+    def test_other_tables_are_not_invalidated(self):
+        # GIVEN
+        self.cache.set("SELECT * FROM stadiums", "[('Wankdorf',)]")
+
+        # WHEN
+        self.versions.bump("match_events")
+
+        # THEN
+        self.assertEqual(self.cache.get("SELECT * FROM stadiums"), "[('Wankdorf',)]")
+
+    def test_miss_after_ttl(self):
+        # GIVEN
+        with patch("services.sql_result_cache.time.monotonic", return_value=0):
+            self.cache.set("SELECT * FROM teams", "[]")
+
+        # WHEN
+        with patch("services.sql_result_cache.time.monotonic", return_value=61):
+            result = self.cache.get("SELECT * FROM teams")
+
+        # THEN
+        self.assertIsNone(result)
+
+    def test_lru_eviction_and_bytes(self):
+        # GIVEN
+        self.cache.set("SELECT 1 FROM a", "one")
+        self.cache.set("SELECT 2 FROM b", "two")
+        self.cache.get("SELECT 1 FROM a")
+
+        # WHEN
+        self.cache.set("SELECT 3 FROM c", "three")
+
+        # THEN
+        self.assertIsNone(self.cache.get("SELECT 2 FROM b"))
+        stats = self.cache.stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["bytes"], len("one") + len("three"))
+        self.assertEqual(stats["evictions"], 1)
+
+    def test_write_statements_are_not_cacheable(self):
+        # GIVEN
+        query = "UPDATE matches SET home_score = 2 WHERE match_id = 1"
+
+        # WHEN
+        cacheable = SQLResultCache.is_cacheable(query)
+
+        # THEN
+        self.assertFalse(cacheable)
+        self.assertTrue(SQLResultCache.is_cacheable("WITH x AS (SELECT 1) SELECT * FROM x"))
+        self.assertFalse(SQLResultCache.is_cacheable("WITH d AS (DELETE FROM matches RETURNING *) SELECT * FROM d"))
+        self.assertFalse(SQLResultCache.is_cacheable("SELECT * INTO backup FROM matches"))
+        self.assertTrue(SQLResultCache.is_cacheable("SELECT updated_at FROM matches WHERE note = 'update'"))
+
+if __name__ == "__main__":
+    unittest.main()
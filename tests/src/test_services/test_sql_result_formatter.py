@@ -0,0 +1,81 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../src')))
+
+from services.sql_result_formatter import FormatterMetrics, SQLResultFormatter
+
+class TestSQLResultFormatter(unittest.TestCase):
+    def setUp(self):
+        self.metrics = FormatterMetrics()
+        self.formatter = SQLResultFormatter(token_budget=1500, metrics=self.metrics)
+        self.columns = ["home_team", "away_team", "stadium_name"]
+        self.rows = [
+            ("Switzerland", "Norway", "Stade de Genève"),
+            ("Iceland", "Finland", "Stade de Genève"),
+            ("Norway", "Finland", "Stade de Genève"),
+            ("Switzerland", "Iceland", "Stadion Wankdorf"),
+        ]
+
+    def test_header_and_dictionary_encoding(self):
+        # WHEN
+        result = self.formatter.format(self.columns, self.rows)
+
+        # THEN
+        lines = result.text.split("\n")
+        self.assertEqual(lines[0], "4 rows | columns: home_team | away_team | stadium_name")
+        self.assertEqual(lines[1], "where @1 = Stade de Genève")
+        self.assertEqual(lines[2], "Switzerland | Norway | @1")
+        self.assertEqual(lines[5], "Switzerland | Iceland | Stadion Wankdorf")
+
+    def test_values_are_escaped(self):
+        # WHEN
+        result = self.formatter.format(["player_name", "club", "starting"], [("@alexia", None, [1, 2]), ("A|B", "Barça", 3)])
+
+        # THEN
+        lines = result.text.split("\n")
+        self.assertEqual(lines[1], "\\@alexia | null | [1, 2]")
+        self.assertEqual(lines[2], "A/B | Barça | 3")
+
+    def test_truncates_past_token_budget(self):
+        # GIVEN
+        formatter = SQLResultFormatter(token_budget=40, metrics=self.metrics)
+        rows = [(f"Player number {i}", i) for i in range(50)]
+
+        # WHEN
+        result = formatter.format(["player_name", "goals"], rows)
+
+        # THEN
+        self.assertLess(result.rows_shown, 50)
+        self.assertEqual(result.rows_total, 50)
+        self.assertTrue(result.text.endswith(f"... {50 - result.rows_shown} more rows not shown (50 total). Refine the query to see them."))
+        self.assertEqual(self.metrics.stats()["truncated"], 1)
+
+    def test_empty_result(self):
+        # WHEN
+        result = self.formatter.format(["country"], [])
+
+        # THEN
+        self.assertEqual(result.text, "")
+        self.assertEqual(self.metrics.stats()["results"], 0)
+
+    def test_savings_are_reported(self):
+        # GIVEN
+        teams = ["Switzerland", "Norway", "Iceland", "Finland"]
+        rows = [
+            (home, away, "Stade de Genève" if i % 2 else "Stadion Wankdorf")
+            for i, (home, away) in enumerate((h, a) for h in teams for a in teams if h != a)
+        ]
+
+        # WHEN
+        result = self.formatter.format(self.columns, rows)
+
+        # THEN
+        self.assertLess(result.tokens_after, result.tokens_before)
+        stats = self.metrics.stats()
+        self.assertEqual(stats["results"], 1)
+        self.assertGreater(stats["tokens_saved"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import os
+import sys
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../src')))
+
+from services.data_versions import DataVersionTracker
+from tournament.repository import (GROUP_FIXTURES_QUERY, GROUP_OF_TEAM_QUERY, GROUP_STANDINGS_QUERY, Fixture,
+                                   StandingRow, TeamGroup, TournamentRepository, find_team)
+
+STANDINGS = [
+    ("Spain", 6, 2, 2, 0, 0, 11, 2, 9, 1),
+    ("Italy", 4, 2, 1, 1, 0, 2, 1, 1, 2),
+    ("Portugal", 1, 2, 0, 1, 1, 1, 6, -5, 3),
+    ("Belgium", 0, 2, 0, 0, 2, 2, 7, -5, 4),
+]
+
+FIXTURES = [
+    (1, "Spain", "Portugal", datetime(2025, 7, 3), 5, 0, True),
+    (2, "Belgium", "Italy", datetime(2025, 7, 3), 0, 1, True),
+    (3, "Spain", "Italy", datetime(2025, 7, 11), None, None, False),
+]
+
+
+class FakeConnection:
+    """Answers the repository queries with canned rows and records how often each one ran."""
+
+    def __init__(self, calls):
+        self.calls = calls
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, query, params):
+        self.calls.append((query, params))
+        result = MagicMock()
+        if query is GROUP_OF_TEAM_QUERY:
+            result.fetchall.return_value = [(2, "B")] if params["team"] != "Atlantis" else []
+        elif query is GROUP_STANDINGS_QUERY:
+            result.fetchall.return_value = STANDINGS
+        elif query is GROUP_FIXTURES_QUERY:
+            result.fetchall.return_value = FIXTURES
+        else:
+            result.fetchall.return_value = [(row[0],) for row in STANDINGS]
+        return result
+
+
+class TestTournamentRepository(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        engine = MagicMock()
+        engine.connect.side_effect = lambda: FakeConnection(self.calls)
+        self.versions = DataVersionTracker(poll_interval=0)
+        self.repository = TournamentRepository(engine, versions=self.versions)
+
+    def test_find_team_prefers_longest_name(self):
+        # GIVEN
+        teams = ["Ireland", "Northern Ireland", "Spain"]
+
+        # WHEN
+        team = find_team("What does northern ireland need to qualify?", teams)
+
+        # THEN
+        self.assertEqual(team, "Northern Ireland")
+
+    def test_find_team_returns_first_mentioned_team(self):
+        # GIVEN
+        teams = ["Spain", "Italy", "Portugal", "Norway", "Switzerland"]
+
+        # WHEN
+        spain = find_team("What does Spain need to qualify if Italy beats Portugal?", teams)
+        portugal = find_team("What does Portugal need to qualify if Italy beats Spain?", teams)
+        norway = find_team("Can Norway qualify if they draw with Switzerland?", teams)
+        switzerland = find_team("Can Switzerland qualify if they draw with Norway?", teams)
+
+        # THEN
+        self.assertEqual((spain, portugal, norway, switzerland), ("Spain", "Portugal", "Norway", "Switzerland"))
+
+    def test_find_team_returns_none_without_match(self):
+        # WHEN
+        team = find_team("Who is the best goalkeeper?", ["Spain", "Italy"])
+
+        # THEN
+        self.assertIsNone(team)
+
+    def test_typed_rows(self):
+        # WHEN
+        group = self.repository.group_of_team("Spain")
+        standings = self.repository.standings(group.group_id)
+        remaining = self.repository.remaining_fixtures(group.group_id)
+
+        # THEN
+        self.assertEqual(group, TeamGroup(group_id=2, group_name="B"))
+        self.assertIsInstance(standings[0], StandingRow)
+        self.assertEqual(standings[0].team, "Spain")
+        self.assertEqual(standings[0].goal_difference, 9)
+        self.assertEqual(remaining, [Fixture(3, "Spain", "Italy", datetime(2025, 7, 11), None, None, False)])
+        self.assertEqual(self.calls[0][1], {"team": "Spain"})
+        self.assertEqual(self.calls[1][1], {"group_id": 2})
+
+    def test_group_state_splits_played_and_remaining(self):
+        # WHEN
+        group = self.repository.group_state("Spain")
+
+        # THEN
+        self.assertEqual(group.group_name, "B")
+        self.assertEqual(group.teams, ["Spain", "Italy", "Portugal", "Belgium"])
+        self.assertEqual(group.played, [("Spain", "Portugal", 5, 0), ("Belgium", "Italy", 0, 1)])
+        self.assertEqual(group.remaining, [("Spain", "Italy")])
+
+    def test_group_state_without_group(self):
+        # WHEN
+        group = self.repository.group_state("Atlantis")
+
+        # THEN
+        self.assertIsNone(group)
+
+    def test_results_are_cached_per_group(self):
+        # GIVEN
+        self.repository.group_state("Spain")
+
+        # WHEN
+        self.repository.group_state("Spain")
+
+        # THEN
+        self.assertEqual(len(self.calls), 3)
+        self.assertEqual(self.repository.stats()["hits"], 3)
+
+    def test_match_update_invalidates_cache(self):
+        # GIVEN
+        self.repository.group_state("Spain")
+
+        # WHEN
+        self.versions.bump("matches")
+        self.repository.group_state("Spain")
+
+        # THEN
+        self.assertEqual(len(self.calls), 6)
+
+if __name__ == "__main__":
+    unittest.main()
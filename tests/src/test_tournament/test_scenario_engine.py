@@ -0,0 +1,110 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../src')))
+
+from tournament.scenario_engine import (AWAY_WIN, DEPENDS_ON_GOALS, DRAW, ELIMINATED, HOME_WIN, QUALIFIED,
+                                        GroupState, QualificationScenarioEngine)
+
+class TestQualificationScenarioEngine(unittest.TestCase):
+    def setUp(self):
+        # A 4, B 3, D 2, C 1 before the last matchday
+        self.group = GroupState(
+            group_name="A",
+            teams=["A", "B", "C", "D"],
+            played=[("A", "B", 1, 0), ("B", "C", 2, 1), ("A", "D", 1, 1), ("C", "D", 1, 1)],
+            remaining=[("C", "A"), ("B", "D")],
+        )
+        self.engine = QualificationScenarioEngine(self.group)
+
+    def test_outcome_matrix_enumerates_every_combination(self):
+        # WHEN
+        outcomes = self.engine.outcome_matrix()
+
+        # THEN
+        self.assertEqual(outcomes.shape, (9, 2))
+        self.assertEqual(len({tuple(row) for row in outcomes}), 9)
+
+    def test_points_are_computed_for_every_scenario(self):
+        # WHEN
+        points = self.engine.points(self.engine.outcome_matrix())
+
+        # THEN
+        self.assertEqual(points.shape, (9, 4))
+        self.assertEqual(points[0].tolist(), [4, 6, 4, 2])   # C beat A, B beat D
+        self.assertEqual(points[8].tolist(), [7, 3, 1, 5])   # A beat C, D beat B
+
+    def test_analyze_applies_head_to_head_criteria(self):
+        # WHEN
+        report = self.engine.analyze("A")
+
+        # THEN
+        scenarios = dict(report.scenarios)
+        self.assertEqual(scenarios[(DRAW, DRAW)], QUALIFIED)
+        self.assertEqual(scenarios[(HOME_WIN, HOME_WIN)], ELIMINATED)       # A and C level on 4 for second place, C beat A
+        self.assertEqual(scenarios[(HOME_WIN, DRAW)], DEPENDS_ON_GOALS)     # A, B, C level on 4 and on head-to-head points
+        self.assertEqual(scenarios[(AWAY_WIN, AWAY_WIN)], QUALIFIED)
+        self.assertEqual(report.counts, {QUALIFIED: 6, ELIMINATED: 2, DEPENDS_ON_GOALS: 1})
+        self.assertEqual(report.status, "still possible")
+
+    def test_head_to_head_goal_difference_when_all_matches_played(self):
+        # GIVEN
+        group = GroupState(
+            group_name="B",
+            teams=["A", "B", "C", "D"],
+            played=[("A", "B", 3, 0), ("B", "C", 1, 0), ("C", "A", 1, 0), ("D", "A", 0, 1), ("D", "B", 0, 1), ("D", "C", 0, 1)],
+            remaining=[],
+        )
+
+        # WHEN
+        report_a = QualificationScenarioEngine(group).analyze("A")
+        report_c = QualificationScenarioEngine(group).analyze("C")
+
+        # THEN
+        self.assertEqual(report_a.scenarios, [((), QUALIFIED)])
+        self.assertEqual(report_c.scenarios, [((), QUALIFIED)])
+        self.assertEqual(QualificationScenarioEngine(group).analyze("B").status, "cannot qualify anymore")
+
+    def test_head_to_head_goals_scored_apply_to_whole_group_before_reapplying(self):
+        # GIVEN
+        # A, B and C are level on 6 points and head-to-head points; A leads on goal difference, B and C are
+        # level on -1, and C scored 4 head-to-head goals to B's 2, although B beat C.
+        group = GroupState(
+            group_name="C",
+            teams=["A", "B", "C", "D"],
+            played=[("A", "B", 3, 0), ("B", "C", 2, 0), ("C", "A", 4, 3), ("A", "D", 1, 0), ("B", "D", 1, 0), ("C", "D", 1, 0)],
+            remaining=[],
+        )
+        engine = QualificationScenarioEngine(group)
+
+        # WHEN / THEN
+        self.assertEqual(engine.analyze("A").scenarios, [((), QUALIFIED)])
+        self.assertEqual(engine.analyze("C").scenarios, [((), QUALIFIED)])
+        self.assertEqual(engine.analyze("B").scenarios, [((), ELIMINATED)])
+
+    def test_describe_lists_scenarios(self):
+        # WHEN
+        text = self.engine.analyze("A").describe()
+
+        # THEN
+        self.assertIn("Team: A (Group A). Qualification: still possible.", text)
+        self.assertIn("Remaining group matches: C vs A; B vs D", text)
+        self.assertIn("- C beat A; B beat D -> A eliminated", text)
+        self.assertIn("- C beat A; B draw with D -> A " + DEPENDS_ON_GOALS, text)
+
+    def test_describe_groups_large_result_spaces_by_own_results(self):
+        # GIVEN
+        teams = ["A", "B", "C", "D"]
+        group = GroupState(group_name="C", teams=teams, played=[], remaining=[(h, a) for i, h in enumerate(teams) for a in teams[i + 1:]])
+
+        # WHEN
+        report = QualificationScenarioEngine(group).analyze("A")
+        text = report.describe()
+
+        # THEN
+        self.assertEqual(len(report.scenarios), 729)
+        self.assertIn("- A beat B; A beat C; A beat D: qualified in 27 of 27 combinations of the other results", text)
+
+if __name__ == "__main__":
+    unittest.main()
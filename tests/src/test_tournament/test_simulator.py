@@ -0,0 +1,199 @@
+import itertools
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../src')))
+
+from services.data_versions import DataVersionTracker
+from tournament.repository import KnockoutResult
+from tournament.scenario_engine import GroupState
+from tournament.simulator import STAGES, TournamentForecaster, TournamentSimulator, estimate_strengths
+
+
+def make_groups(played=None):
+    groups = []
+    for name in "ABCD":
+        teams = [f"{name}{i}" for i in range(1, 5)]
+        fixtures = list(itertools.combinations(teams, 2))
+        group_played = [result for result in (played or []) if result[0] in teams]
+        done = {frozenset((home, away)) for home, away, _, _ in group_played}
+        groups.append(GroupState(group_name=name, teams=teams, played=group_played, remaining=[f for f in fixtures if frozenset(f) not in done]))
+    return groups
+
+
+def teams_of(groups):
+    return [team for group in groups for team in group.teams]
+
+
+class TestEstimateStrengths(unittest.TestCase):
+    def test_shrinks_towards_average(self):
+        # GIVEN
+        results = [("A1", "A2", 4, 0)]
+
+        # WHEN
+        strengths = estimate_strengths(["A1", "A2", "A3"], results, prior_matches=1, shots_weight=0)
+
+        # THEN
+        self.assertEqual(strengths.base_rate, 2.0)
+        self.assertAlmostEqual(strengths.attack[0], 1.5)
+        self.assertAlmostEqual(strengths.attack[1], 0.5)
+        self.assertAlmostEqual(strengths.defence[1], 1.5)
+        self.assertAlmostEqual(strengths.attack[2], 1.0)
+
+    def test_overrides_and_shots(self):
+        # WHEN
+        strengths = estimate_strengths(["A1", "A2"], [], shots_on_target={"A1": (6.0, 10), "A2": (2.0, 10)}, prior_matches=0,
+                                       shots_weight=1, overrides={"A2": (0.7, 1.2)})
+
+        # THEN
+        self.assertAlmostEqual(strengths.attack[0], 1.5)
+        self.assertAlmostEqual(strengths.attack[1], 0.7)
+        self.assertAlmostEqual(strengths.defence[1], 1.2)
+
+
+class TestTournamentSimulator(unittest.TestCase):
+    def test_probabilities_are_consistent(self):
+        # GIVEN
+        groups = make_groups()
+        simulator = TournamentSimulator(groups, estimate_strengths(teams_of(groups), []))
+
+        # WHEN
+        result = simulator.run(2000, seed=7)
+
+        # THEN
+        self.assertAlmostEqual(sum(p["Quarter Finals"] for p in result.probabilities.values()), 8)
+        self.assertAlmostEqual(sum(p["Semi Finals"] for p in result.probabilities.values()), 4)
+        self.assertAlmostEqual(sum(p["Final"] for p in result.probabilities.values()), 2)
+        self.assertAlmostEqual(sum(p["Winner"] for p in result.probabilities.values()), 1)
+        for chances in result.probabilities.values():
+            self.assertEqual([chances[stage] for stage in STAGES], sorted((chances[stage] for stage in STAGES), reverse=True))
+
+    def test_finished_group_keeps_its_table(self):
+        # GIVEN
+        played = [("A1", "A2", 1, 0), ("A1", "A3", 1, 0), ("A1", "A4", 1, 0), ("A2", "A3", 1, 0), ("A2", "A4", 1, 0), ("A3", "A4", 1, 0)]
+        groups = make_groups(played)
+        simulator = TournamentSimulator(groups, estimate_strengths(teams_of(groups), []))
+
+        # WHEN
+        result = simulator.run(500, seed=1)
+
+        # THEN
+        self.assertEqual(result.probabilities["A1"]["Quarter Finals"], 1.0)
+        self.assertEqual(result.probabilities["A2"]["Quarter Finals"], 1.0)
+        self.assertEqual(result.probabilities["A3"]["Quarter Finals"], 0.0)
+
+    def test_head_to_head_decides_level_teams(self):
+        # GIVEN: A2 and A3 finish on 4 points, A3 beat A2, but A2 has the better goal difference
+        played = [("A1", "A2", 0, 0), ("A1", "A3", 1, 0), ("A1", "A4", 1, 0), ("A3", "A2", 1, 0), ("A2", "A4", 9, 0), ("A4", "A3", 0, 0)]
+        groups = make_groups(played)
+        simulator = TournamentSimulator(groups, estimate_strengths(teams_of(groups), []))
+
+        # WHEN
+        result = simulator.run(500, seed=1)
+
+        # THEN
+        self.assertEqual(result.probabilities["A3"]["Quarter Finals"], 1.0)
+        self.assertEqual(result.probabilities["A2"]["Quarter Finals"], 0.0)
+
+    def test_head_to_head_is_reapplied_to_teams_still_level(self):
+        # GIVEN: A1, A2 and A3 finish on 6 points, A2 is ahead on head-to-head goals, and A1 and A3 remain level
+        # on the head-to-head criteria of the three: A3 beat A1, but A1 has the better overall goal difference
+        played = [("A3", "A1", 1, 0), ("A1", "A2", 2, 1), ("A2", "A3", 2, 1), ("A1", "A4", 5, 0), ("A2", "A4", 1, 0), ("A3", "A4", 1, 0)]
+        groups = make_groups(played)
+        simulator = TournamentSimulator(groups, estimate_strengths(teams_of(groups), []))
+
+        # WHEN
+        result = simulator.run(500, seed=1)
+
+        # THEN
+        self.assertEqual(result.probabilities["A2"]["Quarter Finals"], 1.0)
+        self.assertEqual(result.probabilities["A3"]["Quarter Finals"], 1.0)
+        self.assertEqual(result.probabilities["A1"]["Quarter Finals"], 0.0)
+
+    def test_played_knockout_result_is_kept(self):
+        # GIVEN
+        played = [("A1", "A2", 1, 0), ("A1", "A3", 1, 0), ("A1", "A4", 1, 0), ("A2", "A3", 1, 0), ("A2", "A4", 1, 0), ("A3", "A4", 1, 0),
+                  ("B1", "B2", 1, 0), ("B1", "B3", 1, 0), ("B1", "B4", 1, 0), ("B2", "B3", 1, 0), ("B2", "B4", 1, 0), ("B3", "B4", 1, 0)]
+        groups = make_groups(played)
+        knockout = [KnockoutResult("Quarter Finals", "A1", "B2", 1, 1, 3, 4)]
+        simulator = TournamentSimulator(groups, estimate_strengths(teams_of(groups), []), knockout_results=knockout)
+
+        # WHEN
+        result = simulator.run(500, seed=1)
+
+        # THEN
+        self.assertEqual(result.probabilities["A1"]["Semi Finals"], 0.0)
+        self.assertEqual(result.probabilities["B2"]["Semi Finals"], 1.0)
+
+    def test_bracket_group_must_exist(self):
+        # GIVEN
+        groups = make_groups()[:2]
+
+        # THEN
+        with self.assertRaises(ValueError):
+            TournamentSimulator(groups, estimate_strengths(teams_of(groups), []))
+
+
+    def test_stored_group_names_match_the_bracket(self):
+        # GIVEN
+        groups = make_groups()
+        for group in groups:
+            group.group_name = f"Group {group.group_name}"
+
+        # WHEN
+        result = TournamentSimulator(groups, estimate_strengths(teams_of(groups), [])).run(n_simulations=50, seed=1)
+
+        # THEN
+        self.assertAlmostEqual(sum(chances["Winner"] for chances in result.probabilities.values()), 1.0)
+
+
+class TestTournamentForecaster(unittest.TestCase):
+    def setUp(self):
+        self.repository = MagicMock()
+        self.repository.group_states.return_value = make_groups()
+        self.repository.historical_results.return_value = []
+        self.repository.shots_on_target.return_value = {}
+        self.repository.knockout_results.return_value = []
+        self.versions = DataVersionTracker(poll_interval=0)
+        self.forecaster = TournamentForecaster(self.repository, versions=self.versions, n_simulations=200, seed=3)
+
+    def test_forecast_is_cached_until_a_result_is_recorded(self):
+        # GIVEN
+        first = self.forecaster.forecast()
+
+        # WHEN
+        second = self.forecaster.forecast()
+        self.versions.bump("matches")
+        third = self.forecaster.forecast()
+
+        # THEN
+        self.assertIs(first, second)
+        self.assertIsNot(first, third)
+        self.assertEqual(self.repository.group_states.call_count, 2)
+        self.assertEqual(self.forecaster.stats()["runs"], 2)
+        self.assertEqual(self.forecaster.stats()["hits"], 1)
+
+    def test_strength_overrides_are_read_from_the_setting(self):
+        # GIVEN
+        with patch.dict(os.environ, {"SIMULATION_STRENGTH_OVERRIDES": '{"A1": [0.1, 5.0]}'}):
+            forecaster = TournamentForecaster(self.repository, versions=self.versions, n_simulations=200, seed=3)
+
+        # WHEN
+        result = forecaster.forecast()
+
+        # THEN
+        self.assertEqual(forecaster.overrides, {"A1": (0.1, 5.0)})
+        self.assertLess(result.probabilities["A1"]["Quarter Finals"], self.forecaster.forecast().probabilities["A1"]["Quarter Finals"])
+
+    def test_describe_team(self):
+        # WHEN
+        text = self.forecaster.forecast().describe(["A1"])
+
+        # THEN
+        self.assertIn("200 simulated tournaments", text)
+        self.assertTrue(text.splitlines()[1].startswith("- A1: Quarter Finals"))
+
+if __name__ == "__main__":
+    unittest.main()
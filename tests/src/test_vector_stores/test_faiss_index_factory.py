@@ -0,0 +1,107 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../src')))
+
+from rag.vector_stores.build_faiss_index import build_index, read_vectors
+from rag.vector_stores.faiss_index_factory import FAISSIndexFactory, IndexConfig, describe_index
+
+
+class TestFAISSIndexFactory(unittest.TestCase):
+    def setUp(self):
+        self.vectors = np.random.default_rng(0).random((2000, 16), dtype=np.float32)
+
+    def test_config_from_file_and_env(self):
+        # GIVEN
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "config.json")
+            with open(path, "w") as f:
+                json.dump({"vector_index": {"type": "HNSW", "params": {"hnsw_m": 16, "nprobe": 4}}}, f)
+
+            # WHEN
+            with patch.dict(os.environ, {"FAISS_EF_SEARCH": "128"}):
+                config = IndexConfig.from_config(path)
+
+        # THEN
+        self.assertEqual(config, IndexConfig(type="hnsw", hnsw_m=16, ef_search=128, nprobe=4))
+
+    def test_creates_configured_types(self):
+        # GIVEN
+        expected = {"flat": faiss.IndexFlatL2, "hnsw": faiss.IndexHNSWFlat, "ivf_flat": faiss.IndexIVFFlat, "ivf_pq": faiss.IndexIVFPQ}
+
+        for index_type, index_class in expected.items():
+            # WHEN
+            index = FAISSIndexFactory(IndexConfig(type=index_type, ef_search=32, nlist=64, nprobe=8, pq_bytes=6)).create(16)
+
+            # THEN
+            self.assertIsInstance(index, index_class)
+            self.assertEqual(index.d, 16)
+        self.assertEqual(FAISSIndexFactory(IndexConfig(type="hnsw", ef_search=32)).create(16).hnsw.efSearch, 32)
+
+    def test_creates_scalar_quantized_types(self):
+        # GIVEN
+        expected = {"flat": faiss.IndexScalarQuantizer, "hnsw": faiss.IndexHNSWSQ, "ivf_flat": faiss.IndexIVFScalarQuantizer}
+
+        for index_type, index_class in expected.items():
+            for quantization in ("fp16", "int8"):
+                # WHEN
+                index = FAISSIndexFactory(IndexConfig(type=index_type, nlist=16, quantization=quantization)).create(16)
+
+                # THEN
+                self.assertIsInstance(index, index_class)
+                self.assertEqual(describe_index(index), (index_type, quantization))
+        self.assertEqual(describe_index(faiss.IndexHNSWFlat(16, 8)), ("hnsw", "none"))
+
+    def test_int8_quantization_keeps_neighbours(self):
+        # WHEN
+        index = build_index(self.vectors, FAISSIndexFactory(IndexConfig(quantization="int8")))
+
+        # THEN
+        self.assertEqual(len(faiss.serialize_index(index)) // 2000, 16)
+        _, neighbours = index.search(self.vectors[:10], 1)
+        self.assertEqual(neighbours[:, 0].tolist(), list(range(10)))
+
+    def test_unknown_quantization(self):
+        with self.assertRaises(ValueError):
+            FAISSIndexFactory(IndexConfig(quantization="int4")).create(16)
+
+    def test_pq_bytes_divide_dimension(self):
+        # WHEN
+        index = FAISSIndexFactory(IndexConfig(type="ivf_pq", pq_bytes=6)).create(16)
+
+        # THEN
+        self.assertEqual(index.pq.M, 4)
+
+    def test_nlist_capped_by_training_size(self):
+        # WHEN
+        index = FAISSIndexFactory(IndexConfig(type="ivf_flat", nlist=1024, nprobe=16)).create(16, training_size=390)
+
+        # THEN
+        self.assertEqual(index.nlist, 10)
+        self.assertEqual(index.nprobe, 10)
+
+    def test_unknown_type(self):
+        with self.assertRaises(ValueError):
+            FAISSIndexFactory(IndexConfig(type="annoy")).create(16)
+
+    def test_build_index_and_read_back(self):
+        for index_type in ("hnsw", "ivf_flat"):
+            # WHEN
+            index = build_index(self.vectors, FAISSIndexFactory(IndexConfig(type=index_type, nlist=16, nprobe=16)))
+
+            # THEN
+            self.assertEqual(index.ntotal, 2000)
+            np.testing.assert_allclose(read_vectors(index)[:5], self.vectors[:5], rtol=1e-5)
+            _, neighbours = index.search(self.vectors[:1], 1)
+            self.assertEqual(neighbours[0][0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
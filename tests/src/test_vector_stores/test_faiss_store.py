@@ -7,6 +7,8 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 
 from unittest.mock import MagicMock, patch
 
+from langchain_core.documents import Document
+
 from rag.vector_stores.faiss_store import FAISSStore
 
 class TestFAISSStore(unittest.TestCase):
@@ -15,15 +17,15 @@ class TestFAISSStore(unittest.TestCase):
     def test_initialization(self, mock_faiss_vector_store, mock_faiss_index):
         # GIVEN
         mock_embedding_model = MagicMock()
-        mock_embedding_model.embed_query.return_value = [0.1, 0.2, 0.3]
         mock_index = MagicMock()
         mock_faiss_index.return_value = mock_index
 
         # WHEN
-        store = FAISSStore(embedding_model=mock_embedding_model)
+        store = FAISSStore(embedding_model=mock_embedding_model, dimension=3)
 
         # THEN
         mock_faiss_index.assert_called_once_with(3)  # Verify the index was initialized with the correct dimension
+        mock_embedding_model.embed_query.assert_not_called()  # Verify nothing is embedded to learn the dimension
         self.assertEqual(store.embedding_model, mock_embedding_model)  # Verify the embedding model is set
         self.assertEqual(store.index, mock_index)  # Verify the index is set
         mock_faiss_vector_store.assert_called_once_with(
@@ -33,19 +35,20 @@ class TestFAISSStore(unittest.TestCase):
             index_to_docstore_id={}
         )
 
-    @patch("rag.vector_stores.faiss_store.FAISS")
-    def test_add_documents(self, mock_faiss_vector_store):
+    def test_add_documents(self):
         # GIVEN
-        mock_vector_store_instance = MagicMock()
-        mock_faiss_vector_store.return_value = mock_vector_store_instance
-        store = FAISSStore(embedding_model=MagicMock())
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        embedding_model = MagicMock(wraps=DeterministicFakeEmbedding(size=8))
+        store = FAISSStore(embedding_model=embedding_model)
 
         # WHEN
-        chunks = [{"content": "test document"}]
+        chunks = [Document(page_content="test document")]
         store.add_documents(chunks)
 
         # THEN
-        mock_vector_store_instance.add_documents.assert_called_once_with(documents=chunks)
+        embedding_model.embed_documents.assert_called_once_with(["test document"])
+        self.assertEqual(store.vector_store.index.ntotal, 1)
+        self.assertEqual(len(store.sparse_index), 1)
 
     @patch("rag.vector_stores.faiss_store.FAISS")
     def test_search(self, mock_faiss_vector_store):
@@ -64,7 +67,24 @@ class TestFAISSStore(unittest.TestCase):
         mock_vector_store_instance.similarity_search.assert_called_once_with("test query", k=2)
 
     @patch("rag.vector_stores.faiss_store.FAISS")
-    def test_save_data_base(self, mock_faiss_vector_store):
+    def test_search_with_scores(self, mock_faiss_vector_store):
+        # GIVEN
+        mock_vector_store_instance = MagicMock()
+        mock_vector_store_instance.similarity_search_with_score.return_value = [("doc1", 0.0), ("doc2", 3.0)]
+        mock_faiss_vector_store.return_value = mock_vector_store_instance
+        store = FAISSStore(embedding_model=MagicMock())
+
+        # WHEN
+        results = store.search_with_scores(query="test query", top_k=2, filter={"country": "spain"})
+
+        # THEN
+        self.assertEqual(results, [("doc1", 1.0), ("doc2", 0.25)])
+        mock_vector_store_instance.similarity_search_with_score.assert_called_once_with("test query", k=2, filter={"country": "spain"})
+
+    @patch.dict(os.environ, {"FAISS_PERSISTENCE": "pickle"})
+    @patch("rag.vector_stores.faiss_store.IndexManifest")
+    @patch("rag.vector_stores.faiss_store.FAISS")
+    def test_save_data_base(self, mock_faiss_vector_store, mock_manifest):
         """Test the save_data_base method."""
         # GIVEN
         mock_vector_store_instance = MagicMock()
@@ -76,15 +96,202 @@ class TestFAISSStore(unittest.TestCase):
 
         # THEN
         mock_vector_store_instance.save_local.assert_called_once_with("test_db")
+        mock_manifest.for_index.return_value.save.assert_called_once_with("test_db")
+
+    def test_country_filter_scans_matching_vectors(self):
+        # GIVEN
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        store = FAISSStore(embedding_model=DeterministicFakeEmbedding(size=16))
+        chunks = [Document(page_content=f"Spain chunk {i}", metadata={"country": "spain"}) for i in range(40)]
+        chunks += [Document(page_content=f"Wales chunk {i}", metadata={"country": "wales"}) for i in range(3)]
+        store.add_documents(chunks)
+
+        # WHEN
+        results = store.search_with_scores("Who plays for Wales?", top_k=5, filter={"country": {"$in": ["wales"]}})
+
+        # THEN
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(doc.metadata["country"] == "wales" for doc, _ in results))
+        self.assertTrue(all(0.0 < score <= 1.0 for _, score in results))
+        self.assertEqual(list(store.partitions.ids_for({"country": "wales"})), [40, 41, 42])
+
+    def test_save_and_load_memory_mapped_store(self):
+        # GIVEN
+        import tempfile
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        from rag.vector_stores.base_store import ReadOnlyStoreError
+        from rag.vector_stores.faiss_persistence import MmapBM25Index, MmapFlatIndex, SQLiteDocstore
+        embedding_model = DeterministicFakeEmbedding(size=16)
+        store = FAISSStore(embedding_model=embedding_model)
+        chunks = [Document(page_content=f"Spain chunk {i}", metadata={"country": "spain"}) for i in range(10)]
+        chunks += [Document(page_content="Wales won the final", metadata={"country": "wales"})]
+        store.add_documents(chunks)
+        expected = store.search_with_scores("Wales won the final", top_k=3)
+
+        with tempfile.TemporaryDirectory() as directory:
+            # WHEN
+            store.save_data_base(directory)
+            loaded = FAISSStore(embedding_model=embedding_model)
+            loaded.load_vector_store(directory)
+            results = loaded.search_with_scores("Wales won the final", top_k=3)
+            filtered = loaded.search_with_scores("final", top_k=3, filter={"country": "wales"})
+            sparse = loaded.sparse_index.search("Wales final", top_k=1)
+
+            # THEN
+            self.assertIsInstance(loaded.vector_store.index, MmapFlatIndex)
+            self.assertIsInstance(loaded.docstore, SQLiteDocstore)
+            self.assertFalse(os.path.exists(os.path.join(directory, "index.pkl")))
+            self.assertEqual([(doc.page_content, round(score, 5)) for doc, score in results],
+                             [(doc.page_content, round(score, 5)) for doc, score in expected])
+            self.assertEqual([doc.page_content for doc, _ in filtered], ["Wales won the final"])
+            self.assertEqual(sparse[0][0].page_content, "Wales won the final")
+            self.assertIsInstance(loaded.sparse_index, MmapBM25Index)
+            self.assertEqual([(doc.page_content, round(score, 5)) for doc, score in loaded.sparse_index.search("spain chunk 3", top_k=4)],
+                             [(doc.page_content, round(score, 5)) for doc, score in store.sparse_index.search("spain chunk 3", top_k=4)])
+            self.assertEqual(loaded.sparse_index.search("chunk", top_k=3, filter={"country": "wales"}), [])
+            self.assertEqual(loaded.manifest.model_id, "DeterministicFakeEmbedding")
+            self.assertEqual((loaded.manifest.dimension, loaded.manifest.documents), (16, 11))
+            with self.assertRaises(ReadOnlyStoreError):
+                loaded.delete([chunks[0].id])
+            loaded.docstore._connection.close()
+
+    def test_save_and_load_quantized_store(self):
+        # GIVEN
+        import tempfile
+        import faiss
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        from rag.vector_stores.faiss_index_factory import IndexConfig
+        embedding_model = DeterministicFakeEmbedding(size=16)
+        store = FAISSStore(embedding_model=embedding_model, index_config=IndexConfig(quantization="int8"))
+        store.add_documents([Document(page_content=f"Match report {i}") for i in range(1000)])
+
+        with tempfile.TemporaryDirectory() as directory:
+            # WHEN
+            store.save_data_base(directory)
+            loaded = FAISSStore(embedding_model=embedding_model)
+            loaded.load_vector_store(directory)
+            results = loaded.search_with_scores("Match report 7", top_k=1)
+
+            # THEN
+            self.assertIsInstance(loaded.vector_store.index, faiss.IndexScalarQuantizer)
+            self.assertEqual((loaded.manifest.index_type, loaded.manifest.quantization), ("flat", "int8"))
+            self.assertEqual(results[0][0].page_content, "Match report 7")
+            loaded.docstore._connection.close()
+
+    def test_trainable_index_is_built_once_enough_vectors_are_added(self):
+        # GIVEN
+        import faiss
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        from rag.vector_stores.faiss_index_factory import IndexConfig
+        store = FAISSStore(embedding_model=DeterministicFakeEmbedding(size=16), index_config=IndexConfig(type="ivf_flat", nlist=4, nprobe=4))
+
+        # WHEN
+        store.add_documents([Document(id=str(i), page_content=f"Match report {i}") for i in range(100)])
+        buffered = store.vector_store.index
+        store.add_documents([Document(id=str(i), page_content=f"Match report {i}") for i in range(100, 200)])
+
+        # THEN
+        self.assertIsInstance(buffered, faiss.IndexFlatL2)
+        self.assertIsInstance(store.vector_store.index, faiss.IndexIVFFlat)
+        self.assertEqual((store.vector_store.index.nlist, store.vector_store.index.ntotal), (4, 200))
+        self.assertEqual(store.search_with_scores("Match report 42", top_k=1)[0][0].id, "42")
+
+    def test_load_fails_fast_with_another_embedding_model(self):
+        # GIVEN
+        import tempfile
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        embedding_model = MagicMock()
+        store = FAISSStore(embedding_model=DeterministicFakeEmbedding(size=8), model_id="ollama:mxbai-embed-large")
+        store.add_documents([Document(page_content="Spain won the final")])
+
+        with tempfile.TemporaryDirectory() as directory:
+            store.save_data_base(directory)
+            loaded = FAISSStore(embedding_model=embedding_model, model_id="openai:text-embedding-3-large")
+
+            # WHEN / THEN
+            with self.assertRaises(ValueError) as context:
+                loaded.load_vector_store(directory)
+            self.assertIn("ollama:mxbai-embed-large", str(context.exception))
+            embedding_model.embed_query.assert_not_called()
+
+    def test_search_batch_matches_single_searches(self):
+        # GIVEN
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        embedding_model = MagicMock(wraps=DeterministicFakeEmbedding(size=16))
+        store = FAISSStore(embedding_model=embedding_model)
+        store.add_documents([Document(id=str(i), page_content=f"Chunk {i}", metadata={"country": "wales" if i % 3 else "spain"})
+                             for i in range(30)])
+        store.delete(["4"])
+        queries = ["Chunk 4", "Chunk 7", "Chunk 12"]
+        embedding_model.embed_documents.reset_mock()
+
+        for filter in (None, {"country": "wales"}):
+            # WHEN
+            batch = store.search_batch(queries, top_k=3, filter=filter)
+
+            # THEN
+            self.assertEqual(len(batch), 3)
+            for query, results in zip(queries, batch):
+                expected = store.search_with_scores(query, top_k=3, filter=filter)
+                self.assertEqual([(result.document.id, round(result.score, 5)) for result in results],
+                                 [(doc.id, round(score, 5)) for doc, score in expected])
+        self.assertEqual(embedding_model.embed_documents.call_count, 2)  # One embedding call per batch
 
     def test_delete(self):
         """Test the delete method."""
         # GIVEN
-        store = FAISSStore(embedding_model=MagicMock())
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        store = FAISSStore(embedding_model=DeterministicFakeEmbedding(size=16))
+        store.compaction_threshold = 1.0
+        store.add_documents([Document(id=str(i), page_content=f"Squad update {i}", metadata={"country": "spain"}) for i in range(10)])
+
+        # WHEN
+        store.delete(["3", "unknown"])
+
+        # THEN
+        self.assertEqual(list(store.tombstones), [3])
+        self.assertEqual(store.vector_store.index.ntotal, 10)  # Deleting does not rebuild the index
+        results = store.search_with_scores("Squad update 3", top_k=10)
+        self.assertEqual(len(results), 9)
+        self.assertNotIn("3", [doc.id for doc, _ in results])
+        filtered = store.search_with_scores("Squad update 3", top_k=10, filter={"country": "spain"})
+        self.assertNotIn("3", [doc.id for doc, _ in filtered])
+        self.assertEqual([doc.id for doc, _ in store.sparse_index.search("update 3", top_k=10)].count("3"), 0)
+
+    def test_upsert_replaces_document_with_same_id(self):
+        # GIVEN
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        store = FAISSStore(embedding_model=DeterministicFakeEmbedding(size=16))
+        store.add_documents([Document(id="squad", page_content="Spain squad: Putellas injured")])
+
+        # WHEN
+        store.add_documents([Document(id="squad", page_content="Spain squad: Putellas fit")])
+
+        # THEN
+        results = store.search_with_scores("Spain squad", top_k=5)
+        self.assertEqual([doc.page_content for doc, _ in results], ["Spain squad: Putellas fit"])
+
+    def test_compaction_reclaims_deleted_vectors_in_background(self):
+        # GIVEN
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        store = FAISSStore(embedding_model=DeterministicFakeEmbedding(size=16))
+        store.compaction_threshold = 0.25
+        store.add_documents([Document(id=str(i), page_content=f"Chunk {i}", metadata={"country": "wales" if i % 2 else "spain"})
+                             for i in range(8)])
+        store.delete(["0"])
+
+        # WHEN
+        store.delete(["1"])
+        store._compaction.result(timeout=10)
 
         # THEN
-        with self.assertRaises(NotImplementedError):
-            store.delete(["id1", "id2"])
+        self.assertEqual(store.vector_store.index.ntotal, 6)
+        self.assertEqual(len(store.tombstones), 0)
+        self.assertEqual(sorted(store.vector_store.index_to_docstore_id.values()), [str(i) for i in range(2, 8)])
+        results = store.search_with_scores("Chunk 3", top_k=5, filter={"country": "wales"})
+        self.assertEqual(sorted(doc.id for doc, _ in results), ["3", "5", "7"])
+        store.delete(["3"])
+        self.assertNotIn("3", [doc.id for doc, _ in store.search_with_scores("Chunk 3", top_k=10)])
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,51 @@
+import os
+import sys
+import unittest
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../src')))
+
+from rag.vector_stores.metadata_partitions import MetadataPartitions, search_positions
+
+
+class TestMetadataPartitions(unittest.TestCase):
+    def setUp(self):
+        self.partitions = MetadataPartitions("country")
+        self.partitions.rebuild([(0, {"country": "spain"}), (1, {"country": "italy"}), (2, {"country": "spain"}), (3, {})])
+
+    def test_ids_for_filters(self):
+        self.assertEqual(list(self.partitions.ids_for({"country": "spain"})), [0, 2])
+        self.assertEqual(list(self.partitions.ids_for({"country": {"$in": ["italy", "spain"]}})), [0, 1, 2])
+        self.assertEqual(list(self.partitions.ids_for({"country": "wales"})), [])
+
+    def test_unsupported_filters(self):
+        self.assertIsNone(self.partitions.ids_for({"country": "spain", "year": 2025}))
+        self.assertIsNone(self.partitions.ids_for({"country": {"$nin": ["spain"]}}))
+        self.assertIsNone(self.partitions.ids_for(None))
+
+    def test_search_positions_only_returns_matching_positions(self):
+        # GIVEN
+        rng = np.random.default_rng(0)
+        vectors = rng.random((200, 8), dtype=np.float32)
+        query = rng.random(8, dtype=np.float32)
+        positions = np.arange(0, 200, 7, dtype=np.int64)
+        expected = positions[np.argsort(((vectors[positions] - query) ** 2).sum(axis=1))[:5]]
+        flat = faiss.IndexFlatL2(8)
+        flat.add(vectors)
+        hnsw = faiss.IndexHNSWFlat(8, 16)
+        hnsw.add(vectors)
+
+        # WHEN
+        _, exact = search_positions(flat, query, 5, positions)
+        distances, approximate = search_positions(hnsw, query, 5, positions)
+
+        # THEN
+        self.assertEqual(list(exact), list(expected))
+        self.assertEqual(len(distances), 5)
+        self.assertTrue(set(approximate) <= set(positions))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,6 +5,8 @@ from unittest.mock import MagicMock, patch
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../src')))
 
+from langchain_core.documents import Document
+
 from rag.vector_stores.pinecone_store import PineconeStore
 
 class TestPineconeStore(unittest.TestCase):
@@ -17,12 +19,19 @@ class TestPineconeStore(unittest.TestCase):
 
     def test_add_documents(self):
         # GIVEN
-        chunks = [{"id": "1", "content": "test content"}]
+        chunks = [Document(id="1", page_content="test content")]
         # WHEN
         self.store.add_documents(chunks)
         # THEN
         self.mock_vector_store.add_documents.assert_called_once_with(chunks)
 
+    def test_has_no_sparse_index(self):
+        # WHEN
+        self.store.add_documents([Document(id="1", page_content="test content")])
+
+        # THEN
+        self.assertIsNone(self.store.sparse_index)
+
     def test_search(self):
         # GIVEN
         query = "test query"
@@ -39,6 +48,17 @@ class TestPineconeStore(unittest.TestCase):
         self.mock_vector_store.similarity_search.assert_called_once_with(query, k=2)
         self.assertEqual(results, ["result 1", "result 2"])
 
+    def test_search_with_scores(self):
+        # GIVEN
+        self.mock_vector_store.similarity_search_with_score.return_value = [("doc1", 0.82), ("doc2", -0.1)]
+
+        # WHEN
+        results = self.store.search_with_scores("test query", top_k=2)
+
+        # THEN
+        self.mock_vector_store.similarity_search_with_score.assert_called_once_with("test query", k=2, filter=None)
+        self.assertEqual(results, [("doc1", 0.82), ("doc2", 0.0)])
+
     def test_delete(self):
         # GIVEN
         ids = ["1", "2"]
@@ -67,5 +87,21 @@ class TestPineconeStore(unittest.TestCase):
         except Exception as e:
             self.fail(f"load_vector_store raised Exception unexpectedly: {e}")
 
+    def test_search_batch(self):
+        # GIVEN
+        self.mock_embedding_model.embed_documents.return_value = [[1.0, 0.0], [0.0, 1.0]]
+        self.mock_vector_store.similarity_search_by_vector_with_score.side_effect = (
+            lambda embedding, k, filter: [(Document(page_content=f"doc {embedding[0]}"), 1.2)]
+        )
+
+        # WHEN
+        results = self.store.search_batch(["query 1", "query 2"], top_k=1, filter={"country": "spain"})
+
+        # THEN
+        self.mock_embedding_model.embed_documents.assert_called_once_with(["query 1", "query 2"])
+        self.assertEqual([[(result.document.page_content, result.score) for result in query] for query in results],
+                         [[("doc 1.0", 1.0)], [("doc 0.0", 1.0)]])
+        self.mock_vector_store.similarity_search_by_vector_with_score.assert_any_call([0.0, 1.0], k=1, filter={"country": "spain"})
+
 if __name__ == "__main__":
     unittest.main()
@@ -7,13 +7,13 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 
 from langchain_core.messages import HumanMessage
 
-from rag.embeddings.embedding_factory import EmbeddingFactory
-from rag.vector_stores.faiss_store import FAISSStore
+from rag.vector_stores.base_store import BaseStore
 from tools.agentic_rag_tool import agentic_rag
 
 class TestAgenticRagStream(unittest.TestCase):
+    @patch("tools.agentic_rag_tool.get_country_gazetteer")
     @patch("tools.agentic_rag_tool.AgenticRAG")
-    def test_agentic_rag_stream_valid_response(self, mock_agentic_rag):
+    def test_agentic_rag_stream_valid_response(self, mock_agentic_rag, mock_get_country_gazetteer):
         # GIVEN
         mock_graph = MagicMock()
         mock_graph.return_value = {
@@ -22,21 +22,35 @@ class TestAgenticRagStream(unittest.TestCase):
         mock_agentic_rag.return_value = mock_graph
         question = "What can you say about Spain?"
         language = "English"
-        embedding_model = EmbeddingFactory("ollama").create_embedding()
-        store = FAISSStore(embedding_model=embedding_model)
+        store = MagicMock(spec=BaseStore)
 
         # WHEN
         result = agentic_rag.invoke({"vector_store" : store , "question": question, "language": language})
 
         # THEN
         self.assertEqual(result, "Mock response")
-        mock_agentic_rag.assert_called_once_with(store)
+        mock_agentic_rag.assert_called_once_with(store, gazetteer=mock_get_country_gazetteer.return_value)
         expected_initial_state = {
             "messages": [HumanMessage(content="What can you say about Spain?")],
             "question_language": language
         }
         mock_graph.assert_called_once_with(expected_initial_state)
 
+    @patch("tools.agentic_rag_tool.get_country_gazetteer")
+    @patch("tools.agentic_rag_tool.AgenticRAG")
+    def test_agentic_rag_is_built_once_per_store(self, mock_agentic_rag, mock_get_country_gazetteer):
+        # GIVEN
+        mock_agentic_rag.return_value.return_value = {"messages": [HumanMessage(content="Mock response")]}
+        store = MagicMock(spec=BaseStore)
+
+        # WHEN
+        agentic_rag.invoke({"vector_store": store, "question": "Is there VAR?"})
+        agentic_rag.invoke({"vector_store": store, "question": "When does the cup start?"})
+
+        # THEN
+        mock_agentic_rag.assert_called_once()
+        self.assertEqual(mock_agentic_rag.return_value.call_count, 2)
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,58 @@
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../src')))
+from tools.simulation_tool import get_tournament_chances
+
+class TestSimulationTool(unittest.TestCase):
+    @patch("tools.simulation_tool.handle_simulation_question")
+    def test_get_tournament_chances(self, mock_handle_simulation_question):
+        # GIVEN
+        result_mock = MagicMock()
+        result_mock.content.strip.return_value = "MockResult"
+        mock_handle_simulation_question.return_value = result_mock
+        question = "What are Spain's chances?"
+        from langchain_openai import ChatOpenAI
+        model = ChatOpenAI(api_key="test-key", model="gpt-3.5-turbo")
+
+        # WHEN
+        result = get_tournament_chances.invoke({"model": model, "question": question, "question_language": "English"})
+
+        # THEN
+        self.assertEqual(result, "MockResult")
+        mock_handle_simulation_question.assert_called_once_with(llm=model, question=question, question_language="English")
+
+    @patch("agents.simulation_agent.get_tournament_forecaster")
+    def test_handle_simulation_question_describes_mentioned_team(self, mock_get_tournament_forecaster):
+        # GIVEN
+        from agents.simulation_agent import handle_simulation_question
+        forecast = mock_get_tournament_forecaster.return_value.forecast.return_value
+        forecast.probabilities = {"Spain": {}, "Italy": {}}
+        forecast.describe.return_value = "- Spain: Winner 40.0%"
+        llm = MagicMock()
+
+        # WHEN
+        handle_simulation_question(llm, "What are Spain's chances?", "English")
+
+        # THEN
+        forecast.describe.assert_called_once_with(["Spain"])
+
+    @patch("agents.simulation_agent.get_tournament_forecaster")
+    def test_handle_simulation_question_describes_first_mentioned_team(self, mock_get_tournament_forecaster):
+        # GIVEN
+        from agents.simulation_agent import handle_simulation_question
+        forecast = mock_get_tournament_forecaster.return_value.forecast.return_value
+        forecast.probabilities = {"Spain": {}, "England": {}}
+        forecast.describe.return_value = "- Spain: Winner 40.0%"
+        llm = MagicMock()
+
+        # WHEN
+        handle_simulation_question(llm, "What are Spain's chances against England?", "English")
+
+        # THEN
+        forecast.describe.assert_called_once_with(["Spain"])
+
+if __name__ == "__main__":
+    unittest.main()
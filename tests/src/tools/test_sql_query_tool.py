@@ -0,0 +1,122 @@
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../src')))
+from langchain_community.utilities import SQLDatabase
+
+from services.data_versions import DataVersionTracker
+from services.sql_query_guard import QueryRejectedError, QueryResult
+from services.sql_result_cache import SQLResultCache
+from services.sql_result_formatter import FormatterMetrics, SQLResultFormatter
+from tools.sql_query_tool import ManagedQuerySQLDatabaseTool
+
+class TestManagedQuerySQLDatabaseTool(unittest.TestCase):
+    def setUp(self):
+        self.db = MagicMock(spec=SQLDatabase)
+        self.versions = DataVersionTracker(poll_interval=0)
+        self.cache = SQLResultCache(versions=self.versions)
+        self.tool = ManagedQuerySQLDatabaseTool(db=self.db, cache=self.cache)
+
+    def test_second_identical_query_is_served_from_cache(self):
+        # GIVEN
+        self.db.run_no_throw.return_value = "[('Spain', 9)]"
+
+        # WHEN
+        first = self.tool.invoke({"query": "SELECT country, points FROM group_standings"})
+        second = self.tool.invoke({"query": "select country, points from group_standings"})
+
+        # THEN
+        self.assertEqual(first, "[('Spain', 9)]")
+        self.assertEqual(second, "[('Spain', 9)]")
+        self.db.run_no_throw.assert_called_once()
+
+    def test_errors_are_not_cached(self):
+        # GIVEN
+        self.db.run_no_throw.return_value = "Error: relation does not exist"
+
+        # WHEN
+        self.tool.invoke({"query": "SELECT * FROM unknown"})
+        self.tool.invoke({"query": "SELECT * FROM unknown"})
+
+        # THEN
+        self.assertEqual(self.db.run_no_throw.call_count, 2)
+
+    def test_write_bumps_table_version(self):
+        # GIVEN
+        self.db.run_no_throw.return_value = "[(1,)]"
+        self.tool.invoke({"query": "SELECT home_score FROM matches"})
+
+        # WHEN
+        self.tool.invoke({"query": "UPDATE matches SET home_score = 1"})
+        self.tool.invoke({"query": "SELECT home_score FROM matches"})
+
+        # THEN
+        self.assertEqual(self.db.run_no_throw.call_count, 3)
+
+    def test_guarded_query_renders_capped_rows(self):
+        # GIVEN
+        guard = MagicMock()
+        guard.execute.return_value = QueryResult(columns=["country"], rows=[("Spain",)], truncated=True, notes=["Only the first 1 rows are shown."])
+        tool = ManagedQuerySQLDatabaseTool(db=self.db, cache=self.cache, guard=guard)
+
+        # WHEN
+        result = tool.invoke({"query": "SELECT country FROM teams"})
+
+        # THEN
+        self.assertEqual(result, "[('Spain',)]\nOnly the first 1 rows are shown.")
+        self.db.run_no_throw.assert_not_called()
+
+    def test_guarded_query_keeps_notes_without_rows(self):
+        # GIVEN
+        guard = MagicMock()
+        guard.execute.return_value = QueryResult(columns=["report"], rows=[], truncated=True, notes=["Result truncated to 0 rows to stay under 4096 bytes."])
+        tool = ManagedQuerySQLDatabaseTool(db=self.db, cache=self.cache, guard=guard)
+
+        # WHEN
+        result = tool.invoke({"query": "SELECT report FROM matches"})
+
+        # THEN
+        self.assertEqual(result, "Result truncated to 0 rows to stay under 4096 bytes.")
+
+    def test_guarded_query_uses_formatter(self):
+        # GIVEN
+        guard = MagicMock()
+        guard.execute.return_value = QueryResult(columns=["country", "points"], rows=[("Spain", 9), ("Italy", 4)])
+        formatter = SQLResultFormatter(metrics=FormatterMetrics())
+        tool = ManagedQuerySQLDatabaseTool(db=self.db, guard=guard, formatter=formatter)
+
+        # WHEN
+        result = tool.invoke({"query": "SELECT country, points FROM group_standings"})
+
+        # THEN
+        self.assertEqual(result, "2 rows | columns: country | points\nSpain | 9\nItaly | 4")
+
+    def test_rejected_query_returns_error(self):
+        # GIVEN
+        guard = MagicMock()
+        guard.execute.side_effect = QueryRejectedError("Query rejected: estimated cost 9000 exceeds the limit of 1000.")
+        tool = ManagedQuerySQLDatabaseTool(db=self.db, cache=self.cache, guard=guard)
+
+        # WHEN
+        result = tool.invoke({"query": "SELECT * FROM match_events"})
+
+        # THEN
+        self.assertTrue(result.startswith("Error: Query rejected"))
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_from_tool_keeps_name_and_description(self):
+        # GIVEN
+        tool = ManagedQuerySQLDatabaseTool(db=self.db, description="custom description")
+
+        # WHEN
+        managed = ManagedQuerySQLDatabaseTool.from_tool(tool, cache=self.cache)
+
+        # THEN
+        self.assertEqual(managed.name, "sql_db_query")
+        self.assertEqual(managed.description, "custom description")
+        self.assertIs(managed.cache, self.cache)
+
+if __name__ == "__main__":
+    unittest.main()